@@ -5,10 +5,17 @@
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "vector";
 
+-- Tenancy: every registry row belongs to a namespace (one corpus per team).
+-- skills, documents and skill_sources are LIST-partitioned by namespace, so
+-- each namespace has its own partitions and its own ANN indexes; searches
+-- filtered on namespace only touch that namespace's partition.
+-- Partitions are created by create_namespace() (below).
+
 -- Skills table: Main registry of agent skills
 CREATE TABLE IF NOT EXISTS skills (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    name VARCHAR(255) NOT NULL UNIQUE,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
+    name VARCHAR(255) NOT NULL,
     description TEXT,
     content TEXT NOT NULL,
     path VARCHAR(512) NOT NULL,
@@ -16,66 +23,109 @@ CREATE TABLE IF NOT EXISTS skills (
     author VARCHAR(255),
     embedding vector(1536),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (namespace, id),
+    UNIQUE (namespace, name)
+) PARTITION BY LIST (namespace);
 
 -- Documents table: Source documents used to build skills
 CREATE TABLE IF NOT EXISTS documents (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
     title VARCHAR(512) NOT NULL,
     description TEXT,
     content TEXT NOT NULL,
-    path VARCHAR(512) NOT NULL UNIQUE,
+    path VARCHAR(512) NOT NULL,
     content_hash VARCHAR(64) NOT NULL,
     doc_type VARCHAR(50) DEFAULT 'reference',  -- 'research', 'blog', 'reference', 'case_study'
     source_url VARCHAR(512) DEFAULT 'No',
     embedding vector(1536),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (namespace, id),
+    UNIQUE (namespace, path)
+) PARTITION BY LIST (namespace);
 
 -- Skill sources: Links skills to their source documents
 CREATE TABLE IF NOT EXISTS skill_sources (
-    skill_id UUID REFERENCES skills(id) ON DELETE CASCADE,
-    document_id UUID REFERENCES documents(id) ON DELETE CASCADE,
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
+    skill_id UUID NOT NULL,
+    document_id UUID NOT NULL,
     relevance FLOAT DEFAULT 1.0 CHECK (relevance >= 0 AND relevance <= 1),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    PRIMARY KEY (skill_id, document_id)
-);
+    PRIMARY KEY (namespace, skill_id, document_id),
+    FOREIGN KEY (namespace, skill_id) REFERENCES skills(namespace, id) ON DELETE CASCADE,
+    FOREIGN KEY (namespace, document_id) REFERENCES documents(namespace, id) ON DELETE CASCADE
+) PARTITION BY LIST (namespace);
 
 -- Skill versions: Version history for skills
 CREATE TABLE IF NOT EXISTS skill_versions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    skill_id UUID REFERENCES skills(id) ON DELETE CASCADE,
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
+    skill_id UUID NOT NULL,
     version VARCHAR(50) NOT NULL,
     content TEXT NOT NULL,
     change_summary TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    FOREIGN KEY (namespace, skill_id) REFERENCES skills(namespace, id) ON DELETE CASCADE
 );
 
 -- Skill references: Internal references within skills (to other skills, external resources)
 CREATE TABLE IF NOT EXISTS skill_references (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    skill_id UUID REFERENCES skills(id) ON DELETE CASCADE,
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
+    skill_id UUID NOT NULL,
     ref_type VARCHAR(50) NOT NULL,  -- 'internal_skill', 'external_url', 'file_reference'
     ref_target VARCHAR(512) NOT NULL,
     ref_description TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    FOREIGN KEY (namespace, skill_id) REFERENCES skills(namespace, id) ON DELETE CASCADE
 );
 
--- Indexes for semantic search
+-- Registry state: Small per-namespace key/value store (e.g. last indexed git commit)
+CREATE TABLE IF NOT EXISTS registry_state (
+    namespace VARCHAR(40) NOT NULL DEFAULT 'default',
+    key VARCHAR(255) NOT NULL,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (namespace, key)
+);
+
+-- Indexes for semantic search (defined on the partitioned parents, so every
+-- namespace partition gets its own ANN index)
 CREATE INDEX IF NOT EXISTS idx_skills_embedding ON skills 
     USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
 CREATE INDEX IF NOT EXISTS idx_documents_embedding ON documents 
     USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
--- Indexes for common queries
-CREATE INDEX IF NOT EXISTS idx_skills_name ON skills(name);
+-- Indexes for common queries (name and path lookups use the UNIQUE constraints)
+CREATE INDEX IF NOT EXISTS idx_skills_path ON skills(namespace, path);
 CREATE INDEX IF NOT EXISTS idx_skills_updated ON skills(updated_at DESC);
-CREATE INDEX IF NOT EXISTS idx_documents_path ON documents(path);
 CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
-CREATE INDEX IF NOT EXISTS idx_skill_versions_skill ON skill_versions(skill_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_skill_versions_skill ON skill_versions(namespace, skill_id, created_at DESC);
+
+-- Function: Create a namespace's partitions (idempotent)
+CREATE OR REPLACE FUNCTION create_namespace(ns TEXT)
+RETURNS VOID AS $$
+DECLARE
+    parent TEXT;
+BEGIN
+    -- Partition names embed the namespace, so keep it a plain identifier
+    IF ns !~ '^[a-z][a-z0-9_]{0,39}$' THEN
+        RAISE EXCEPTION 'Invalid namespace "%": use lowercase letters, digits and underscores', ns;
+    END IF;
+    
+    FOREACH parent IN ARRAY ARRAY['skills', 'documents', 'skill_sources'] LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES IN (%L)',
+            parent || '_' || ns, parent, ns
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_namespace('default');
 
 -- Function: Update timestamp trigger
 CREATE OR REPLACE FUNCTION update_updated_at()
@@ -101,7 +151,8 @@ CREATE TRIGGER documents_updated_at
 CREATE OR REPLACE FUNCTION search_skills(
     query_embedding vector(1536),
     match_threshold FLOAT DEFAULT 0.7,
-    match_count INT DEFAULT 10
+    match_count INT DEFAULT 10,
+    match_namespace TEXT DEFAULT 'default'
 )
 RETURNS TABLE (
     id UUID,
@@ -119,7 +170,8 @@ BEGIN
         s.path,
         1 - (s.embedding <=> query_embedding) AS similarity
     FROM skills s
-    WHERE s.embedding IS NOT NULL
+    WHERE s.namespace = match_namespace
+      AND s.embedding IS NOT NULL
       AND 1 - (s.embedding <=> query_embedding) > match_threshold
     ORDER BY s.embedding <=> query_embedding
     LIMIT match_count;
@@ -130,7 +182,8 @@ $$ LANGUAGE plpgsql;
 CREATE OR REPLACE FUNCTION search_documents(
     query_embedding vector(1536),
     match_threshold FLOAT DEFAULT 0.7,
-    match_count INT DEFAULT 10
+    match_count INT DEFAULT 10,
+    match_namespace TEXT DEFAULT 'default'
 )
 RETURNS TABLE (
     id UUID,
@@ -148,7 +201,8 @@ BEGIN
         d.doc_type,
         1 - (d.embedding <=> query_embedding) AS similarity
     FROM documents d
-    WHERE d.embedding IS NOT NULL
+    WHERE d.namespace = match_namespace
+      AND d.embedding IS NOT NULL
       AND 1 - (d.embedding <=> query_embedding) > match_threshold
     ORDER BY d.embedding <=> query_embedding
     LIMIT match_count;
@@ -158,7 +212,8 @@ $$ LANGUAGE plpgsql;
 -- Function: Find related skills for a document
 CREATE OR REPLACE FUNCTION find_related_skills(
     doc_embedding vector(1536),
-    match_threshold FLOAT DEFAULT 0.7
+    match_threshold FLOAT DEFAULT 0.7,
+    match_namespace TEXT DEFAULT 'default'
 )
 RETURNS TABLE (
     skill_id UUID,
@@ -172,7 +227,8 @@ BEGIN
         s.name,
         1 - (s.embedding <=> doc_embedding) AS similarity
     FROM skills s
-    WHERE s.embedding IS NOT NULL
+    WHERE s.namespace = match_namespace
+      AND s.embedding IS NOT NULL
       AND 1 - (s.embedding <=> doc_embedding) > match_threshold
     ORDER BY s.embedding <=> doc_embedding;
 END;
@@ -181,6 +237,7 @@ $$ LANGUAGE plpgsql;
 -- View: Skills with source count
 CREATE OR REPLACE VIEW skills_with_sources AS
 SELECT 
+    s.namespace,
     s.id,
     s.name,
     s.description,
@@ -189,12 +246,13 @@ SELECT
     s.updated_at,
     COUNT(ss.document_id) AS source_count
 FROM skills s
-LEFT JOIN skill_sources ss ON s.id = ss.skill_id
-GROUP BY s.id;
+LEFT JOIN skill_sources ss ON s.namespace = ss.namespace AND s.id = ss.skill_id
+GROUP BY s.namespace, s.id;
 
 -- View: Documents with skill count
 CREATE OR REPLACE VIEW documents_with_skills AS
 SELECT 
+    d.namespace,
     d.id,
     d.title,
     d.path,
@@ -202,6 +260,6 @@ SELECT
     d.updated_at,
     COUNT(ss.skill_id) AS skill_count
 FROM documents d
-LEFT JOIN skill_sources ss ON d.id = ss.document_id
-GROUP BY d.id;
+LEFT JOIN skill_sources ss ON d.namespace = ss.namespace AND d.id = ss.document_id
+GROUP BY d.namespace, d.id;
 
@@ -0,0 +1,33 @@
+-- Migration: Namespace-partitioned registry tables
+-- Run this once on databases created before namespaces, then re-run
+-- scripts/init_db.py: it creates the partitioned tables and restores the
+-- saved rows into the 'default' namespace.
+
+BEGIN;
+
+-- Databases from before incremental indexing have no registry_state yet
+CREATE TABLE IF NOT EXISTS registry_state (
+    key VARCHAR(255) PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Keep the data; the old tables, their indexes and dependents are replaced
+CREATE TABLE legacy_skills AS TABLE skills;
+CREATE TABLE legacy_documents AS TABLE documents;
+CREATE TABLE legacy_skill_sources AS TABLE skill_sources;
+CREATE TABLE legacy_skill_versions AS TABLE skill_versions;
+CREATE TABLE legacy_skill_references AS TABLE skill_references;
+CREATE TABLE legacy_registry_state AS TABLE registry_state;
+
+DROP VIEW IF EXISTS skills_with_sources;
+DROP VIEW IF EXISTS documents_with_skills;
+
+-- The search functions gain a namespace argument; drop the old signatures
+DROP FUNCTION IF EXISTS search_skills(vector, FLOAT, INT);
+DROP FUNCTION IF EXISTS search_documents(vector, FLOAT, INT);
+DROP FUNCTION IF EXISTS find_related_skills(vector, FLOAT);
+
+DROP TABLE skill_references, skill_versions, skill_sources, documents, skills, registry_state;
+
+COMMIT;
@@ -12,6 +12,7 @@ This is the entry point for the agent workflow.
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+from .config import REGISTRY_NAMESPACE
 from .registry import (
     SkillRegistry, 
     parse_skill_frontmatter, 
@@ -29,8 +30,8 @@ class AgentKnowledgeInterface:
     3. Agent creates new skill or updates existing skills
     """
     
-    def __init__(self):
-        self.registry = SkillRegistry()
+    def __init__(self, namespace: str = REGISTRY_NAMESPACE):
+        self.registry = SkillRegistry(namespace=namespace)
     
     def analyze_document(
         self, 
@@ -190,24 +191,15 @@ class AgentKnowledgeInterface:
         
         Useful for agents to understand the full context of a skill.
         """
-        skill = self.registry.get_skill(skill_name)
-        if not skill:
-            return None
-        
-        sources = self.registry.get_skill_sources(str(skill["id"]))
-        versions = self.registry.get_skill_versions(str(skill["id"]))
-        
-        return {
-            **skill,
-            "sources": [dict(s) for s in sources],
-            "versions": [dict(v) for v in versions]
-        }
+        return self.registry.get_skill_with_sources(skill_name)
     
     def search(
         self, 
         query: str, 
         search_type: str = "all",
-        limit: int = 10
+        limit: int = 10,
+        mmr_lambda: Optional[float] = None,
+        sources_per_skill: int = 0
     ) -> Dict:
         """
         Unified semantic search interface.
@@ -216,6 +208,9 @@ class AgentKnowledgeInterface:
             query: Natural language query
             search_type: "skills", "docs", or "all"
             limit: Maximum results per type
+            mmr_lambda: Optional MMR trade-off to diversify results
+            sources_per_skill: If > 0, attach each skill's top source
+                documents (fetched in the same query)
             
         Returns:
             {"skills": [...], "documents": [...]}
@@ -223,10 +218,20 @@ class AgentKnowledgeInterface:
         results = {"skills": [], "documents": []}
         
         if search_type in ["skills", "all"]:
-            results["skills"] = self.registry.search_skills(query, limit=limit)
+            if sources_per_skill:
+                results["skills"] = self.registry.search_skills_expanded(
+                    query, limit=limit, sources_per_skill=sources_per_skill,
+                    mmr_lambda=mmr_lambda
+                )
+            else:
+                results["skills"] = self.registry.search_skills(
+                    query, limit=limit, mmr_lambda=mmr_lambda
+                )
         
         if search_type in ["docs", "all"]:
-            results["documents"] = self.registry.search_documents(query, limit=limit)
+            results["documents"] = self.registry.search_documents(
+                query, limit=limit, mmr_lambda=mmr_lambda
+            )
         
         return results
     
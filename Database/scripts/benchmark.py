@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Semantic Knowledge Registry on a synthetic corpus.
+
+Generates deterministic skills and documents, loads them through the bulk
+upsert path using the offline hashing embedder, then measures latency
+percentiles and throughput for the registry API and recall of each ANN
+index setting against exact (sequential scan) search.
+
+Run this against a scratch database. Synthetic rows use the "bench-" name
+and "bench/" path prefixes and are deleted afterwards unless --keep is set.
+ANN index variants are built inside transactions that are rolled back, so
+the schema is left untouched.
+
+Usage:
+    python scripts/benchmark.py --skills 1000 --docs 10000
+    python scripts/benchmark.py --docs 100000 --probes 1,10,40 --output bench.json
+    python scripts/benchmark.py --docs 1000000 --index ivfflat hnsw --ef-search 40,100
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Sequence
+
+from .config import EMBEDDING_DIMENSION
+from .db import get_cursor, execute_query
+from .embeddings import set_embedding_provider, generate_embeddings_batch
+from .registry import SkillRegistry
+from .collect import batched
+
+BENCH_NAME_PREFIX = "bench-"
+BENCH_PATH_PREFIX = "bench/"
+
+# Tables with an embedding column and the registry method searching them
+SEARCH_TABLES = {
+    "skills": "search_skills",
+    "documents": "search_documents",
+}
+
+
+# -----------------------------------------------------------------------------
+# Synthetic corpus
+# -----------------------------------------------------------------------------
+
+class SyntheticCorpus:
+    """
+    Deterministic topic-clustered text generator.
+
+    Every item is drawn from one topic's vocabulary plus shared filler
+    words, so the hashing embedder produces clusters similar to what
+    real skills/docs look like to an embedding model.
+    """
+
+    def __init__(self, seed: int = 42, topics: int = 200, words_per_topic: int = 40):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.filler = [f"common{i}" for i in range(300)]
+        self.topics = [
+            [f"t{t}w{rng.randrange(10_000)}" for _ in range(words_per_topic)]
+            for t in range(topics)
+        ]
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        topic = rng.choice(self.topics)
+        topical = rng.choices(topic, k=words * 2 // 3)
+        filler = rng.choices(self.filler, k=words - len(topical))
+        tokens = topical + filler
+        rng.shuffle(tokens)
+        return " ".join(tokens)
+
+    def skills(self, count: int) -> Iterator[Dict]:
+        """Yield upsert_skill keyword dicts."""
+        rng = random.Random(self.seed + 1)
+        for i in range(count):
+            name = f"{BENCH_NAME_PREFIX}skill-{i}"
+            yield {
+                "name": name,
+                "description": self._text(rng, 15),
+                "content": f"# {name}\n\n{self._text(rng, 120)}",
+                "path": f"{BENCH_PATH_PREFIX}skills/{name}/SKILL.md",
+                "author": "benchmark",
+            }
+
+    def documents(self, count: int) -> Iterator[Dict]:
+        """Yield upsert_document keyword dicts."""
+        rng = random.Random(self.seed + 2)
+        for i in range(count):
+            yield {
+                "title": f"Bench document {i}",
+                "content": self._text(rng, 200),
+                "path": f"{BENCH_PATH_PREFIX}docs/doc-{i}.md",
+                "doc_type": rng.choice(["research", "blog", "reference", "case_study"]),
+            }
+
+    def queries(self, count: int) -> List[str]:
+        """Short natural-language-like queries drawn from the topics."""
+        rng = random.Random(self.seed + 3)
+        return [self._text(rng, 8) for _ in range(count)]
+
+
+def log(message: str, **kwargs) -> None:
+    """Progress output goes to stderr so stdout stays valid JSON."""
+    print(message, file=sys.stderr, **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# Measurement helpers
+# -----------------------------------------------------------------------------
+
+def summarize(samples: Sequence[float]) -> Dict:
+    """Latency percentiles (ms) and throughput for per-call timings in seconds."""
+    if not samples:
+        return {"calls": 0}
+
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": ordered[-1] * 1000,
+        "throughput_per_s": len(ordered) / total if total else None,
+    }
+
+
+def time_calls(fn: Callable, args_list: Sequence[tuple]) -> List[float]:
+    """Call fn once per argument tuple and return each call's duration."""
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# -----------------------------------------------------------------------------
+# Benchmark stages
+# -----------------------------------------------------------------------------
+
+def load_corpus(
+    registry: SkillRegistry,
+    corpus: SyntheticCorpus,
+    n_skills: int,
+    n_docs: int,
+    batch_size: int
+) -> Dict:
+    """Bulk-load the synthetic corpus and report rows/s per table."""
+    results = {}
+
+    for label, items, upsert in (
+        ("skills", corpus.skills(n_skills), registry.bulk_upsert_skills),
+        ("documents", corpus.documents(n_docs), registry.bulk_upsert_documents),
+    ):
+        start = time.perf_counter()
+        written = 0
+        for batch in batched(items, batch_size):
+            written += upsert(batch)
+            log(f"  Loaded {written} {label}", end="\r")
+        elapsed = time.perf_counter() - start
+        log(f"  Loaded {written} {label} in {elapsed:.1f}s")
+
+        results[label] = {
+            "rows": written,
+            "seconds": elapsed,
+            "rows_per_s": written / elapsed if elapsed else None,
+        }
+
+    return results
+
+
+def benchmark_api(
+    registry: SkillRegistry,
+    corpus: SyntheticCorpus,
+    queries: List[str],
+    iterations: int,
+    limit: int
+) -> Dict:
+    """Time the public registry methods end to end."""
+    results = {}
+
+    for table, method in SEARCH_TABLES.items():
+        search = getattr(registry, method)
+        log(f"  {method} x{len(queries)}")
+        results[method] = summarize(time_calls(
+            lambda q: search(q, threshold=0.0, limit=limit),
+            [(q,) for q in queries]
+        ))
+
+    # Fresh names/paths so every call is a real write, not a hash skip
+    skills = [
+        dict(s, name=f"{s['name']}-upsert", path=f"{s['path']}.upsert")
+        for s in corpus.skills(iterations)
+    ]
+    log(f"  upsert_skill x{iterations}")
+    results["upsert_skill"] = summarize(time_calls(
+        lambda s: registry.upsert_skill(**s), [(s,) for s in skills]
+    ))
+
+    docs = [dict(d, path=f"{d['path']}.upsert") for d in corpus.documents(iterations)]
+    log(f"  upsert_document x{iterations}")
+    results["upsert_document"] = summarize(time_calls(
+        lambda d: registry.upsert_document(**d), [(d,) for d in docs]
+    ))
+
+    log(f"  get_stats x{iterations}")
+    results["get_stats"] = summarize(time_calls(registry.get_stats, [()] * iterations))
+
+    return results
+
+
+def _embedding_indexes(cur, table: str) -> List[str]:
+    """Names of the ANN indexes on table.embedding."""
+    cur.execute(
+        """
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = %s
+          AND (indexdef ILIKE '%%USING ivfflat%%' OR indexdef ILIKE '%%USING hnsw%%')
+        """,
+        (table,)
+    )
+    return [r["indexname"] for r in cur.fetchall()]
+
+
+def _top_k(cur, table: str, namespace: str, embeddings: List[List[float]], k: int):
+    """Run one nearest-neighbour query per embedding, returning ids and timings."""
+    ids, timings = [], []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        cur.execute(
+            f"""
+            SELECT id FROM {table}
+            WHERE namespace = %s
+              AND embedding IS NOT NULL
+            ORDER BY embedding <=> %s::vector
+            LIMIT %s
+            """,
+            (namespace, embedding, k)
+        )
+        rows = cur.fetchall()
+        timings.append(time.perf_counter() - start)
+        ids.append({r["id"] for r in rows})
+    return ids, timings
+
+
+def _recall(truth: List[set], found: List[set], k: int) -> float:
+    hits = sum(len(t & f) for t, f in zip(truth, found))
+    expected = sum(min(k, len(t)) for t in truth)
+    return hits / expected if expected else 1.0
+
+
+def benchmark_recall(
+    table: str,
+    namespace: str,
+    embeddings: List[List[float]],
+    k: int,
+    index_specs: Dict[str, Dict]
+) -> List[Dict]:
+    """
+    Measure recall@k and latency of ANN index settings against exact search.
+
+    Each index variant is created in its own transaction (after dropping the
+    table's existing ANN indexes) and rolled back when measured.
+    """
+    results = []
+
+    with get_cursor(commit=False) as cur:
+        cur.execute("SET LOCAL enable_indexscan = off")
+        truth, timings = _top_k(cur, table, namespace, embeddings, k)
+        cur.connection.rollback()
+    results.append({
+        "table": table, "index": "exact", "setting": None,
+        "recall_at_k": 1.0, "latency": summarize(timings),
+    })
+    log(f"  {table} exact: p50 {results[-1]['latency']['p50_ms']:.2f}ms")
+
+    for method, spec in index_specs.items():
+        with get_cursor(commit=False) as cur:
+            for name in _embedding_indexes(cur, table):
+                cur.execute(f"DROP INDEX {name}")
+
+            start = time.perf_counter()
+            cur.execute(
+                f"CREATE INDEX bench_{table}_{method} ON {table} "
+                f"USING {method} (embedding vector_cosine_ops) WITH ({spec['with']})"
+            )
+            build_seconds = time.perf_counter() - start
+
+            for value in spec["sweep"]:
+                cur.execute("SELECT set_config(%s, %s, true)", (spec["param"], str(value)))
+                found, timings = _top_k(cur, table, namespace, embeddings, k)
+                results.append({
+                    "table": table,
+                    "index": f"{method} ({spec['with']})",
+                    "setting": f"{spec['param']}={value}",
+                    "build_seconds": build_seconds,
+                    "recall_at_k": _recall(truth, found, k),
+                    "latency": summarize(timings),
+                })
+                log(
+                    f"  {table} {method} {spec['param']}={value}: "
+                    f"recall@{k} {results[-1]['recall_at_k']:.3f}, "
+                    f"p50 {results[-1]['latency']['p50_ms']:.2f}ms"
+                )
+
+            # Roll back the DROP/CREATE so the schema is unchanged
+            cur.connection.rollback()
+
+    return results
+
+
+def cleanup(namespace: str) -> None:
+    """Delete all synthetic benchmark rows from a namespace."""
+    with get_cursor() as cur:
+        cur.execute(
+            "DELETE FROM skills WHERE namespace = %s AND name LIKE %s",
+            (namespace, BENCH_NAME_PREFIX + "%")
+        )
+        cur.execute(
+            "DELETE FROM documents WHERE namespace = %s AND path LIKE %s",
+            (namespace, BENCH_PATH_PREFIX + "%")
+        )
+
+
+def environment_info() -> Dict:
+    """Server and extension versions for the results file."""
+    server = execute_query("SHOW server_version")[0]["server_version"]
+    vector = execute_query(
+        "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+    )
+    return {
+        "postgres": server,
+        "pgvector": vector[0]["extversion"] if vector else None,
+        "embedding_dimension": EMBEDDING_DIMENSION,
+        "embedding_provider": "hashing",
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the registry on a synthetic corpus"
+    )
+    parser.add_argument("--skills", type=int, default=1000, help="Synthetic skills to load")
+    parser.add_argument("--docs", type=int, default=10000, help="Synthetic documents to load")
+    parser.add_argument("--queries", type=int, default=100, help="Search queries per measurement")
+    parser.add_argument("--iterations", type=int, default=100, help="Calls per write/stats measurement")
+    parser.add_argument("--limit", type=int, default=10, help="k for search and recall@k")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk upsert")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus generator seed")
+    parser.add_argument(
+        "--index",
+        nargs="+",
+        choices=["ivfflat", "hnsw"],
+        default=["ivfflat"],
+        help="ANN index types to evaluate"
+    )
+    parser.add_argument("--lists", type=int, default=100, help="ivfflat lists")
+    parser.add_argument("--probes", type=_int_list, default=[1, 5, 10, 20], help="ivfflat.probes values")
+    parser.add_argument("--hnsw-m", type=int, default=16, help="hnsw m")
+    parser.add_argument("--ef-construction", type=int, default=64, help="hnsw ef_construction")
+    parser.add_argument("--ef-search", type=_int_list, default=[40, 100, 200], help="hnsw.ef_search values")
+    parser.add_argument("--skip-load", action="store_true", help="Reuse rows from a previous --keep run")
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic rows after the run")
+    parser.add_argument("--output", help="Write results JSON to this file (default: stdout)")
+
+    args = parser.parse_args()
+
+    set_embedding_provider("hashing")
+    corpus = SyntheticCorpus(seed=args.seed)
+
+    log("Connecting to database...")
+    registry = SkillRegistry()
+
+    index_specs = {}
+    if "ivfflat" in args.index:
+        index_specs["ivfflat"] = {
+            "with": f"lists = {args.lists}",
+            "param": "ivfflat.probes",
+            "sweep": args.probes,
+        }
+    if "hnsw" in args.index:
+        index_specs["hnsw"] = {
+            "with": f"m = {args.hnsw_m}, ef_construction = {args.ef_construction}",
+            "param": "hnsw.ef_search",
+            "sweep": args.ef_search,
+        }
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "skills": args.skills,
+            "documents": args.docs,
+            "queries": args.queries,
+            "iterations": args.iterations,
+            "k": args.limit,
+            "seed": args.seed,
+        },
+        "environment": environment_info(),
+    }
+
+    try:
+        if not args.skip_load:
+            log("\nLoading synthetic corpus...")
+            report["load"] = load_corpus(
+                registry, corpus, args.skills, args.docs, args.batch_size
+            )
+
+        queries = corpus.queries(args.queries)
+
+        log("\nBenchmarking registry API...")
+        report["operations"] = benchmark_api(
+            registry, corpus, queries, args.iterations, args.limit
+        )
+
+        log("\nMeasuring ANN recall...")
+        query_embeddings = generate_embeddings_batch(queries)
+        report["recall"] = []
+        for table in SEARCH_TABLES:
+            report["recall"].extend(
+                benchmark_recall(
+                    table, registry.namespace, query_embeddings, args.limit, index_specs
+                )
+            )
+    finally:
+        if not args.keep:
+            log("\nRemoving synthetic rows...")
+            cleanup(registry.namespace)
+
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        log(f"\nResults written to {args.output}")
+    else:
+        print(output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Collection phase of indexing: read and parse markdown files into records.
+
+Parsing (file I/O, YAML frontmatter, title extraction) runs on a process
+pool for large trees and yields compact records in input order, so the
+embedding stage can consume them as a stream of batches.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .config import SKILLS_DIR, DOCS_DIR, INDEX_WORKERS
+from .registry import parse_skill_frontmatter, extract_title_from_markdown, scan_markdown
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+_VERSION_RE = re.compile(r'\*\*Version\*\*:\s*(\d+\.\d+\.\d+)')
+
+
+def infer_doc_type(doc_file: Path, title: str) -> str:
+    """Infer a document type from its path and title."""
+    if "blog" in doc_file.name.lower() or "blog" in title.lower():
+        return "blog"
+    if "case" in doc_file.name.lower():
+        return "case_study"
+    if "reference" in doc_file.name.lower() or "reference" in str(doc_file.parent).lower():
+        return "reference"
+    return "research"
+
+
+def parse_document_file(doc_file: Path) -> Dict:
+    """
+    Build a bulk_upsert_documents record for a docs/ markdown file.
+    
+    Parse failures are returned as {"path", "error"} instead of raised,
+    so one bad file does not stop a pool.
+    """
+    path = str(doc_file.relative_to(DOCS_DIR.parent))
+    try:
+        content = doc_file.read_text()
+        filename_title = doc_file.stem.replace('_', ' ').replace('-', ' ').title()
+        frontmatter, title = scan_markdown(content, fallback_title=filename_title)
+        
+        return {
+            "title": title,
+            "content": content,
+            "path": path,
+            # Fallback: infer from path or filename
+            "doc_type": frontmatter.get("doc_type") or infer_doc_type(doc_file, title),
+            "description": frontmatter.get("description", ""),
+            "source_url": frontmatter.get("source_url", "No"),
+        }
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
+def parse_skill_dir(skill_dir: Path) -> Optional[Dict]:
+    """
+    Build an upsert_skill record (plus its reference documents) for a skill directory.
+    
+    Returns None when the directory has no SKILL.md.
+    """
+    skill_file = skill_dir / "SKILL.md"
+    if not skill_file.exists():
+        return None
+    
+    path = str(skill_file.relative_to(SKILLS_DIR.parent))
+    try:
+        content = skill_file.read_text()
+        frontmatter = parse_skill_frontmatter(content)
+        name = frontmatter.get("name", skill_dir.name)
+        
+        # Extract version from content if present
+        match = _VERSION_RE.search(content)
+        
+        references = []
+        refs_dir = skill_dir / "references"
+        if refs_dir.exists():
+            for ref_file in sorted(refs_dir.glob("*.md")):
+                references.append(parse_reference_file(ref_file, name))
+        
+        return {
+            "name": name,
+            "description": frontmatter.get("description", ""),
+            "content": content,
+            "path": path,
+            "version": match.group(1) if match else "1.0.0",
+            "author": frontmatter.get("author", "Agent Skills Contributors"),
+            "references": references,
+        }
+    except Exception as e:
+        return {"name": skill_dir.name, "path": path, "error": str(e)}
+
+
+def parse_reference_file(ref_file: Path, skill_name: str) -> Dict:
+    """Build an upsert_document record for a file in a skill's references/ directory."""
+    content = ref_file.read_text()
+    return {
+        "title": f"{skill_name}: {extract_title_from_markdown(content)}",
+        "content": content,
+        "path": str(ref_file.relative_to(SKILLS_DIR.parent)),
+        "doc_type": "reference",
+    }
+
+
+def collect_records(
+    items: List,
+    parse: Callable,
+    workers: int = INDEX_WORKERS
+) -> Iterator[Dict]:
+    """
+    Yield parse(item) for every item, in order, skipping None results.
+    
+    Uses a process pool when there are enough items to amortize it;
+    workers=0 means one per CPU, workers=1 forces serial parsing.
+    """
+    workers = workers or os.cpu_count() or 1
+    
+    if workers == 1 or len(items) < PARALLEL_MIN_FILES:
+        for record in map(parse, items):
+            if record is not None:
+                yield record
+        return
+    
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for record in pool.map(parse, items, chunksize=chunksize):
+            if record is not None:
+                yield record
+
+
+def batched(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Group a record stream into lists of at most size records."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
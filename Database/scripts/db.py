@@ -1,48 +1,239 @@
 """Database connection and utilities."""
 
+import itertools
+import re
+import threading
+import time
 from contextlib import contextmanager
-from typing import Generator, Optional, Any
+from typing import Dict, Generator, Optional, Any, Sequence, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import connection as PGConnection, TRANSACTION_STATUS_IDLE
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from pgvector.psycopg2 import register_vector
 
-from .config import DATABASE_URL
+from .config import DATABASE_URL, DB_POOL_MAX, DATABASE_REPLICA_URLS, REPLICA_STICKY_SECONDS
+from .instrumentation import span, increment
 
+# One pool (and slot semaphore) per server URL once init_pool() has run
+_pools: Dict[str, ThreadedConnectionPool] = {}
+_pool_slots: Dict[str, threading.BoundedSemaphore] = {}
 
-def get_connection():
+# Read-only operations rotate over the replicas
+_replicas = itertools.cycle(DATABASE_REPLICA_URLS) if DATABASE_REPLICA_URLS else None
+
+# Per-thread time of the last write, for read-your-writes routing
+_session = threading.local()
+
+
+class _PooledConnection(PGConnection):
+    """Connection that remembers its pgvector registration and prepared statements."""
+    vector_registered = False
+    prepared: Optional[set] = None
+
+
+def get_connection(url: str = DATABASE_URL):
     """Get a database connection with pgvector support."""
-    conn = psycopg2.connect(DATABASE_URL)
-    register_vector(conn)
+    with span("db.connect"):
+        conn = psycopg2.connect(url)
+        register_vector(conn)
     return conn
 
 
-@contextmanager
-def get_cursor(commit: bool = True) -> Generator[RealDictCursor, None, None]:
-    """Context manager for database operations."""
-    conn = get_connection()
+def init_pool(minconn: int = 1, maxconn: int = DB_POOL_MAX) -> None:
+    """
+    Reuse connections across get_cursor() calls in this process.
+    
+    Meant for long-lived processes (the search server); one-shot CLIs keep
+    the default connect-per-operation behaviour. The primary and every
+    replica get their own pool; callers block while all maxconn
+    connections to a server are checked out.
+    """
+    if _pools:
+        return
+    with span("db.init_pool"):
+        for url in [DATABASE_URL, *DATABASE_REPLICA_URLS]:
+            _pools[url] = ThreadedConnectionPool(
+                minconn, maxconn, url, connection_factory=_PooledConnection
+            )
+            _pool_slots[url] = threading.BoundedSemaphore(maxconn)
+
+
+def close_pool() -> None:
+    """Close all pooled connections and return to connect-per-operation."""
+    for pool in _pools.values():
+        pool.closeall()
+    _pools.clear()
+    _pool_slots.clear()
+
+
+def _route(read_only: bool) -> str:
+    """
+    Server URL for an operation.
+    
+    Reads go to a replica unless this thread wrote within the last
+    REPLICA_STICKY_SECONDS, so it always sees its own writes.
+    """
+    if not read_only or _replicas is None:
+        return DATABASE_URL
+    last_write = getattr(_session, "last_write", None)
+    if last_write is not None and time.monotonic() - last_write < REPLICA_STICKY_SECONDS:
+        increment("db.read_your_writes")
+        return DATABASE_URL
+    return next(_replicas)
+
+
+def _acquire_connection(url: str = DATABASE_URL):
+    pool = _pools.get(url)
+    if pool is None:
+        return get_connection(url)
+    
+    slots = _pool_slots[url]
+    slots.acquire()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        yield cursor
-        if commit:
-            conn.commit()
+        conn = pool.getconn()
     except Exception:
-        conn.rollback()
+        slots.release()
         raise
-    finally:
-        cursor.close()
+    
+    if not conn.vector_registered:
+        with span("db.connect"):
+            register_vector(conn)
+        conn.vector_registered = True
+        conn.prepared = set()
+    else:
+        increment("db.pool_reuse")
+    return conn
+
+
+def _release_connection(conn, url: str = DATABASE_URL) -> None:
+    pool = _pools.get(url)
+    if pool is None:
         conn.close()
+        return
+    
+    try:
+        if conn.closed:
+            pool.putconn(conn, close=True)
+            return
+        # Never hand out a connection with an open transaction
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        pool.putconn(conn)
+    finally:
+        _pool_slots[url].release()
+
+
+def _connect(read_only: bool) -> Tuple[Any, str]:
+    """Acquire a connection for an operation, falling back to the primary if a replica is down."""
+    url = _route(read_only)
+    try:
+        return _acquire_connection(url), url
+    except psycopg2.OperationalError:
+        if url == DATABASE_URL:
+            raise
+        increment("db.replica_fallback")
+        return _acquire_connection(DATABASE_URL), DATABASE_URL
+
+
+@contextmanager
+def get_cursor(commit: bool = True, read_only: bool = False) -> Generator[RealDictCursor, None, None]:
+    """
+    Context manager for database operations.
+    
+    read_only=True allows routing to a read replica; everything else runs
+    on the primary and counts as a write for read-your-writes.
+    """
+    with span("db.get_cursor") as s:
+        conn, url = _connect(read_only)
+        s.set(replica=url != DATABASE_URL)
+        cursor = None
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            yield cursor
+            if commit:
+                conn.commit()
+                if not read_only:
+                    _session.last_write = time.monotonic()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if cursor is not None and not cursor.closed:
+                cursor.close()
+            _release_connection(conn, url)
 
 
 def execute_query(
     query: str,
     params: Optional[tuple] = None,
-    fetch: bool = True
+    fetch: bool = True,
+    read_only: bool = False
 ) -> list:
     """Execute a query and optionally fetch results."""
-    with get_cursor() as cur:
+    with span("db.execute_query") as s, get_cursor(read_only=read_only) as cur:
         cur.execute(query, params)
         if fetch:
-            return cur.fetchall()
+            rows = cur.fetchall()
+            s.set(rows=len(rows))
+            return rows
+        s.set(rows=cur.rowcount)
+        return []
+
+
+_POSITIONAL_PARAM_RE = re.compile(r"\$(\d+)")
+
+
+class PreparedStatement:
+    """
+    A hot query run as a server-side prepared statement.
+    
+    sql uses $1, $2, ... placeholders whose SQL types are given by
+    arg_types. Pooled connections PREPARE it once and from then on send
+    only EXECUTE with the arguments, skipping parsing and planning.
+    One-shot connections run it as an ordinary query.
+    """
+    
+    def __init__(self, name: str, sql: str, arg_types: Sequence[str]):
+        self.name = name
+        self.arg_types = tuple(arg_types)
+        self.prepare_sql = f"PREPARE {name} ({', '.join(self.arg_types)}) AS {sql}"
+        self.execute_sql = f"EXECUTE {name} ({', '.join(f'%s::{t}' for t in self.arg_types)})"
+        self.plain_sql = _POSITIONAL_PARAM_RE.sub(
+            lambda m: f"%s::{self.arg_types[int(m.group(1)) - 1]}",
+            sql.replace("%", "%%")
+        )
+        self._plain_order = [int(n) - 1 for n in _POSITIONAL_PARAM_RE.findall(sql)]
+    
+    def plain_params(self, params: Sequence) -> tuple:
+        """Arguments for plain_sql, where a repeated $n needs its value repeated."""
+        return tuple(params[i] for i in self._plain_order)
+
+
+def execute_prepared(
+    statement: PreparedStatement,
+    params: Sequence,
+    fetch: bool = True,
+    read_only: bool = False
+) -> list:
+    """Execute a PreparedStatement, preparing it on this connection first if needed."""
+    with span("db.execute_prepared", statement=statement.name) as s, \
+            get_cursor(read_only=read_only) as cur:
+        prepared = getattr(cur.connection, "prepared", None)
+        if prepared is None:
+            cur.execute(statement.plain_sql, statement.plain_params(params))
+        else:
+            if statement.name not in prepared:
+                cur.execute(statement.prepare_sql)
+                prepared.add(statement.name)
+                increment("db.prepare")
+            cur.execute(statement.execute_sql, tuple(params))
+        if fetch:
+            rows = cur.fetchall()
+            s.set(rows=len(rows))
+            return rows
+        s.set(rows=cur.rowcount)
         return []
 
 
@@ -51,3 +242,18 @@ def execute_many(query: str, params_list: list) -> None:
     with get_cursor() as cur:
         cur.executemany(query, params_list)
 
+
+def bulk_execute(
+    query: str,
+    rows: list,
+    page_size: int = 500,
+    fetch: bool = False
+) -> list:
+    """
+    Execute a multi-row VALUES statement in one transaction.
+    
+    The query must contain a single "VALUES %s" placeholder; rows are sent
+    page_size at a time instead of one round trip per row.
+    """
+    with span("db.bulk_execute", rows=len(rows)), get_cursor() as cur:
+        return execute_values(cur, query, rows, page_size=page_size, fetch=fetch)
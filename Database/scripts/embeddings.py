@@ -1,16 +1,120 @@
 """Embedding generation utilities."""
 
 import hashlib
-from typing import List, Optional
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import numpy as np
 import tiktoken
 
 from openai import OpenAI
 
-from .config import OPENAI_API_KEY, EMBEDDING_MODEL, MAX_TOKENS_PER_CHUNK
+from .config import (
+    OPENAI_API_KEY,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_PROVIDER,
+    MAX_TOKENS_PER_CHUNK,
+)
+from .instrumentation import span, instrumented, increment
 
+EMBEDDING_PROVIDERS = ("openai", "hashing")
 
+_provider = EMBEDDING_PROVIDER
+
+# Optional LRU cache of text -> embedding (see enable_embedding_cache)
+_cache: Optional["OrderedDict[str, List[float]]"] = None
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+
+def set_embedding_provider(name: str) -> None:
+    """
+    Switch the embedding backend for this process.
+    
+    "openai" calls the embeddings API; "hashing" is a deterministic offline
+    embedder used for benchmarks and tests (no API key, no network).
+    """
+    global _provider
+    if name not in EMBEDDING_PROVIDERS:
+        raise ValueError(
+            f"Unknown embedding provider '{name}'. "
+            f"Choose one of: {', '.join(EMBEDDING_PROVIDERS)}"
+        )
+    _provider = name
+
+
+def get_embedding_provider() -> str:
+    """Return the name of the active embedding backend."""
+    return _provider
+
+
+def enable_embedding_cache(maxsize: int = 1024) -> None:
+    """
+    Memoize generate_embedding results in an in-process LRU cache.
+    
+    Useful for long-lived processes answering repeated queries; keys
+    include the provider and model so switching either never returns
+    stale vectors.
+    """
+    global _cache, _cache_size
+    with _cache_lock:
+        _cache = OrderedDict()
+        _cache_size = maxsize
+
+
+def _cache_key(text: str) -> str:
+    return f"{_provider}:{EMBEDDING_MODEL}:{content_hash(text)}"
+
+
+def _cache_get(key: str) -> Optional[List[float]]:
+    with _cache_lock:
+        embedding = _cache.get(key)
+        if embedding is not None:
+            _cache.move_to_end(key)
+        return embedding
+
+
+def _cache_put(key: str, embedding: List[float]) -> None:
+    with _cache_lock:
+        _cache[key] = embedding
+        _cache.move_to_end(key)
+        while len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str) -> Tuple[Tuple[int, float], ...]:
+    """Map a token to two signed buckets of the embedding vector."""
+    h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+    first = (h % EMBEDDING_DIMENSION, 1.0 if (h >> 32) & 1 else -1.0)
+    second = ((h >> 33) % EMBEDDING_DIMENSION, 1.0 if (h >> 63) & 1 else -1.0)
+    return first, second
+
+
+def hashing_embedding(text: str) -> List[float]:
+    """
+    Deterministic bag-of-words embedding via feature hashing.
+    
+    Texts sharing vocabulary get similar vectors, so similarity search
+    behaves realistically without calling an embedding API.
+    """
+    vector = np.zeros(EMBEDDING_DIMENSION, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        for bucket, sign in _token_features(token):
+            vector[bucket] += sign
+    
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+@lru_cache(maxsize=1)
 def get_embedding_client() -> OpenAI:
-    """Get configured OpenAI client for embeddings."""
+    """Get configured OpenAI client for embeddings (created once per process)."""
     if not OPENAI_API_KEY:
         raise ValueError(
             "OPENAI_API_KEY not set. "
@@ -19,12 +123,26 @@ def get_embedding_client() -> OpenAI:
     return OpenAI(api_key=OPENAI_API_KEY)
 
 
+def _create_embeddings(client: OpenAI, inputs) -> list:
+    """Call the embeddings API, recording latency and tokens consumed."""
+    with span("embeddings.api", texts=len(inputs) if isinstance(inputs, list) else 1) as s:
+        response = client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=inputs
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            s.set(tokens=usage.total_tokens)
+    return response.data
+
+
 def count_tokens(text: str, model: str = "cl100k_base") -> int:
     """Count tokens in text using tiktoken."""
     encoding = tiktoken.get_encoding(model)
     return len(encoding.encode(text))
 
 
+@instrumented("embeddings.chunk_text", result_attr="chunks")
 def chunk_text(
     text: str,
     max_tokens: int = MAX_TOKENS_PER_CHUNK,
@@ -65,30 +183,42 @@ def chunk_text(
     return chunks
 
 
+@instrumented("embeddings.generate_embedding", result_attr=None)
 def generate_embedding(text: str) -> List[float]:
     """
     Generate embedding for text.
     
     For long texts, chunks and averages embeddings.
     """
+    if _cache is None:
+        return _generate_embedding(text)
+    
+    key = _cache_key(text)
+    embedding = _cache_get(key)
+    if embedding is not None:
+        increment("embeddings.cache_hit")
+        return embedding
+    
+    increment("embeddings.cache_miss")
+    embedding = _generate_embedding(text)
+    _cache_put(key, embedding)
+    return embedding
+
+
+def _generate_embedding(text: str) -> List[float]:
+    if _provider == "hashing":
+        return hashing_embedding(text)
+    
     client = get_embedding_client()
     chunks = chunk_text(text)
     
     if len(chunks) == 1:
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
-        )
-        return response.data[0].embedding
+        return _create_embeddings(client, text)[0].embedding
     
     # Multiple chunks: embed each and average
     embeddings = []
     for chunk in chunks:
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=chunk
-        )
-        embeddings.append(response.data[0].embedding)
+        embeddings.append(_create_embeddings(client, chunk)[0].embedding)
     
     # Average the embeddings
     avg_embedding = [
@@ -99,8 +229,12 @@ def generate_embedding(text: str) -> List[float]:
     return avg_embedding
 
 
+@instrumented("embeddings.generate_embeddings_batch", result_attr="texts")
 def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
     """Generate embeddings for multiple texts in a batch."""
+    if _provider == "hashing":
+        return [hashing_embedding(text) for text in texts]
+    
     client = get_embedding_client()
     
     # Process texts that might need chunking
@@ -119,11 +253,7 @@ def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
     
     for i in range(0, len(all_chunks), batch_size):
         batch = all_chunks[i:i + batch_size]
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=batch
-        )
-        embeddings.extend([d.embedding for d in response.data])
+        embeddings.extend([d.embedding for d in _create_embeddings(client, batch)])
     
     # Reconstruct: average embeddings for texts with multiple chunks
     result = []
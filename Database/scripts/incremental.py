@@ -0,0 +1,283 @@
+"""
+Git-driven incremental indexing.
+
+The commit indexed last is kept in the registry_state table. An incremental
+run asks git which files under skills/ and docs/ changed since that commit
+and touches only those:
+
+    added / modified   re-parsed and upserted
+    renamed            path updated in place, keeping the embedding and links;
+                       re-embedded only when the content changed as well
+    deleted            removed from the registry
+
+so post-merge indexing costs are proportional to the diff, not the repo.
+Files are read from the working tree; run it on a clean checkout of the
+commit being indexed (as CI does after a merge).
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .config import PROJECT_ROOT, INDEX_BATCH_SIZE
+from .registry import SkillRegistry
+from .collect import batched, parse_document_file, parse_skill_dir, parse_reference_file
+
+# registry_state key holding the commit the registry was last indexed at
+LAST_COMMIT_KEY = "last_indexed_commit"
+
+INDEXED_ROOTS = ("skills", "docs")
+
+
+class Change(NamedTuple):
+    """One entry of git diff --name-status."""
+    status: str                     # "A", "M", "D" or "R"
+    path: str
+    old_path: Optional[str] = None  # Renames only
+    similarity: int = 100           # Renames only; 100 = content unchanged
+
+
+def git(*args: str) -> str:
+    """Run git in the project root and return its stdout."""
+    result = subprocess.run(
+        ["git", *args],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout
+
+
+def head_commit() -> Optional[str]:
+    """The checked-out commit, or None outside a git checkout."""
+    try:
+        return git("rev-parse", "HEAD").strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def diff_since(commit: str) -> List[Change]:
+    """
+    Changes under skills/ and docs/ between commit and HEAD.
+    
+    Raises subprocess.CalledProcessError when commit is not in the local
+    history (rewritten history, shallow clone).
+    """
+    output = git(
+        "diff", "--name-status", "-z", "-M", "--relative",
+        commit, "HEAD", "--", *INDEXED_ROOTS
+    )
+    fields = output.split("\0")
+    
+    changes = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        if status[0] == "R":
+            changes.append(Change("R", fields[i + 2], fields[i + 1], int(status[1:] or 100)))
+            i += 3
+        elif status[0] == "C":
+            # Copies are new files as far as the registry is concerned
+            changes.append(Change("A", fields[i + 2]))
+            i += 3
+        else:
+            # Type changes and unmerged entries are treated as modifications
+            changes.append(Change(status[0] if status[0] in "AD" else "M", fields[i + 1]))
+            i += 2
+    return changes
+
+
+def classify(path: Optional[str]) -> Optional[str]:
+    """
+    What a repo path is indexed as: "skill", "reference", "doc" or None.
+    
+    Mirrors index.py: skills/<name>/SKILL.md, skills/<name>/references/*.md
+    and any markdown file under docs/.
+    """
+    if not path or not path.endswith(".md"):
+        return None
+    parts = Path(path).parts
+    if parts[0] == "docs":
+        return "doc"
+    if parts[0] == "skills" and len(parts) == 3 and parts[2] == "SKILL.md":
+        return "skill"
+    if parts[0] == "skills" and len(parts) == 4 and parts[2] == "references":
+        return "reference"
+    return None
+
+
+def _delete(registry: SkillRegistry, path: str, kind: str) -> bool:
+    if kind == "skill":
+        return registry.delete_skill_by_path(path)
+    return registry.delete_document(path)
+
+
+def _rename(registry: SkillRegistry, change: Change, kind: str) -> bool:
+    if kind == "skill":
+        # Skills without a frontmatter name are named after their directory
+        record = parse_skill_dir(PROJECT_ROOT / Path(change.path).parent)
+        name = record["name"] if record and "error" not in record else None
+        return registry.rename_skill(change.old_path, change.path, name=name)
+    return registry.rename_document(change.old_path, change.path)
+
+
+def _index_skill(registry: SkillRegistry, path: str) -> bool:
+    record = parse_skill_dir(PROJECT_ROOT / Path(path).parent)
+    if record is None or "error" in record:
+        error = record["error"] if record else "SKILL.md not found"
+        print(f"  Error indexing {path}: {error}")
+        return False
+    
+    print(f"  Indexing skill: {record['name']}")
+    registry.upsert_skill(
+        name=record["name"],
+        description=record["description"],
+        content=record["content"],
+        path=record["path"],
+        version=record["version"],
+        author=record["author"],
+        generate_embedding_flag=True
+    )
+    return True
+
+
+def _index_reference(registry: SkillRegistry, path: str) -> bool:
+    skill_path = str(Path(*Path(path).parts[:2]) / "SKILL.md")
+    skill = registry.get_skill_by_path(skill_path)
+    if skill is None:
+        print(f"  Error indexing {path}: skill {skill_path} is not indexed")
+        return False
+    
+    ref_file = PROJECT_ROOT / path
+    if not ref_file.exists():
+        print(f"  Error indexing {path}: file not found")
+        return False
+    
+    record = parse_reference_file(ref_file, skill["name"])
+    print(f"  Indexing document: {record['title']}")
+    doc_id = registry.upsert_document(**record)
+    registry.link_skill_to_document(str(skill["id"]), doc_id, relevance=0.9)
+    return True
+
+
+def _index_documents(
+    registry: SkillRegistry,
+    paths: List[str],
+    force: bool,
+    batch_size: int
+) -> Dict[str, int]:
+    counts = {"indexed": 0, "errors": 0}
+    records = (parse_document_file(PROJECT_ROOT / path) for path in paths)
+    
+    for batch in batched(records, batch_size):
+        parsed = []
+        for record in batch:
+            if "error" in record:
+                print(f"  Error indexing {record['path']}: {record['error']}")
+                counts["errors"] += 1
+                continue
+            print(f"  Indexing document: {record['title']}")
+            parsed.append(record)
+        
+        try:
+            registry.bulk_upsert_documents(parsed, skip_unchanged=not force)
+            counts["indexed"] += len(parsed)
+        except Exception as e:
+            print(f"  Error indexing batch of {len(parsed)} documents: {e}")
+            counts["errors"] += len(parsed)
+    
+    return counts
+
+
+def index_incremental(
+    registry: SkillRegistry,
+    since: Optional[str] = None,
+    force: bool = False,
+    batch_size: int = INDEX_BATCH_SIZE
+) -> Optional[Dict[str, int]]:
+    """
+    Index what changed since the last indexed commit (or since).
+    
+    Returns counts of indexed, renamed, deleted and failed paths, or None
+    when there is no usable base commit and a full index is needed.
+    The stored commit only advances when every change was applied, so a
+    failed path is retried by the next run.
+    """
+    head = head_commit()
+    if head is None:
+        print("  Not a git checkout; cannot index incrementally")
+        return None
+    
+    since = since or registry.get_state(LAST_COMMIT_KEY)
+    if not since:
+        print("  No indexed commit recorded yet")
+        return None
+    
+    try:
+        changes = diff_since(since)
+    except subprocess.CalledProcessError:
+        print(f"  Commit {since[:12]} is not in the local git history")
+        return None
+    
+    print(f"  {len(changes)} changed paths between {since[:12]} and {head[:12]}")
+    
+    counts = {"indexed": 0, "renamed": 0, "deleted": 0, "errors": 0}
+    pending = {"skill": [], "reference": [], "doc": []}
+    
+    # Deletes and renames first, so re-added paths never collide with stale rows
+    for change in changes:
+        kind = classify(change.path)
+        old_kind = classify(change.old_path) if change.status == "R" else kind
+        
+        if change.status == "D" or (change.status == "R" and old_kind != kind):
+            if old_kind and _delete(registry, change.old_path or change.path, old_kind):
+                print(f"  Deleted: {change.old_path or change.path}")
+                counts["deleted"] += 1
+            if change.status == "D":
+                continue
+        
+        if kind is None:
+            continue
+        
+        if change.status == "R" and old_kind == kind:
+            try:
+                renamed = _rename(registry, change, kind)
+            except Exception as e:
+                print(f"  Error renaming {change.old_path} -> {change.path}: {e}")
+                renamed = False
+            if renamed:
+                print(f"  Renamed: {change.old_path} -> {change.path}")
+                counts["renamed"] += 1
+                if change.similarity == 100:
+                    continue
+        
+        pending[kind].append(change.path)
+    
+    # Skills before references, so new references can be linked
+    for kind, index_one in (("skill", _index_skill), ("reference", _index_reference)):
+        for path in pending[kind]:
+            try:
+                ok = index_one(registry, path)
+            except Exception as e:
+                print(f"  Error indexing {path}: {e}")
+                ok = False
+            counts["indexed" if ok else "errors"] += 1
+    
+    doc_counts = _index_documents(registry, pending["doc"], force, batch_size)
+    counts["indexed"] += doc_counts["indexed"]
+    counts["errors"] += doc_counts["errors"]
+    
+    if counts["errors"]:
+        print(f"  {counts['errors']} paths failed; keeping base commit {since[:12]} for the next run")
+    else:
+        registry.set_state(LAST_COMMIT_KEY, head)
+    
+    return counts
+
+
+def record_indexed_commit(registry: SkillRegistry) -> None:
+    """Mark the checked-out commit as fully indexed (after a full index)."""
+    head = head_commit()
+    if head is not None:
+        registry.set_state(LAST_COMMIT_KEY, head)
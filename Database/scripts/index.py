@@ -7,148 +7,127 @@ Usage:
     python scripts/index.py --docs       # Index all documents
     python scripts/index.py --all        # Index everything
     python scripts/index.py --all --force  # Re-index even if unchanged
+    python scripts/index.py --incremental  # Only what changed in git since the last run
+    python scripts/index.py --all --namespace team_a  # Into another tenant's partition
 """
 
 import argparse
 import sys
 from pathlib import Path
+from typing import Dict
 
-from .config import SKILLS_DIR, DOCS_DIR
-from .registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
+from .config import SKILLS_DIR, DOCS_DIR, INDEX_WORKERS, INDEX_BATCH_SIZE, REGISTRY_NAMESPACE
+from .registry import SkillRegistry
+from .collect import collect_records, batched, parse_skill_dir, parse_document_file
+from .incremental import index_incremental, record_indexed_commit
 
 
-def index_skills(registry: SkillRegistry, force: bool = False) -> int:
+def index_skills(
+    registry: SkillRegistry,
+    force: bool = False,
+    workers: int = INDEX_WORKERS
+) -> Dict[str, int]:
     """
     Index all skills from the skills directory.
     
-    Returns number of skills indexed.
+    Returns counts of indexed skills and of errors (a skill that failed,
+    or one of whose references failed).
     """
+    counts = {"indexed": 0, "errors": 0}
     if not SKILLS_DIR.exists():
         print(f"Skills directory not found: {SKILLS_DIR}")
-        return 0
+        return counts
     
-    count = 0
-    skill_dirs = [d for d in SKILLS_DIR.iterdir() if d.is_dir()]
+    skill_dirs = sorted(d for d in SKILLS_DIR.iterdir() if d.is_dir())
     
     for skill_dir in skill_dirs:
-        skill_file = skill_dir / "SKILL.md"
-        
-        if not skill_file.exists():
+        if not (skill_dir / "SKILL.md").exists():
             print(f"  Skipping {skill_dir.name}: no SKILL.md")
-            continue
-        
-        content = skill_file.read_text()
-        frontmatter = parse_skill_frontmatter(content)
-        
-        name = frontmatter.get("name", skill_dir.name)
-        description = frontmatter.get("description", "")
-        version = "1.0.0"  # Could parse from metadata if available
-        author = frontmatter.get("author", "Agent Skills Contributors")
+    
+    for record in collect_records(skill_dirs, parse_skill_dir, workers):
+        name = record["name"]
         
-        # Extract version from content if present
-        if "**Version**:" in content:
-            import re
-            match = re.search(r'\*\*Version\*\*:\s*(\d+\.\d+\.\d+)', content)
-            if match:
-                version = match.group(1)
+        if "error" in record:
+            print(f"  Error indexing {name}: {record['error']}")
+            counts["errors"] += 1
+            continue
         
         print(f"  Indexing skill: {name}")
         
         try:
             skill_id = registry.upsert_skill(
                 name=name,
-                description=description,
-                content=content,
-                path=str(skill_file.relative_to(SKILLS_DIR.parent)),
-                version=version,
-                author=author,
+                description=record["description"],
+                content=record["content"],
+                path=record["path"],
+                version=record["version"],
+                author=record["author"],
                 generate_embedding_flag=True  # Generate embeddings
             )
-            count += 1
+            counts["indexed"] += 1
             
             # Index references within the skill
-            refs_dir = skill_dir / "references"
-            if refs_dir.exists():
-                for ref_file in refs_dir.glob("*.md"):
-                    ref_content = ref_file.read_text()
-                    ref_title = extract_title_from_markdown(ref_content)
-                    
-                    doc_id = registry.upsert_document(
-                        title=f"{name}: {ref_title}",
-                        content=ref_content,
-                        path=str(ref_file.relative_to(SKILLS_DIR.parent)),
-                        doc_type="reference"
-                    )
-                    
-                    # Link reference to skill
-                    registry.link_skill_to_document(skill_id, doc_id, relevance=0.9)
+            for ref in record["references"]:
+                doc_id = registry.upsert_document(**ref)
+                
+                # Link reference to skill
+                registry.link_skill_to_document(skill_id, doc_id, relevance=0.9)
                     
         except Exception as e:
             print(f"  Error indexing {name}: {e}")
+            counts["errors"] += 1
     
-    return count
+    return counts
 
 
-def index_documents(registry: SkillRegistry, force: bool = False) -> int:
+def index_documents(
+    registry: SkillRegistry,
+    force: bool = False,
+    workers: int = INDEX_WORKERS,
+    batch_size: int = INDEX_BATCH_SIZE
+) -> Dict[str, int]:
     """
     Index all documents from the docs directory.
     
-    Returns number of documents indexed.
+    Files are parsed in parallel and streamed to the embedding stage in
+    batches of batch_size; unchanged documents are skipped unless force.
+    A batch that fails is retried one document at a time.
+    
+    Returns counts of documents written (unchanged ones are not counted)
+    and of documents that failed.
     """
+    counts = {"indexed": 0, "errors": 0}
     if not DOCS_DIR.exists():
         print(f"Docs directory not found: {DOCS_DIR}")
-        return 0
-    
-    count = 0
-    
-    # Index all markdown files in docs
-    for doc_file in DOCS_DIR.rglob("*.md"):
-        content = doc_file.read_text()
-        
-        # Parse frontmatter if present
-        frontmatter = parse_skill_frontmatter(content)
-        
-        # Use frontmatter name if available, otherwise use filename
-        if frontmatter.get("name"):
-            title = frontmatter.get("name")
-        else:
-            filename_title = doc_file.stem.replace('_', ' ').replace('-', ' ').title()
-            title = extract_title_from_markdown(content, fallback=filename_title)
-        
-        # Use frontmatter description if available
-        description = frontmatter.get("description", "")
-        
-        # Get source_url from frontmatter
-        source_url = frontmatter.get("source_url", "No")
-        
-        # Get doc_type from frontmatter, fallback to inference if not present
-        doc_type = frontmatter.get("doc_type")
-        if not doc_type:
-            # Fallback: infer from path or filename
-            doc_type = "research"
-            if "blog" in doc_file.name.lower() or "blog" in title.lower():
-                doc_type = "blog"
-            elif "case" in doc_file.name.lower():
-                doc_type = "case_study"
-            elif "reference" in doc_file.name.lower() or "reference" in str(doc_file.parent).lower():
-                doc_type = "reference"
-        
-        print(f"  Indexing document: {title}")
+        return counts
+    
+    doc_files = sorted(DOCS_DIR.rglob("*.md"))
+    records = collect_records(doc_files, parse_document_file, workers)
+    
+    for batch in batched(records, batch_size):
+        parsed = []
+        for record in batch:
+            if "error" in record:
+                print(f"  Error indexing {record['path']}: {record['error']}")
+                counts["errors"] += 1
+                continue
+            print(f"  Indexing document: {record['title']}")
+            parsed.append(record)
         
         try:
-            registry.upsert_document(
-                title=title,
-                content=content,
-                path=str(doc_file.relative_to(DOCS_DIR.parent)),
-                doc_type=doc_type,
-                description=description,
-                source_url=source_url
-            )
-            count += 1
+            counts["indexed"] += registry.bulk_upsert_documents(parsed, skip_unchanged=not force)
         except Exception as e:
-            print(f"  Error indexing {doc_file.name}: {e}")
-    
-    return count
+            # One bad document fails its batch: retry the batch one by one
+            print(f"  Error indexing batch of {len(parsed)} documents, retrying one at a time: {e}")
+            for record in parsed:
+                try:
+                    counts["indexed"] += registry.bulk_upsert_documents([record],
+                                                                        skip_unchanged=not force)
+                except Exception as e:
+                    print(f"  Error indexing {record['path']}: {e}")
+                    counts["errors"] += 1
+    
+    return counts
 
 
 def main():
@@ -175,29 +154,76 @@ def main():
         action="store_true",
         help="Force re-indexing even if content unchanged"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INDEX_WORKERS,
+        help="Processes for parsing files (0 = one per CPU, 1 = serial)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=INDEX_BATCH_SIZE,
+        help="Documents per embedding/write batch"
+    )
+    parser.add_argument(
+        "--namespace",
+        default=REGISTRY_NAMESPACE,
+        help="Registry namespace (tenant corpus) to index into"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Index only files changed in git since the last indexed commit "
+             "(falls back to a full index when there is none)"
+    )
     
     args = parser.parse_args()
     
-    if not (args.skills or args.docs or args.all):
+    if not (args.skills or args.docs or args.all or args.incremental):
         parser.print_help()
         sys.exit(1)
     
-    print("Connecting to database...")
-    registry = SkillRegistry()
+    print(f"Connecting to database (namespace: {args.namespace})...")
+    registry = SkillRegistry(namespace=args.namespace)
     
-    total = 0
+    total = errors = 0
+    
+    if args.incremental:
+        print("\nIndexing changes since the last indexed commit...")
+        counts = index_incremental(registry, force=args.force, batch_size=args.batch_size)
+        if counts is None:
+            print("  Falling back to a full index")
+            args.all = True
+        else:
+            print(
+                f"  Indexed {counts['indexed']}, renamed {counts['renamed']}, "
+                f"deleted {counts['deleted']}, failed {counts['errors']}"
+            )
+            total += counts["indexed"] + counts["renamed"] + counts["deleted"]
     
     if args.skills or args.all:
         print("\nIndexing skills...")
-        count = index_skills(registry, args.force)
-        print(f"  Indexed {count} skills")
-        total += count
+        counts = index_skills(registry, args.force, args.workers)
+        print(f"  Indexed {counts['indexed']} skills, failed {counts['errors']}")
+        total += counts["indexed"]
+        errors += counts["errors"]
     
     if args.docs or args.all:
         print("\nIndexing documents...")
-        count = index_documents(registry, args.force)
-        print(f"  Indexed {count} documents")
-        total += count
+        counts = index_documents(registry, args.force, args.workers, args.batch_size)
+        print(f"  Indexed {counts['indexed']} documents, failed {counts['errors']}")
+        total += counts["indexed"]
+        errors += counts["errors"]
+    
+    if args.all:
+        if errors:
+            # Leave the baseline where it was, so the next --incremental run
+            # does not skip the files that failed
+            print(f"\n{errors} errors: not recording the indexed commit")
+        else:
+            # A full run is the baseline for the next --incremental run
+            record_indexed_commit(registry)
     
     print(f"\nTotal indexed: {total} items")
     
@@ -5,6 +5,9 @@ Initialize the database schema.
 This script is typically run once to set up the database,
 but can be safely re-run as all statements use IF NOT EXISTS.
 
+After schema/migrate_namespaces.sql it also restores the saved rows
+into the namespace-partitioned tables (namespace 'default').
+
 Usage:
     python scripts/init_db.py
 """
@@ -15,6 +18,30 @@ from pgvector.psycopg2 import register_vector
 
 from .config import DATABASE_URL
 
+# Tables saved as legacy_<table> by schema/migrate_namespaces.sql, in foreign-key order
+LEGACY_TABLES = [
+    "skills", "documents", "skill_sources", "skill_versions", "skill_references", "registry_state"
+]
+
+
+def restore_legacy_tables(cursor) -> None:
+    """Copy rows saved by migrate_namespaces.sql into the new tables, then drop the copies."""
+    for table in LEGACY_TABLES:
+        legacy = f"legacy_{table}"
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (legacy,))
+        if not cursor.fetchone()[0]:
+            continue
+        
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position",
+            (legacy,)
+        )
+        columns = ", ".join(row[0] for row in cursor.fetchall())
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+        print(f"Restored {cursor.rowcount} rows into {table} (namespace 'default')")
+        cursor.execute(f"DROP TABLE {legacy}")
+
 
 def init_database():
     """Initialize the database with the schema."""
@@ -34,6 +61,7 @@ def init_database():
         
         print("Executing schema...")
         cursor.execute(schema_sql)
+        restore_legacy_tables(cursor)
         
         conn.commit()
         print("Schema initialized successfully.")
@@ -0,0 +1,349 @@
+"""
+Lightweight timing instrumentation for the registry hot paths.
+
+Spans wrap connection setup, SQL execution, embedding calls and every
+SkillRegistry method, recording duration plus attributes such as row
+counts and embedding tokens. Finished spans go to pluggable sinks:
+
+    HistogramSink   in-memory latency histograms and attribute totals
+    JsonLogSink     one JSON object per span (JSON Lines)
+    PrometheusSink  Prometheus text exposition format
+
+Instrumentation is off by default. While off, span() returns a shared
+no-op object and instrumented wrappers skip straight to the wrapped call.
+
+Enable from code:
+
+    from scripts.instrumentation import enable, HistogramSink
+    hist = HistogramSink()
+    enable(hist)
+    registry.search_skills("tool design")
+    print(hist.summary())
+
+or for any CLI via the REGISTRY_METRICS environment variable:
+
+    REGISTRY_METRICS=histogram python scripts/search.py "tool design"
+    REGISTRY_METRICS=json:spans.jsonl,prometheus:metrics.prom python scripts/index.py --all
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from .config import REGISTRY_METRICS
+
+# Span attributes that are summed per span name by the aggregating sinks
+NUMERIC_TOTALS = ("rows", "tokens", "chunks", "texts")
+
+_enabled = False
+_sinks: List[Any] = []
+_current_span: contextvars.ContextVar = contextvars.ContextVar("registry_span", default=None)
+
+
+class Span:
+    """A timed operation with attributes; use as a context manager."""
+
+    __slots__ = ("name", "attrs", "parent", "start", "duration", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[str] = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attrs) -> None:
+        """Attach attributes (row counts, tokens, cache hits, ...)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.parent = parent.name if parent is not None else None
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        for sink in _sinks:
+            sink.record(self)
+        return False
+
+
+class _NoopSpan:
+    """Stand-in returned by span() while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """Start a span; a no-op when instrumentation is disabled."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Bump a named counter (e.g. cache hits) on every sink."""
+    if not _enabled:
+        return
+    for sink in _sinks:
+        sink.increment(name, value)
+
+
+def instrumented(name: str, result_attr: Optional[str] = "rows") -> Callable:
+    """
+    Decorator wrapping a function in a span.
+
+    When the function returns a list, its length is recorded under
+    result_attr (pass None to record nothing).
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}) as s:
+                result = fn(*args, **kwargs)
+                if result_attr and isinstance(result, list):
+                    s.set(**{result_attr: len(result)})
+                return result
+        return wrapper
+    return decorator
+
+
+def instrument_methods(prefix: str) -> Callable:
+    """Class decorator applying instrumented() to every public method."""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not callable(value):
+                continue
+            setattr(cls, attr, instrumented(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+
+def enable(*sinks) -> None:
+    """Turn instrumentation on, adding the given sinks."""
+    global _enabled
+    _sinks.extend(sinks)
+    _enabled = bool(_sinks)
+
+
+def disable() -> None:
+    """Turn instrumentation off and detach all sinks."""
+    global _enabled
+    _enabled = False
+    _sinks.clear()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# -----------------------------------------------------------------------------
+# Sinks
+# -----------------------------------------------------------------------------
+
+class HistogramSink:
+    """Aggregates span durations in memory and reports percentiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.counters: Dict[str, float] = defaultdict(float)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.durations[span.name].append(span.duration)
+            for key in NUMERIC_TOTALS:
+                if key in span.attrs:
+                    self.totals[span.name][key] += span.attrs[key]
+
+    def increment(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-span count, total and p50/p95/p99 latency in milliseconds."""
+        with self._lock:
+            report = {}
+            for name, samples in self.durations.items():
+                ordered = sorted(samples)
+                last = len(ordered) - 1
+                report[name] = {
+                    "count": len(ordered),
+                    "total_ms": sum(ordered) * 1000,
+                    "p50_ms": ordered[round(0.50 * last)] * 1000,
+                    "p95_ms": ordered[round(0.95 * last)] * 1000,
+                    "p99_ms": ordered[round(0.99 * last)] * 1000,
+                    **self.totals.get(name, {}),
+                }
+            if self.counters:
+                report["counters"] = dict(self.counters)
+            return report
+
+    def format_summary(self) -> str:
+        """Human-readable table, slowest total time first."""
+        summary = self.summary()
+        counters = summary.pop("counters", {})
+        lines = [f"{'span':<40} {'count':>6} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for name, s in sorted(summary.items(), key=lambda kv: -kv[1]["total_ms"]):
+            lines.append(
+                f"{name:<40} {s['count']:>6} {s['total_ms']:>10.1f} "
+                f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}"
+            )
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:<40} {value:>6g}")
+        return "\n".join(lines)
+
+
+class JsonLogSink:
+    """Writes one JSON object per finished span."""
+
+    def __init__(self, stream: Optional[TextIO] = None, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._owns_stream = path is not None
+        self.stream = open(path, "a") if path else (stream or sys.stderr)
+
+    def record(self, span: Span) -> None:
+        line = json.dumps({
+            "ts": time.time(),
+            "span": span.name,
+            "parent": span.parent,
+            "ms": round(span.duration * 1000, 3),
+            **span.attrs,
+        }, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def increment(self, name: str, value: float) -> None:
+        with self._lock:
+            self.stream.write(json.dumps({"ts": time.time(), "counter": name, "value": value}) + "\n")
+            self.stream.flush()
+
+    def close(self) -> None:
+        if self._owns_stream:
+            self.stream.close()
+
+
+class PrometheusSink:
+    """Cumulative histograms rendered in the Prometheus text format."""
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * len(self.BUCKETS))
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.sums: Dict[str, float] = defaultdict(float)
+        self.totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.counters: Dict[str, float] = defaultdict(float)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            buckets = self.buckets[span.name]
+            for i, bound in enumerate(self.BUCKETS):
+                if span.duration <= bound:
+                    buckets[i] += 1
+            self.counts[span.name] += 1
+            self.sums[span.name] += span.duration
+            for key in NUMERIC_TOTALS:
+                if key in span.attrs:
+                    self.totals[span.name][key] += span.attrs[key]
+
+    def increment(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def render(self) -> str:
+        """Current metrics in Prometheus text exposition format."""
+        metric = "registry_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Duration of instrumented registry operations.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for name in sorted(self.counts):
+                for bound, count in zip(self.BUCKETS, self.buckets[name]):
+                    lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {self.counts[name]}')
+                lines.append(f'{metric}_sum{{span="{name}"}} {self.sums[name]}')
+                lines.append(f'{metric}_count{{span="{name}"}} {self.counts[name]}')
+
+            lines += [
+                "# HELP registry_span_attribute_total Summed span attributes (rows, tokens, ...).",
+                "# TYPE registry_span_attribute_total counter",
+            ]
+            for name in sorted(self.totals):
+                for key, value in sorted(self.totals[name].items()):
+                    lines.append(f'registry_span_attribute_total{{span="{name}",attribute="{key}"}} {value}')
+
+            lines += [
+                "# HELP registry_events_total Named event counters (cache hits, skips, ...).",
+                "# TYPE registry_events_total counter",
+            ]
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'registry_events_total{{name="{name}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Optional[str] = None) -> None:
+        """Write the rendered metrics to a file (e.g. for node_exporter's textfile collector)."""
+        with open(path or self.path, "w") as f:
+            f.write(self.render())
+
+
+def configure(spec: str) -> None:
+    """
+    Enable sinks from a comma-separated spec.
+
+    Entries: "histogram" (summary printed to stderr at exit), "json" (stderr),
+    "json:PATH", "prometheus:PATH" (written at exit).
+    """
+    sinks = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, target = entry.partition(":")
+        if kind == "histogram":
+            sink = HistogramSink()
+            atexit.register(lambda s=sink: print(s.format_summary(), file=sys.stderr))
+        elif kind == "json":
+            sink = JsonLogSink(path=target or None)
+            atexit.register(sink.close)
+        elif kind == "prometheus":
+            if not target:
+                raise ValueError("prometheus sink needs a path: prometheus:/path/to/file.prom")
+            sink = PrometheusSink(path=target)
+            atexit.register(sink.write)
+        else:
+            raise ValueError(f"Unknown metrics sink '{kind}' in REGISTRY_METRICS")
+        sinks.append(sink)
+    enable(*sinks)
+
+
+if REGISTRY_METRICS:
+    configure(REGISTRY_METRICS)
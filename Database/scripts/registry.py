@@ -4,34 +4,162 @@ Semantic Knowledge Registry
 Core API for skill and document management with semantic search.
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from pathlib import Path
 import re
 import yaml
 
-from .db import get_cursor, execute_query
-from .embeddings import generate_embedding, content_hash
-from .config import EMBEDDING_DIMENSION
+from .db import get_cursor, execute_query, execute_prepared, bulk_execute, PreparedStatement
+from .embeddings import generate_embedding, generate_embeddings_batch, content_hash
+from .config import EMBEDDING_DIMENSION, MMR_FETCH_MULTIPLIER, REGISTRY_NAMESPACE
+from .rerank import mmr_select
+from .instrumentation import instrument_methods, increment
 
 
+_SKILL_UPSERT_CLAUSE = """
+    ON CONFLICT (namespace, name) DO UPDATE SET
+        description = EXCLUDED.description,
+        content = EXCLUDED.content,
+        path = EXCLUDED.path,
+        version = EXCLUDED.version,
+        author = EXCLUDED.author,
+        embedding = EXCLUDED.embedding
+"""
+
+_DOCUMENT_UPSERT_CLAUSE = """
+    ON CONFLICT (namespace, path) DO UPDATE SET
+        title = EXCLUDED.title,
+        content = EXCLUDED.content,
+        content_hash = EXCLUDED.content_hash,
+        doc_type = EXCLUDED.doc_type,
+        description = EXCLUDED.description,
+        source_url = EXCLUDED.source_url,
+        embedding = EXCLUDED.embedding
+"""
+
+
+# Namespaces name list partitions (skills_<namespace>, ...), so they must be valid identifiers
+_NAMESPACE_RE = re.compile(r'^[a-z][a-z0-9_]{0,39}$')
+
+# Namespaces whose partitions this process has confirmed; later registries skip the check
+_ready_namespaces: set = set()
+
+_SKILL_COLUMNS = "id, name, description, content, path, version, author, created_at, updated_at"
+_DOCUMENT_COLUMNS = "id, title, content, path, doc_type, content_hash, created_at, updated_at"
+
+
+def _vector_search_statement(name: str, table: str, columns: str) -> PreparedStatement:
+    """
+    Nearest-neighbour search within one namespace partition:
+    ($1 namespace, $2 embedding, $3 threshold, $4 limit).
+    """
+    return PreparedStatement(
+        name,
+        f"""
+        SELECT 
+            {columns},
+            1 - (embedding <=> $2) AS similarity
+        FROM {table}
+        WHERE namespace = $1
+          AND embedding IS NOT NULL
+          AND 1 - (embedding <=> $2) > $3
+        ORDER BY embedding <=> $2
+        LIMIT $4
+        """,
+        ("text", "vector", "float8", "int")
+    )
+
+
+# Hot queries, prepared once per pooled connection
+_SEARCH_SKILLS = _vector_search_statement(
+    "search_skills", "skills", "id, name, description, path"
+)
+_SEARCH_SKILLS_MMR = _vector_search_statement(
+    "search_skills_mmr", "skills", "id, name, description, path, embedding"
+)
+_SEARCH_DOCUMENTS = _vector_search_statement(
+    "search_documents", "documents", "id, title, path, doc_type"
+)
+_SEARCH_DOCUMENTS_MMR = _vector_search_statement(
+    "search_documents_mmr", "documents", "id, title, path, doc_type, embedding"
+)
+_GET_SKILL = PreparedStatement(
+    "get_skill",
+    f"SELECT {_SKILL_COLUMNS} FROM skills WHERE namespace = $1 AND name = $2",
+    ("text", "text")
+)
+_GET_SKILL_BY_ID = PreparedStatement(
+    "get_skill_by_id",
+    f"SELECT {_SKILL_COLUMNS} FROM skills WHERE namespace = $1 AND id = $2",
+    ("text", "uuid")
+)
+_GET_DOCUMENT = PreparedStatement(
+    "get_document",
+    f"SELECT {_DOCUMENT_COLUMNS} FROM documents WHERE namespace = $1 AND path = $2",
+    ("text", "text")
+)
+_LINK_SKILL_TO_DOCUMENT = PreparedStatement(
+    "link_skill_to_document",
+    """
+    INSERT INTO skill_sources (namespace, skill_id, document_id, relevance)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (namespace, skill_id, document_id) DO UPDATE SET
+        relevance = EXCLUDED.relevance
+    """,
+    ("text", "uuid", "uuid", "float8")
+)
+
+
+def _skill_embed_text(name: str, description: str, content: str) -> str:
+    """Text embedded for a skill: description + first part of content."""
+    return f"{name}: {description}\n\n{content[:4000]}"
+
+
+def _document_embed_text(title: str, content: str) -> str:
+    """Text embedded for a document: title + first part of content."""
+    return f"{title}\n\n{content[:8000]}"
+
+
+@instrument_methods("registry")
 class SkillRegistry:
     """
     Main interface for the Semantic Knowledge Registry.
     
     Handles skill and document CRUD operations with semantic embeddings.
+    Every operation is scoped to one namespace (tenant corpus); skills,
+    documents and links are list-partitioned by namespace, so searches
+    only touch that namespace's partition and ANN indexes.
     """
     
-    def __init__(self):
-        self._verify_connection()
+    def __init__(self, namespace: str = REGISTRY_NAMESPACE):
+        if not _NAMESPACE_RE.match(namespace):
+            raise ValueError(
+                f"Invalid namespace '{namespace}': use 1-40 lowercase letters, digits "
+                f"or underscores, starting with a letter"
+            )
+        self.namespace = namespace
+        if namespace not in _ready_namespaces:
+            self._ensure_namespace()
+            _ready_namespaces.add(namespace)
     
-    def _verify_connection(self):
-        """Verify database connection works."""
+    def _ensure_namespace(self):
+        """
+        Verify the database connection and create this namespace's partitions on first use.
+        
+        One round trip on the primary: a replica may not have the
+        partitions of a namespace created moments ago.
+        """
         try:
-            execute_query("SELECT 1", fetch=True)
+            exists = execute_query(
+                "SELECT to_regclass(%s) IS NOT NULL AS exists",
+                (f"skills_{self.namespace}",)
+            )
         except Exception as e:
             raise ConnectionError(
                 f"Could not connect to database. Is it running? Error: {e}"
             )
+        if not exists[0]["exists"]:
+            execute_query("SELECT create_namespace(%s)", (self.namespace,))
     
     # -------------------------------------------------------------------------
     # Skills
@@ -54,64 +182,146 @@ class SkillRegistry:
         """
         embedding = None
         if generate_embedding_flag:
-            # Embed description + first part of content for semantic search
-            embed_text = f"{name}: {description}\n\n{content[:4000]}"
-            embedding = generate_embedding(embed_text)
+            embedding = generate_embedding(_skill_embed_text(name, description, content))
         
         query = """
-            INSERT INTO skills (name, description, content, path, version, author, embedding)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (name) DO UPDATE SET
-                description = EXCLUDED.description,
-                content = EXCLUDED.content,
-                path = EXCLUDED.path,
-                version = EXCLUDED.version,
-                author = EXCLUDED.author,
-                embedding = EXCLUDED.embedding
+            INSERT INTO skills (namespace, name, description, content, path, version, author, embedding)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """ + _SKILL_UPSERT_CLAUSE + """
             RETURNING id
         """
         
         with get_cursor() as cur:
-            cur.execute(query, (name, description, content, path, version, author, embedding))
+            cur.execute(query, (self.namespace, name, description, content, path, version, author, embedding))
             result = cur.fetchone()
             return str(result["id"])
     
+    def bulk_upsert_skills(
+        self,
+        skills: List[Dict],
+        generate_embedding_flag: bool = True,
+        page_size: int = 500
+    ) -> int:
+        """
+        Insert or update many skills in one transaction.
+        
+        Each dict takes the same keys as upsert_skill's arguments. Embeddings
+        are generated in batched API calls and rows are written with
+        multi-row INSERTs. Later entries win when a name repeats.
+        
+        Returns the number of skills written.
+        """
+        by_name = {skill["name"]: skill for skill in skills}
+        batch = list(by_name.values())
+        if not batch:
+            return 0
+        
+        embeddings = [None] * len(batch)
+        if generate_embedding_flag:
+            embeddings = generate_embeddings_batch([
+                _skill_embed_text(s["name"], s.get("description", ""), s["content"])
+                for s in batch
+            ])
+        
+        rows = [
+            (
+                self.namespace,
+                s["name"],
+                s.get("description", ""),
+                s["content"],
+                s["path"],
+                s.get("version", "1.0.0"),
+                s.get("author"),
+                embedding
+            )
+            for s, embedding in zip(batch, embeddings)
+        ]
+        
+        bulk_execute(
+            "INSERT INTO skills (namespace, name, description, content, path, version, author, embedding) "
+            "VALUES %s" + _SKILL_UPSERT_CLAUSE,
+            rows,
+            page_size=page_size
+        )
+        return len(rows)
+    
     def get_skill(self, name: str) -> Optional[Dict]:
         """Get a skill by name."""
-        results = execute_query(
-            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
-            "FROM skills WHERE name = %s",
-            (name,)
-        )
+        results = execute_prepared(_GET_SKILL, (self.namespace, name), read_only=True)
         return dict(results[0]) if results else None
     
     def get_skill_by_id(self, skill_id: str) -> Optional[Dict]:
         """Get a skill by ID."""
-        results = execute_query(
-            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
-            "FROM skills WHERE id = %s",
-            (skill_id,)
-        )
+        results = execute_prepared(_GET_SKILL_BY_ID, (self.namespace, skill_id), read_only=True)
         return dict(results[0]) if results else None
     
     def list_skills(self) -> List[Dict]:
         """List all skills with basic info."""
         return execute_query(
             "SELECT id, name, description, version, path, updated_at "
-            "FROM skills ORDER BY name"
+            "FROM skills WHERE namespace = %s ORDER BY name",
+            (self.namespace,),
+            read_only=True
         )
     
     def delete_skill(self, name: str) -> bool:
         """Delete a skill by name."""
         with get_cursor() as cur:
-            cur.execute("DELETE FROM skills WHERE name = %s RETURNING id", (name,))
+            cur.execute(
+                "DELETE FROM skills WHERE namespace = %s AND name = %s RETURNING id",
+                (self.namespace, name)
+            )
+            return cur.fetchone() is not None
+    
+    def delete_skills(self, names: List[str]) -> List[str]:
+        """Delete many skills by name in one statement; returns the names deleted."""
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM skills WHERE namespace = %s AND name = ANY(%s) RETURNING name",
+                (self.namespace, list(names))
+            )
+            return [row["name"] for row in cur.fetchall()]
+    
+    def get_skill_by_path(self, path: str) -> Optional[Dict]:
+        """Get a skill by its SKILL.md path."""
+        results = execute_query(
+            f"SELECT {_SKILL_COLUMNS} FROM skills WHERE namespace = %s AND path = %s",
+            (self.namespace, path),
+            read_only=True
+        )
+        return dict(results[0]) if results else None
+    
+    def delete_skill_by_path(self, path: str) -> bool:
+        """Delete a skill by its SKILL.md path."""
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM skills WHERE namespace = %s AND path = %s RETURNING id",
+                (self.namespace, path)
+            )
+            return cur.fetchone() is not None
+    
+    def rename_skill(self, old_path: str, new_path: str, name: Optional[str] = None) -> bool:
+        """
+        Move a skill to a new path, keeping its embedding and links.
+        
+        name also renames the skill (for skills named after their directory).
+        Returns False when no skill has old_path.
+        """
+        with get_cursor() as cur:
+            cur.execute(
+                "UPDATE skills SET path = %s, name = COALESCE(%s, name) "
+                "WHERE namespace = %s AND path = %s RETURNING id",
+                (new_path, name, self.namespace, old_path)
+            )
             return cur.fetchone() is not None
     
     def search_skills(
         self,
         query: str,
         threshold: float = 0.7,
-        limit: int = 10
+        limit: int = 10,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
     ) -> List[Dict]:
         """
         Semantic search for skills.
@@ -120,31 +330,24 @@ class SkillRegistry:
             query: Natural language search query
             threshold: Minimum similarity score (0-1)
             limit: Maximum number of results
+            mmr_lambda: If set, diversify results with MMR using this
+                relevance/diversity trade-off (1.0 = pure relevance)
+            fetch_k: Candidate pool size for MMR (default: limit * MMR_FETCH_MULTIPLIER)
             
         Returns:
             List of skills with similarity scores
         """
         query_embedding = generate_embedding(query)
+        pool_size = self._candidate_pool_size(limit, mmr_lambda, fetch_k)
         
-        # Direct query with proper vector casting
-        results = execute_query(
-            """
-            SELECT 
-                id,
-                name,
-                description,
-                path,
-                1 - (embedding <=> %s::vector) AS similarity
-            FROM skills
-            WHERE embedding IS NOT NULL
-              AND 1 - (embedding <=> %s::vector) > %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """,
-            (query_embedding, query_embedding, threshold, query_embedding, limit)
+        statement = _SEARCH_SKILLS_MMR if mmr_lambda is not None else _SEARCH_SKILLS
+        results = execute_prepared(
+            statement,
+            (self.namespace, query_embedding, threshold, pool_size),
+            read_only=True
         )
         
-        return [dict(r) for r in results]
+        return self._diversify(results, query_embedding, limit, mmr_lambda)
     
     def find_related_skills(
         self,
@@ -167,11 +370,13 @@ class SkillRegistry:
                 name as skill_name,
                 1 - (embedding <=> %s::vector) AS similarity
             FROM skills
-            WHERE embedding IS NOT NULL
+            WHERE namespace = %s
+              AND embedding IS NOT NULL
               AND 1 - (embedding <=> %s::vector) > %s
             ORDER BY embedding <=> %s::vector
             """,
-            (content_embedding, content_embedding, threshold, content_embedding)
+            (content_embedding, self.namespace, content_embedding, threshold, content_embedding),
+            read_only=True
         )
         
         return [dict(r) for r in results]
@@ -199,89 +404,212 @@ class SkillRegistry:
         
         # Check if document exists and content unchanged
         existing = execute_query(
-            "SELECT id, content_hash FROM documents WHERE path = %s",
-            (path,)
+            "SELECT id, content_hash FROM documents WHERE namespace = %s AND path = %s",
+            (self.namespace, path)
         )
         
         if existing and existing[0]["content_hash"] == doc_hash:
             # Content unchanged, skip update
+            increment("registry.upsert_document.unchanged")
             return str(existing[0]["id"])
         
         embedding = None
         if generate_embedding_flag:
-            # Embed title + first part of content
-            embed_text = f"{title}\n\n{content[:8000]}"
-            embedding = generate_embedding(embed_text)
+            embedding = generate_embedding(_document_embed_text(title, content))
         
         query = """
-            INSERT INTO documents (title, content, path, content_hash, doc_type, description, source_url, embedding)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (path) DO UPDATE SET
-                title = EXCLUDED.title,
-                content = EXCLUDED.content,
-                content_hash = EXCLUDED.content_hash,
-                doc_type = EXCLUDED.doc_type,
-                description = EXCLUDED.description,
-                source_url = EXCLUDED.source_url,
-                embedding = EXCLUDED.embedding
+            INSERT INTO documents
+                (namespace, title, content, path, content_hash, doc_type, description, source_url, embedding)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """ + _DOCUMENT_UPSERT_CLAUSE + """
             RETURNING id
         """
         
         with get_cursor() as cur:
-            cur.execute(query, (title, content, path, doc_hash, doc_type, description, source_url, embedding))
+            cur.execute(query, (
+                self.namespace, title, content, path, doc_hash, doc_type, description, source_url, embedding
+            ))
             result = cur.fetchone()
             return str(result["id"])
     
+    def bulk_upsert_documents(
+        self,
+        documents: List[Dict],
+        generate_embedding_flag: bool = True,
+        page_size: int = 500,
+        skip_unchanged: bool = True
+    ) -> int:
+        """
+        Insert or update many documents in one transaction.
+        
+        Each dict takes the same keys as upsert_document's arguments.
+        Documents whose content hash is unchanged are skipped before any
+        embedding work (unless skip_unchanged is False). Later entries win
+        when a path repeats.
+        
+        Returns the number of documents written.
+        """
+        by_path = {doc["path"]: doc for doc in documents}
+        if not by_path:
+            return 0
+        
+        hashes = {path: content_hash(doc["content"]) for path, doc in by_path.items()}
+        unchanged = self.unchanged_document_paths(hashes) if skip_unchanged else set()
+        batch = [doc for path, doc in by_path.items() if path not in unchanged]
+        increment("registry.bulk_upsert_documents.unchanged", len(unchanged))
+        if not batch:
+            return 0
+        
+        embeddings = [None] * len(batch)
+        if generate_embedding_flag:
+            embeddings = generate_embeddings_batch([
+                _document_embed_text(d["title"], d["content"]) for d in batch
+            ])
+        
+        rows = [
+            (
+                self.namespace,
+                d["title"],
+                d["content"],
+                d["path"],
+                hashes[d["path"]],
+                d.get("doc_type", "reference"),
+                d.get("description", ""),
+                d.get("source_url", "No"),
+                embedding
+            )
+            for d, embedding in zip(batch, embeddings)
+        ]
+        
+        bulk_execute(
+            "INSERT INTO documents "
+            "(namespace, title, content, path, content_hash, doc_type, description, source_url, embedding) "
+            "VALUES %s" + _DOCUMENT_UPSERT_CLAUSE,
+            rows,
+            page_size=page_size
+        )
+        return len(rows)
+    
+    def unchanged_document_paths(self, hashes: Dict[str, str]) -> set:
+        """Paths from a {path: content_hash} map whose stored hash already matches."""
+        existing = execute_query(
+            "SELECT path, content_hash FROM documents WHERE namespace = %s AND path = ANY(%s)",
+            (self.namespace, list(hashes))
+        )
+        return {r["path"] for r in existing if r["content_hash"] == hashes[r["path"]]}
+    
     def get_document(self, path: str) -> Optional[Dict]:
         """Get a document by path."""
-        results = execute_query(
-            "SELECT id, title, content, path, doc_type, content_hash, created_at, updated_at "
-            "FROM documents WHERE path = %s",
-            (path,)
-        )
+        results = execute_prepared(_GET_DOCUMENT, (self.namespace, path), read_only=True)
         return dict(results[0]) if results else None
     
+    def delete_document(self, path: str) -> bool:
+        """Delete a document by path."""
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM documents WHERE namespace = %s AND path = %s RETURNING id",
+                (self.namespace, path)
+            )
+            return cur.fetchone() is not None
+    
+    def delete_documents(self, paths: List[str]) -> List[str]:
+        """Delete many documents by path in one statement; returns the paths deleted."""
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM documents WHERE namespace = %s AND path = ANY(%s) RETURNING path",
+                (self.namespace, list(paths))
+            )
+            return [row["path"] for row in cur.fetchall()]
+    
+    def rename_document(self, old_path: str, new_path: str) -> bool:
+        """
+        Move a document to a new path, keeping its embedding and links.
+        
+        Any stale row already at new_path is replaced. Returns False when
+        no document has old_path.
+        """
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM documents WHERE namespace = %s AND path = %s AND path <> %s",
+                (self.namespace, new_path, old_path)
+            )
+            cur.execute(
+                "UPDATE documents SET path = %s WHERE namespace = %s AND path = %s RETURNING id",
+                (new_path, self.namespace, old_path)
+            )
+            return cur.fetchone() is not None
+    
     def list_documents(self, doc_type: Optional[str] = None) -> List[Dict]:
         """List all documents, optionally filtered by type."""
         if doc_type:
             return execute_query(
                 "SELECT id, title, path, doc_type, updated_at "
-                "FROM documents WHERE doc_type = %s ORDER BY title",
-                (doc_type,)
+                "FROM documents WHERE namespace = %s AND doc_type = %s ORDER BY title",
+                (self.namespace, doc_type),
+                read_only=True
             )
         return execute_query(
             "SELECT id, title, path, doc_type, updated_at "
-            "FROM documents ORDER BY title"
+            "FROM documents WHERE namespace = %s ORDER BY title",
+            (self.namespace,),
+            read_only=True
         )
     
     def search_documents(
         self,
         query: str,
         threshold: float = 0.7,
-        limit: int = 10
+        limit: int = 10,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
     ) -> List[Dict]:
-        """Semantic search for documents."""
+        """
+        Semantic search for documents.
+        
+        See search_skills for the MMR arguments.
+        """
         query_embedding = generate_embedding(query)
+        pool_size = self._candidate_pool_size(limit, mmr_lambda, fetch_k)
         
-        # Direct query with proper vector casting
-        results = execute_query(
-            """
-            SELECT 
-                id,
-                title,
-                path,
-                doc_type,
-                1 - (embedding <=> %s::vector) AS similarity
-            FROM documents
-            WHERE embedding IS NOT NULL
-              AND 1 - (embedding <=> %s::vector) > %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """,
-            (query_embedding, query_embedding, threshold, query_embedding, limit)
+        statement = _SEARCH_DOCUMENTS_MMR if mmr_lambda is not None else _SEARCH_DOCUMENTS
+        results = execute_prepared(
+            statement,
+            (self.namespace, query_embedding, threshold, pool_size),
+            read_only=True
         )
         
-        return [dict(r) for r in results]
+        return self._diversify(results, query_embedding, limit, mmr_lambda)
+    
+    # -------------------------------------------------------------------------
+    # Result Diversification
+    # -------------------------------------------------------------------------
+    
+    @staticmethod
+    def _candidate_pool_size(
+        limit: int,
+        mmr_lambda: Optional[float],
+        fetch_k: Optional[int]
+    ) -> int:
+        """Number of rows to fetch before re-ranking."""
+        if mmr_lambda is None:
+            return limit
+        return max(fetch_k or limit * MMR_FETCH_MULTIPLIER, limit)
+    
+    @staticmethod
+    def _diversify(
+        results: List[Dict],
+        query_embedding: List[float],
+        limit: int,
+        mmr_lambda: Optional[float]
+    ) -> List[Dict]:
+        """Apply MMR re-ranking to a candidate pool and strip embeddings."""
+        if mmr_lambda is None:
+            return [dict(r) for r in results]
+        
+        rows = [dict(r) for r in results]
+        embeddings = [row.pop("embedding") for row in rows]
+        order = mmr_select(query_embedding, embeddings, limit, mmr_lambda)
+        return [rows[i] for i in order]
     
     # -------------------------------------------------------------------------
     # Skill-Document Links
@@ -294,16 +622,11 @@ class SkillRegistry:
         relevance: float = 1.0
     ) -> None:
         """Link a skill to a source document."""
-        with get_cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO skill_sources (skill_id, document_id, relevance)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (skill_id, document_id) DO UPDATE SET
-                    relevance = EXCLUDED.relevance
-                """,
-                (skill_id, document_id, relevance)
-            )
+        execute_prepared(
+            _LINK_SKILL_TO_DOCUMENT,
+            (self.namespace, skill_id, document_id, relevance),
+            fetch=False
+        )
     
     def get_skill_sources(self, skill_id: str) -> List[Dict]:
         """Get all source documents for a skill."""
@@ -311,11 +634,12 @@ class SkillRegistry:
             """
             SELECT d.id, d.title, d.path, d.doc_type, ss.relevance
             FROM documents d
-            JOIN skill_sources ss ON d.id = ss.document_id
-            WHERE ss.skill_id = %s
+            JOIN skill_sources ss ON d.namespace = ss.namespace AND d.id = ss.document_id
+            WHERE ss.namespace = %s AND ss.skill_id = %s
             ORDER BY ss.relevance DESC
             """,
-            (skill_id,)
+            (self.namespace, skill_id),
+            read_only=True
         )
     
     def get_document_skills(self, document_id: str) -> List[Dict]:
@@ -324,12 +648,198 @@ class SkillRegistry:
             """
             SELECT s.id, s.name, s.description, ss.relevance
             FROM skills s
-            JOIN skill_sources ss ON s.id = ss.skill_id
-            WHERE ss.document_id = %s
+            JOIN skill_sources ss ON s.namespace = ss.namespace AND s.id = ss.skill_id
+            WHERE ss.namespace = %s AND ss.document_id = %s
             ORDER BY ss.relevance DESC
             """,
-            (document_id,)
+            (self.namespace, document_id),
+            read_only=True
+        )
+    
+    def search_skills_expanded(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        sources_per_skill: int = 3,
+        snippets: bool = False,
+        snippet_words: int = 40,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Semantic search for skills, returning each hit with its top source documents.
+        
+        Replaces search_skills + get_skill_sources (+ get_document) per hit
+        with a single statement: a LATERAL subquery picks each skill's
+        highest-relevance links and json_agg folds them into a list.
+        With mmr_lambda the candidate pool is diversified first, and the
+        sources are then fetched for the selected skills only.
+        
+        Args:
+            query: Natural language search query
+            threshold: Minimum similarity score (0-1)
+            limit: Maximum number of skills
+            sources_per_skill: Maximum linked documents per skill
+            snippets: Include a query-highlighted passage from each document
+            snippet_words: Approximate passage length in words
+            mmr_lambda: If set, diversify skills with MMR using this
+                relevance/diversity trade-off (1.0 = pure relevance)
+            fetch_k: Candidate pool size for MMR (default: limit * MMR_FETCH_MULTIPLIER)
+            
+        Returns:
+            Skills with similarity scores and a "sources" list of
+            {id, title, path, doc_type, relevance[, snippet]}
+        """
+        query_embedding = generate_embedding(query)
+        
+        if mmr_lambda is None:
+            selected = None
+            top_skills = """
+                SELECT 
+                    id,
+                    name,
+                    description,
+                    path,
+                    1 - (embedding <=> %(embedding)s::vector) AS similarity
+                FROM skills
+                WHERE namespace = %(namespace)s
+                  AND embedding IS NOT NULL
+                  AND 1 - (embedding <=> %(embedding)s::vector) > %(threshold)s
+                ORDER BY embedding <=> %(embedding)s::vector
+                LIMIT %(limit)s"""
+        else:
+            pool = execute_prepared(
+                _SEARCH_SKILLS_MMR,
+                (self.namespace, query_embedding, threshold,
+                 self._candidate_pool_size(limit, mmr_lambda, fetch_k)),
+                read_only=True
+            )
+            selected = [str(r["id"]) for r in self._diversify(pool, query_embedding, limit, mmr_lambda)]
+            if not selected:
+                return []
+            top_skills = """
+                SELECT 
+                    id,
+                    name,
+                    description,
+                    path,
+                    1 - (embedding <=> %(embedding)s::vector) AS similarity
+                FROM skills
+                WHERE namespace = %(namespace)s
+                  AND id = ANY(%(ids)s::uuid[])"""
+        
+        snippet_column = ""
+        if snippets:
+            # 'simple' config: no stemming/stopwords, works for mixed-language docs
+            snippet_column = """,
+                        'snippet', ts_headline(
+                            'simple', d.content,
+                            plainto_tsquery('simple', %(query_text)s),
+                            %(headline_options)s
+                        )"""
+        
+        results = execute_query(
+            f"""
+            WITH top_skills AS ({top_skills}
+            )
+            SELECT 
+                ts.*,
+                COALESCE(src.sources, '[]'::json) AS sources
+            FROM top_skills ts
+            LEFT JOIN LATERAL (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', d.id,
+                        'title', d.title,
+                        'path', d.path,
+                        'doc_type', d.doc_type,
+                        'relevance', ss.relevance{snippet_column}
+                    )
+                    ORDER BY ss.relevance DESC
+                ) AS sources
+                FROM (
+                    SELECT document_id, relevance
+                    FROM skill_sources
+                    WHERE namespace = %(namespace)s AND skill_id = ts.id
+                    ORDER BY relevance DESC
+                    LIMIT %(sources_per_skill)s
+                ) ss
+                JOIN documents d ON d.namespace = %(namespace)s AND d.id = ss.document_id
+            ) src ON true
+            ORDER BY ts.similarity DESC
+            """,
+            {
+                "namespace": self.namespace,
+                "embedding": query_embedding,
+                "threshold": threshold,
+                "limit": limit,
+                "ids": selected,
+                "sources_per_skill": sources_per_skill,
+                "query_text": query,
+                "headline_options": (
+                    f"StartSel=**, StopSel=**, MaxWords={snippet_words}, "
+                    f"MinWords={max(1, snippet_words // 3)}, MaxFragments=1"
+                ),
+            },
+            read_only=True
         )
+        
+        if selected is not None:
+            # Keep the MMR order rather than similarity order
+            rank = {skill_id: i for i, skill_id in enumerate(selected)}
+            results = sorted(results, key=lambda r: rank[str(r["id"])])
+        return [dict(r) for r in results]
+    
+    def get_skill_with_sources(self, name: str) -> Optional[Dict]:
+        """
+        Get a skill with all its source documents and version history.
+        
+        One statement instead of get_skill + get_skill_sources +
+        get_skill_versions.
+        """
+        results = execute_query(
+            """
+            SELECT 
+                s.id, s.name, s.description, s.content, s.path, s.version,
+                s.author, s.created_at, s.updated_at,
+                COALESCE(src.sources, '[]'::json) AS sources,
+                COALESCE(ver.versions, '[]'::json) AS versions
+            FROM skills s
+            LEFT JOIN LATERAL (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', d.id,
+                        'title', d.title,
+                        'path', d.path,
+                        'doc_type', d.doc_type,
+                        'relevance', ss.relevance
+                    )
+                    ORDER BY ss.relevance DESC
+                ) AS sources
+                FROM skill_sources ss
+                JOIN documents d ON d.namespace = ss.namespace AND d.id = ss.document_id
+                WHERE ss.namespace = s.namespace AND ss.skill_id = s.id
+            ) src ON true
+            LEFT JOIN LATERAL (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', v.id,
+                        'version', v.version,
+                        'change_summary', v.change_summary,
+                        'created_at', v.created_at
+                    )
+                    ORDER BY v.created_at DESC
+                ) AS versions
+                FROM skill_versions v
+                WHERE v.namespace = s.namespace AND v.skill_id = s.id
+            ) ver ON true
+            WHERE s.namespace = %s AND s.name = %s
+            """,
+            (self.namespace, name),
+            read_only=True
+        )
+        return dict(results[0]) if results else None
     
     # -------------------------------------------------------------------------
     # Skill Versions
@@ -346,11 +856,11 @@ class SkillRegistry:
         with get_cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO skill_versions (skill_id, version, content, change_summary)
-                VALUES (%s, %s, %s, %s)
+                INSERT INTO skill_versions (namespace, skill_id, version, content, change_summary)
+                VALUES (%s, %s, %s, %s, %s)
                 RETURNING id
                 """,
-                (skill_id, version, content, change_summary)
+                (self.namespace, skill_id, version, content, change_summary)
             )
             result = cur.fetchone()
             return str(result["id"])
@@ -361,31 +871,53 @@ class SkillRegistry:
             """
             SELECT id, version, change_summary, created_at
             FROM skill_versions
-            WHERE skill_id = %s
+            WHERE namespace = %s AND skill_id = %s
             ORDER BY created_at DESC
             """,
-            (skill_id,)
+            (self.namespace, skill_id),
+            read_only=True
         )
     
     # -------------------------------------------------------------------------
     # Utilities
     # -------------------------------------------------------------------------
     
+    def get_state(self, key: str) -> Optional[str]:
+        """Read a registry_state value (e.g. the last indexed commit)."""
+        results = execute_query(
+            "SELECT value FROM registry_state WHERE namespace = %s AND key = %s",
+            (self.namespace, key)
+        )
+        return results[0]["value"] if results else None
+    
+    def set_state(self, key: str, value: str) -> None:
+        """Write a registry_state value."""
+        execute_query(
+            "INSERT INTO registry_state (namespace, key, value) VALUES (%s, %s, %s) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()",
+            (self.namespace, key, value),
+            fetch=False
+        )
+    
     def get_stats(self) -> Dict:
-        """Get registry statistics."""
-        skills = execute_query("SELECT COUNT(*) as count FROM skills")[0]["count"]
-        skills_with_embedding = execute_query(
-            "SELECT COUNT(*) as count FROM skills WHERE embedding IS NOT NULL"
-        )[0]["count"]
+        """Get registry statistics for this namespace."""
+        def count(table: str, condition: str = "") -> int:
+            return execute_query(
+                f"SELECT COUNT(*) as count FROM {table} WHERE namespace = %s {condition}",
+                (self.namespace,),
+                read_only=True
+            )[0]["count"]
         
-        documents = execute_query("SELECT COUNT(*) as count FROM documents")[0]["count"]
-        documents_with_embedding = execute_query(
-            "SELECT COUNT(*) as count FROM documents WHERE embedding IS NOT NULL"
-        )[0]["count"]
+        skills = count("skills")
+        skills_with_embedding = count("skills", "AND embedding IS NOT NULL")
         
-        links = execute_query("SELECT COUNT(*) as count FROM skill_sources")[0]["count"]
+        documents = count("documents")
+        documents_with_embedding = count("documents", "AND embedding IS NOT NULL")
+        
+        links = count("skill_sources")
         
         return {
+            "namespace": self.namespace,
             "skills": skills,
             "skills_with_embedding": skills_with_embedding,
             "documents": documents,
@@ -394,19 +926,32 @@ class SkillRegistry:
         }
 
 
+# Prefer libyaml's C loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?)\n---\s*\n', re.DOTALL)
+_HEADING_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+_LEADING_PARENS_RE = re.compile(r'^\(+')
+_TRAILING_PARENS_RE = re.compile(r'\)+$')
+
+
 def parse_skill_frontmatter(content: str) -> Dict[str, Any]:
     """
     Parse YAML frontmatter from skill content.
     
     Extracts name, description, and other metadata from the --- block.
     """
-    match = re.match(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
-    if match:
-        try:
-            return yaml.safe_load(match.group(1))
-        except yaml.YAMLError:
-            return {}
-    return {}
+    match = _FRONTMATTER_RE.match(content)
+    return _load_frontmatter(match.group(1)) if match else {}
+
+
+def _load_frontmatter(text: str) -> Dict[str, Any]:
+    """YAML of a frontmatter block as a dict ({} when invalid or not a mapping)."""
+    try:
+        parsed = yaml.load(text, Loader=_YAML_LOADER)
+    except yaml.YAMLError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
 
 
 def extract_title_from_markdown(content: str, fallback: str = "Untitled") -> str:
@@ -419,21 +964,42 @@ def extract_title_from_markdown(content: str, fallback: str = "Untitled") -> str
     3. Fallback value
     """
     # Try # heading first
-    match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+    match = _HEADING_RE.search(content)
     if match:
         return match.group(1).strip()
-    
+    return _first_line_title(content, fallback)
+
+
+def _first_line_title(content: str, fallback: str) -> str:
+    """Title from the first short non-empty line, for markdown without headings."""
     # Try first non-empty, non-whitespace line
-    lines = content.strip().split('\n')
+    lines = content.strip().split('\n', 5)
     for line in lines[:5]:  # Check first 5 lines
         line = line.strip()
         if line and not line.startswith('---'):  # Skip frontmatter markers
             # Clean up: remove markdown formatting
-            line = re.sub(r'^\(+', '', line)  # Remove leading parentheses
-            line = re.sub(r'\)+$', '', line)  # Remove trailing parentheses
+            line = _LEADING_PARENS_RE.sub('', line)  # Remove leading parentheses
+            line = _TRAILING_PARENS_RE.sub('', line)  # Remove trailing parentheses
             line = line.strip()
             if len(line) > 3 and len(line) < 100:
                 return line[:80]  # Truncate long titles
     
     return fallback
 
+
+def scan_markdown(content: str, fallback_title: str = "Untitled") -> Tuple[Dict[str, Any], str]:
+    """
+    Parse frontmatter and title in one pass over the content.
+    
+    Returns (frontmatter, title) where title is the frontmatter "name" when
+    present, otherwise the markdown title. The title is looked for after
+    the frontmatter block, so the block is never scanned twice.
+    """
+    match = _FRONTMATTER_RE.match(content)
+    frontmatter = _load_frontmatter(match.group(1)) if match else {}
+    title = frontmatter.get("name")
+    if not title:
+        body = match.end() if match else 0
+        heading = _HEADING_RE.search(content, body)
+        title = heading.group(1).strip() if heading else _first_line_title(content[body:], fallback_title)
+    return frontmatter, title
@@ -1,149 +1,286 @@
 #!/usr/bin/env python3
 """
-Re-index or delete individual skills/documents.
+Re-index or delete skills/documents by name, path or glob.
 
 Usage:
     # Re-index
-    python scripts/reindex.py skill tool-design
-    python scripts/reindex.py doc docs/hncapsule.md
+    python scripts/reindex.py reindex skill tool-design
+    python scripts/reindex.py reindex skill tool-design memory-systems "context-*"
+    python scripts/reindex.py reindex doc docs/hncapsule.md "docs/**/*.md"
+    python scripts/reindex.py reindex doc "skills/tool-design/references/*.md"
     
     # Delete
     python scripts/reindex.py delete skill tool-design
-    python scripts/reindex.py delete doc docs/hncapsule.md
+    python scripts/reindex.py delete doc docs/hncapsule.md "docs/old/*"
+    
+    # Targets from stdin, one per line ("-" may be mixed with other targets)
+    git diff --name-only HEAD~1 -- docs | python scripts/reindex.py reindex doc -
+
+Skills and documents are embedded in one batched call per command and
+written with multi-row statements, each bulk write in one transaction.
+For documents, the unchanged check, the upsert and any delete are separate
+round trips, so a failure part-way leaves the earlier steps applied. Skill
+references (skills/<skill>/references/*.md) are re-indexed one by one as
+index.py does: titled after their skill and linked to it. A per-target
+summary is printed at the end.
 """
 
 import sys
 import argparse
+from fnmatch import fnmatch
 from pathlib import Path
+from typing import List, Tuple
+
+from .config import SKILLS_DIR, DOCS_DIR, REGISTRY_NAMESPACE
+from .registry import SkillRegistry
+from .embeddings import content_hash
+from .collect import parse_skill_dir, parse_document_file, parse_reference_file
+
+# (target, status, detail)
+Result = Tuple[str, str, str]
+
+FAILED_STATUSES = ("not found", "error")
+
+
+def is_glob(identifier: str) -> bool:
+    return any(c in identifier for c in "*?[")
+
+
+def read_identifiers(identifiers: List[str]) -> List[str]:
+    """Expand "-" into targets read from stdin and drop duplicates, keeping order."""
+    expanded = []
+    for identifier in identifiers:
+        if identifier == "-":
+            expanded.extend(
+                line.strip() for line in sys.stdin
+                if line.strip() and not line.lstrip().startswith("#")
+            )
+        else:
+            expanded.append(identifier)
+    return list(dict.fromkeys(expanded))
+
 
-from .config import SKILLS_DIR, DOCS_DIR
-from .registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
-from .db import execute_query
+def skill_dir_name(identifier: str) -> str:
+    """Accept "tool-design", "skills/tool-design" or "skills/tool-design/SKILL.md"."""
+    parts = Path(identifier).parts
+    if parts and parts[-1] == "SKILL.md":
+        parts = parts[:-1]
+    if parts and parts[0] == "skills":
+        parts = parts[1:]
+    return str(Path(*parts)) if parts else identifier
 
 
-def reindex_skill(skill_name: str):
-    """Re-index a single skill."""
-    registry = SkillRegistry()
+def document_path(identifier: str) -> str:
+    """Registry path for a document: paths outside skills/ are relative to docs/."""
+    if identifier.startswith(("docs/", "skills/")):
+        return identifier
+    return f"docs/{identifier}"
+
+
+def reindex_skills(registry: SkillRegistry, identifiers: List[str]) -> List[Result]:
+    """Re-index skills by directory name or glob, embedding them in one batch."""
+    results, records, seen = [], [], set()
+    available = sorted(d.name for d in SKILLS_DIR.iterdir() if (d / "SKILL.md").exists())
     
-    skill_dir = SKILLS_DIR / skill_name
-    skill_file = skill_dir / "SKILL.md"
+    for identifier in identifiers:
+        pattern = skill_dir_name(identifier)
+        matches = [name for name in available if fnmatch(name, pattern)]
+        if not matches:
+            results.append((identifier, "not found", f"no skill matches {SKILLS_DIR / pattern}"))
+            continue
+        
+        for dir_name in matches:
+            if dir_name in seen:
+                continue
+            seen.add(dir_name)
+            record = parse_skill_dir(SKILLS_DIR / dir_name)
+            if "error" in record:
+                results.append((dir_name, "error", record["error"]))
+            else:
+                records.append(record)
     
-    if not skill_file.exists():
-        print(f"Error: Skill file not found: {skill_file}")
-        return False
+    if records:
+        print(f"Re-indexing {len(records)} skills...")
+        try:
+            registry.bulk_upsert_skills(records)
+            results += [(r["name"], "reindexed", r["path"]) for r in records]
+        except Exception as e:
+            results += [(r["name"], "error", str(e)) for r in records]
     
-    content = skill_file.read_text()
-    frontmatter = parse_skill_frontmatter(content)
+    return results
+
+
+def reindex_reference(registry: SkillRegistry, ref_file: Path) -> Result:
+    """Re-index a skill reference like index.py: titled after its skill and linked to it."""
+    path = str(ref_file.relative_to(SKILLS_DIR.parent))
+    parts = Path(path).parts
+    if len(parts) != 4 or parts[2] != "references":
+        return (path, "error", "only skills/<skill>/references/*.md are indexed as documents")
     
-    name = frontmatter.get("name", skill_name)
-    description = frontmatter.get("description", "")
+    skill_path = str(Path(*parts[:2]) / "SKILL.md")
+    try:
+        skill = registry.get_skill_by_path(skill_path)
+        if skill is None:
+            return (path, "error", f"skill {skill_path} is not indexed")
+        record = parse_reference_file(ref_file, skill["name"])
+        doc_id = registry.upsert_document(**record)
+        registry.link_skill_to_document(str(skill["id"]), doc_id, relevance=0.9)
+    except Exception as e:
+        return (path, "error", str(e))
+    return (path, "reindexed", record["title"])
+
+
+def reindex_documents(
+    registry: SkillRegistry,
+    identifiers: List[str],
+    force: bool = False
+) -> List[Result]:
+    """
+    Re-index documents by path or glob; unchanged documents are skipped unless force.
     
-    print(f"Re-indexing skill: {name}")
+    Files under skills/ are skill references and keep their reference
+    title and doc_type (see reindex_reference).
+    """
+    results, records, seen = [], [], set()
     
-    skill_id = registry.upsert_skill(
-        name=name,
-        description=description,
-        content=content,
-        path=str(skill_file.relative_to(SKILLS_DIR.parent)),
-        version="1.0.0",
-        generate_embedding_flag=True
-    )
+    for identifier in identifiers:
+        path = document_path(identifier)
+        if is_glob(path):
+            doc_files = sorted(f for f in DOCS_DIR.parent.glob(path) if f.is_file())
+        else:
+            doc_files = [DOCS_DIR.parent / path] if (DOCS_DIR.parent / path).is_file() else []
+        if not doc_files:
+            results.append((identifier, "not found", f"no file matches {DOCS_DIR.parent / path}"))
+            continue
+        
+        for doc_file in doc_files:
+            if doc_file in seen:
+                continue
+            seen.add(doc_file)
+            if doc_file.is_relative_to(SKILLS_DIR):
+                results.append(reindex_reference(registry, doc_file))
+                continue
+            record = parse_document_file(doc_file)
+            if "error" in record:
+                results.append((record["path"], "error", record["error"]))
+            else:
+                records.append(record)
     
-    print(f"✓ Re-indexed: {name} (ID: {skill_id[:8]}...)")
-    return True
-
-
-def reindex_document(doc_path: str):
-    """Re-index a single document."""
-    registry = SkillRegistry()
+    unchanged = set()
+    if records and not force:
+        unchanged = registry.unchanged_document_paths(
+            {r["path"]: content_hash(r["content"]) for r in records}
+        )
+        results += [(path, "unchanged", "content hash matches") for path in sorted(unchanged)]
     
-    # Support both absolute and relative paths
-    if doc_path.startswith("docs/"):
-        doc_file = DOCS_DIR.parent / doc_path
-    else:
-        doc_file = DOCS_DIR / doc_path
-    
-    if not doc_file.exists():
-        print(f"Error: Document file not found: {doc_file}")
-        return False
-    
-    content = doc_file.read_text()
-    frontmatter = parse_skill_frontmatter(content)
-    
-    # Get metadata from frontmatter
-    name = frontmatter.get("name")
-    if not name:
-        filename_title = doc_file.stem.replace('_', ' ').replace('-', ' ').title()
-        name = extract_title_from_markdown(content, fallback=filename_title)
-    
-    description = frontmatter.get("description", "")
-    doc_type = frontmatter.get("doc_type", "research")
-    source_url = frontmatter.get("source_url", "No")
-    
-    print(f"Re-indexing document: {name}")
-    
-    doc_id = registry.upsert_document(
-        title=name,
-        content=content,
-        path=str(doc_file.relative_to(DOCS_DIR.parent)),
-        doc_type=doc_type,
-        description=description,
-        source_url=source_url,
-        generate_embedding_flag=True
-    )
+    changed = [r for r in records if r["path"] not in unchanged]
+    if changed:
+        print(f"Re-indexing {len(changed)} documents...")
+        try:
+            registry.bulk_upsert_documents(changed, skip_unchanged=False)
+            results += [(r["path"], "reindexed", r["title"]) for r in changed]
+        except Exception as e:
+            results += [(r["path"], "error", str(e)) for r in changed]
     
-    print(f"✓ Re-indexed: {name} (ID: {doc_id[:8]}...)")
-    return True
+    return results
 
 
-def delete_skill(skill_name: str):
-    """Delete a single skill."""
-    registry = SkillRegistry()
+def delete_targets(
+    registry: SkillRegistry,
+    target_type: str,
+    identifiers: List[str]
+) -> List[Result]:
+    """Delete skills (by name) or documents (by path); globs match registry entries."""
+    if target_type == "skill":
+        keys = [skill_dir_name(i) for i in identifiers]
+        delete = registry.delete_skills
+    else:
+        keys = [document_path(i) for i in identifiers]
+        delete = registry.delete_documents
     
-    print(f"Deleting skill: {skill_name}")
+    # Globs are matched against what is in the registry (files may be gone)
+    existing = []
+    if any(is_glob(k) for k in keys):
+        if target_type == "skill":
+            existing = [s["name"] for s in registry.list_skills()]
+        else:
+            existing = [d["path"] for d in registry.list_documents()]
     
-    if registry.delete_skill(skill_name):
-        print(f"✓ Deleted: {skill_name}")
-        return True
-    else:
-        print(f"✗ Not found: {skill_name}")
-        return False
-
-
-def delete_document(doc_path: str):
-    """Delete a single document."""
-    print(f"Deleting document: {doc_path}")
+    results, targets = [], []
+    for identifier, key in zip(identifiers, keys):
+        if not is_glob(key):
+            targets.append(key)
+            continue
+        matches = [e for e in existing if fnmatch(e, key)]
+        if not matches:
+            results.append((identifier, "not found", "no registry entry matches"))
+        targets.extend(matches)
+    targets = list(dict.fromkeys(targets))
     
-    result = execute_query(
-        "DELETE FROM documents WHERE path = %s RETURNING id",
-        (doc_path,),
-        fetch=True
-    )
+    if not targets:
+        return results
     
-    if result:
-        print(f"✓ Deleted: {doc_path}")
-        return True
-    else:
-        print(f"✗ Not found: {doc_path}")
-        return False
+    print(f"Deleting {len(targets)} {target_type}s...")
+    try:
+        deleted = set(delete(targets))
+    except Exception as e:
+        return results + [(t, "error", str(e)) for t in targets]
+    
+    for target in targets:
+        if target in deleted:
+            results.append((target, "deleted", ""))
+        else:
+            results.append((target, "not found", "not in registry"))
+    return results
+
+
+def print_summary(results: List[Result]) -> bool:
+    """Print one line per target; returns True when every target succeeded."""
+    print("\nSummary:")
+    failed = 0
+    for target, status, detail in results:
+        ok = status not in FAILED_STATUSES
+        failed += not ok
+        line = f"  {'✓' if ok else '✗'} {status:<10} {target}"
+        print(f"{line}  ({detail})" if detail else line)
+    print(f"\n{len(results) - failed} succeeded, {failed} failed")
+    return failed == 0
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Re-index or delete individual skills/documents"
+        description="Re-index or delete skills/documents by name, path or glob"
+    )
+    parser.add_argument(
+        "--namespace",
+        default=REGISTRY_NAMESPACE,
+        help="Registry namespace (tenant corpus) to operate on"
     )
     
     subparsers = parser.add_subparsers(dest="action", help="Action to perform")
     
     # Re-index commands
-    reindex_parser = subparsers.add_parser("reindex", help="Re-index a skill or document")
+    reindex_parser = subparsers.add_parser("reindex", help="Re-index skills or documents")
     reindex_parser.add_argument("type", choices=["skill", "doc"], help="Type to re-index")
-    reindex_parser.add_argument("identifier", help="Skill name or document path")
+    reindex_parser.add_argument(
+        "identifiers",
+        nargs="+",
+        help="Skill names or document paths; globs allowed, '-' reads targets from stdin"
+    )
+    reindex_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-embed documents even if their content is unchanged"
+    )
     
     # Delete commands
-    delete_parser = subparsers.add_parser("delete", help="Delete a skill or document")
+    delete_parser = subparsers.add_parser("delete", help="Delete skills or documents")
     delete_parser.add_argument("type", choices=["skill", "doc"], help="Type to delete")
-    delete_parser.add_argument("identifier", help="Skill name or document path")
+    delete_parser.add_argument(
+        "identifiers",
+        nargs="+",
+        help="Skill names or document paths; globs allowed, '-' reads targets from stdin"
+    )
     
     args = parser.parse_args()
     
@@ -151,22 +288,23 @@ def main():
         parser.print_help()
         return 1
     
-    success = False
+    identifiers = read_identifiers(args.identifiers)
+    if not identifiers:
+        print("No targets given")
+        return 1
+    
+    registry = SkillRegistry(namespace=args.namespace)
     
     if args.action == "reindex":
         if args.type == "skill":
-            success = reindex_skill(args.identifier)
-        else:
-            success = reindex_document(args.identifier)
-    elif args.action == "delete":
-        if args.type == "skill":
-            success = delete_skill(args.identifier)
+            results = reindex_skills(registry, identifiers)
         else:
-            success = delete_document(args.identifier)
+            results = reindex_documents(registry, identifiers, force=args.force)
+    else:
+        results = delete_targets(registry, args.type, identifiers)
     
-    return 0 if success else 1
+    return 0 if print_summary(results) else 1
 
 
 if __name__ == "__main__":
     sys.exit(main())
-
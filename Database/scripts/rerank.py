@@ -0,0 +1,65 @@
+"""Result diversification utilities for semantic search."""
+
+from typing import List, Sequence
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows are left as-is)."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Select k candidates using Maximal Marginal Relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda * sim(query, c) - (1 - lambda) * max(sim(c, selected))``,
+    so lambda=1.0 is plain relevance ranking and lambda=0.0 is pure diversity.
+
+    Args:
+        query_embedding: Query vector
+        candidate_embeddings: Candidate vectors (one row per candidate)
+        k: Number of candidates to select
+        lambda_mult: Relevance/diversity trade-off (0-1)
+
+    Returns:
+        Indices into candidate_embeddings, in selection order
+    """
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError(f"lambda_mult must be between 0 and 1, got {lambda_mult}")
+
+    if k <= 0 or len(candidate_embeddings) == 0:
+        return []
+
+    candidates = _normalize_rows(np.asarray(candidate_embeddings, dtype=np.float32))
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+
+    relevance = candidates @ query
+    k = min(k, len(candidates))
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    # Highest similarity of every candidate to anything already selected
+    max_redundancy = candidates @ candidates[first]
+
+    available = np.ones(len(candidates), dtype=bool)
+    available[first] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_redundancy, candidates @ candidates[best], out=max_redundancy)
+
+    return selected
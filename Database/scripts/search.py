@@ -6,22 +6,40 @@ Usage:
     python scripts/search.py "how to design agent tools"
     python scripts/search.py "context optimization" --type skills --limit 5
     python scripts/search.py "memory systems" --type docs --threshold 0.6
+    python scripts/search.py "context compression" --diversity 0.5
+    python scripts/search.py "tool design" --type skills --sources 3 --snippets
+    python scripts/search.py "memory systems" --namespace team_a
+    
+    # Keep a warm server running; later searches are forwarded to it
+    python scripts/search.py --serve
+
+The registry (and with it psycopg2/openai/tiktoken) is only imported when no
+search server answers, so forwarded searches stay cheap.
 """
 
 import argparse
 import sys
 import json
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
 
-from .registry import SkillRegistry
+from .config import SEARCH_SERVER_URL, REGISTRY_NAMESPACE
 
 
 def format_skill_result(skill: dict) -> str:
     """Format a skill search result for display."""
-    return (
+    text = (
         f"\n  [{skill['similarity']:.3f}] {skill['name']}\n"
         f"           {skill['description'][:80]}...\n"
         f"           Path: {skill['path']}"
     )
+    for source in skill.get("sources", []):
+        text += f"\n           Source [{source['relevance']:.2f}]: {source['title']} ({source['path']})"
+        if source.get("snippet"):
+            snippet = " ".join(source["snippet"].split())
+            text += f"\n               \"{snippet}\""
+    return text
 
 
 def format_document_result(doc: dict) -> str:
@@ -33,12 +51,87 @@ def format_document_result(doc: dict) -> str:
     )
 
 
+def run_search(
+    registry,
+    query: str,
+    search_type: str = "all",
+    limit: int = 10,
+    threshold: float = 0.7,
+    diversity: Optional[float] = None,
+    sources: int = 0,
+    snippets: bool = False
+) -> Dict:
+    """Search skills and/or documents; shared by the CLI and the search server."""
+    results = {"skills": [], "documents": []}
+    
+    if search_type in ["skills", "all"]:
+        if sources:
+            results["skills"] = registry.search_skills_expanded(
+                query,
+                threshold=threshold,
+                limit=limit,
+                sources_per_skill=sources,
+                snippets=snippets,
+                mmr_lambda=diversity
+            )
+        else:
+            results["skills"] = registry.search_skills(
+                query,
+                threshold=threshold,
+                limit=limit,
+                mmr_lambda=diversity
+            )
+    
+    if search_type in ["docs", "all"]:
+        results["documents"] = registry.search_documents(
+            query,
+            threshold=threshold,
+            limit=limit,
+            mmr_lambda=diversity
+        )
+    
+    return results
+
+
+def search_via_server(params: Dict, timeout: float = 60.0) -> Optional[Dict]:
+    """
+    Forward a search to a running search server.
+    
+    Returns None when no search server answers (nothing listening, a
+    timeout, or a reply that is not the server's JSON), so the caller can
+    fall back to searching in-process.
+    """
+    request = urllib.request.Request(
+        f"{SEARCH_SERVER_URL.rstrip('/')}/search",
+        data=json.dumps(params).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    # Bypass any HTTP(S)_PROXY settings: the server is local
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    
+    try:
+        with opener.open(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            error = json.loads(e.read() or b"{}")
+        except (OSError, ValueError):
+            return None
+        if not isinstance(error, dict):
+            return None
+        raise RuntimeError(f"Search server error ({e.code}): {error.get('error', e.reason)}")
+    except (OSError, ValueError):
+        # URLError, ConnectionError and timeouts are all OSErrors
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Semantic search for skills and documents"
     )
     parser.add_argument(
         "query",
+        nargs="?",
         help="Natural language search query"
     )
     parser.add_argument(
@@ -59,33 +152,82 @@ def main():
         default=0.7,
         help="Minimum similarity threshold (0-1)"
     )
+    parser.add_argument(
+        "--diversity",
+        type=float,
+        default=None,
+        metavar="LAMBDA",
+        help="Re-rank with MMR; 1.0 = pure relevance, lower = more diverse results"
+    )
+    parser.add_argument(
+        "--sources",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Include each skill's top N source documents (same query)"
+    )
+    parser.add_argument(
+        "--snippets",
+        action="store_true",
+        help="With --sources, include a query-highlighted passage per document"
+    )
+    parser.add_argument(
+        "--namespace",
+        default=REGISTRY_NAMESPACE,
+        help="Registry namespace (tenant corpus) to search"
+    )
     parser.add_argument(
         "--json",
         action="store_true",
         help="Output results as JSON"
     )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help=f"Run a long-lived search server at {SEARCH_SERVER_URL}"
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Search in-process even if a search server is running"
+    )
     
     args = parser.parse_args()
     
-    registry = SkillRegistry()
+    if args.serve:
+        from .search_server import serve, default_address
+        host, port = default_address()
+        serve(host, port)
+        return
     
-    results = {"skills": [], "documents": []}
+    if not args.query:
+        parser.error("the query argument is required")
     
-    if args.type in ["skills", "all"]:
-        skills = registry.search_skills(
-            args.query,
-            threshold=args.threshold,
-            limit=args.limit
-        )
-        results["skills"] = skills
+    results = None
+    if not args.local:
+        results = search_via_server({
+            "query": args.query,
+            "type": args.type,
+            "limit": args.limit,
+            "threshold": args.threshold,
+            "diversity": args.diversity,
+            "sources": args.sources,
+            "snippets": args.snippets,
+            "namespace": args.namespace,
+        })
     
-    if args.type in ["docs", "all"]:
-        docs = registry.search_documents(
+    if results is None:
+        from .registry import SkillRegistry
+        results = run_search(
+            SkillRegistry(namespace=args.namespace),
             args.query,
+            search_type=args.type,
+            limit=args.limit,
             threshold=args.threshold,
-            limit=args.limit
+            diversity=args.diversity,
+            sources=args.sources,
+            snippets=args.snippets
         )
-        results["documents"] = docs
     
     if args.json:
         # Convert UUIDs to strings for JSON serialization
@@ -120,4 +262,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Long-lived search server for the Knowledge Registry.
+
+Holds a warm connection pool, embedding client and query-embedding cache,
+so each lookup only pays for the search itself instead of interpreter
+start-up, imports, client construction and a fresh connection.
+search.py forwards queries here automatically while it is running.
+
+Endpoints (JSON):
+    GET  /health   server status
+    POST /search   {"query", "type", "limit", "threshold", "diversity", "sources", "snippets", "namespace"}
+
+Usage:
+    python scripts/search.py --serve
+    python scripts/search_server.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from .config import SEARCH_SERVER_URL, DB_POOL_MAX, EMBEDDING_CACHE_SIZE, REGISTRY_NAMESPACE
+from .db import init_pool, close_pool
+from .embeddings import enable_embedding_cache, get_embedding_client, count_tokens
+from .registry import SkillRegistry
+from .search import run_search
+
+
+class SearchServer(ThreadingHTTPServer):
+    """HTTP server sharing one registry per namespace across request threads."""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, registry: SkillRegistry, verbose: bool = False):
+        super().__init__(address, SearchRequestHandler)
+        self.registry = registry
+        self.registries = {registry.namespace: registry}
+        self.verbose = verbose
+        self.started_at = time.time()
+        self.requests_served = 0
+        self.stats_lock = threading.Lock()
+        self.registries_lock = threading.Lock()
+    
+    def registry_for(self, namespace: str) -> SkillRegistry:
+        """The registry for a namespace, created on first request."""
+        with self.registries_lock:
+            if namespace not in self.registries:
+                self.registries[namespace] = SkillRegistry(namespace=namespace)
+            return self.registries[namespace]
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Routes /health and /search."""
+    
+    server: SearchServer
+    
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        self._send_json(200, {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.server.started_at, 1),
+            "requests_served": self.server.requests_served,
+        })
+    
+    def do_POST(self):
+        if urlparse(self.path).path != "/search":
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not params.get("query"):
+                raise ValueError("'query' is required")
+            diversity = params.get("diversity")
+            options = {
+                "search_type": params.get("type", "all"),
+                "limit": int(params.get("limit", 10)),
+                "threshold": float(params.get("threshold", 0.7)),
+                "diversity": None if diversity is None else float(diversity),
+                "sources": int(params.get("sources", 0)),
+                "snippets": bool(params.get("snippets", False)),
+            }
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+        
+        try:
+            namespace = params.get("namespace") or self.server.registry.namespace
+            registry = self.server.registry_for(namespace)
+        except ValueError as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+        
+        try:
+            results = run_search(registry, params["query"], **options)
+        except Exception as e:
+            self._send_json(500, {"error": f"Search failed: {e}"})
+            return
+        
+        with self.server.stats_lock:
+            self.server.requests_served += 1
+        self._send_json(200, results)
+    
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def serve(host: str, port: int, verbose: bool = False) -> None:
+    """Warm up shared resources and serve until interrupted."""
+    print("Warming up connection pool and embedding client...")
+    init_pool(maxconn=DB_POOL_MAX)
+    enable_embedding_cache(EMBEDDING_CACHE_SIZE)
+    registry = SkillRegistry(namespace=REGISTRY_NAMESPACE)
+    count_tokens("warm up")  # Loads the tiktoken encoding
+    try:
+        get_embedding_client()
+    except ValueError as e:
+        print(f"Warning: {e}")
+    
+    server = SearchServer((host, port), registry, verbose=verbose)
+    print(f"Search server listening on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        close_pool()
+
+
+def default_address():
+    """Host and port from SEARCH_SERVER_URL."""
+    url = urlparse(SEARCH_SERVER_URL)
+    return url.hostname or "127.0.0.1", url.port or 8765
+
+
+def main():
+    host, port = default_address()
+    parser = argparse.ArgumentParser(description="Run the registry search server")
+    parser.add_argument("--host", default=host, help="Interface to bind (default from SEARCH_SERVER_URL)")
+    parser.add_argument("--port", type=int, default=port, help="Port to bind (default from SEARCH_SERVER_URL)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+    
+    serve(args.host, args.port, verbose=args.verbose)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
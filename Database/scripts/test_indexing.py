@@ -178,7 +178,7 @@ def cleanup():
     # Delete all documents
     from scripts.db import get_cursor
     with get_cursor() as cur:
-        cur.execute("DELETE FROM documents")
+        cur.execute("DELETE FROM documents WHERE namespace = %s", (registry.namespace,))
     print("  Deleted all documents")
     
     print("  Cleanup complete")
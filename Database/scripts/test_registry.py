@@ -9,6 +9,9 @@ Tests:
 4. Skill-Document linking
 5. Semantic search (requires OPENAI_API_KEY)
 6. Version tracking
+7. Bulk upserts
+8. Path renames and index state (incremental indexing)
+9. Namespace isolation
 """
 
 import sys
@@ -17,9 +20,16 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.db import execute_query, get_cursor
-from scripts.registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
-from scripts.config import OPENAI_API_KEY
+from scripts.db import execute_query, get_cursor, init_pool, close_pool
+from scripts.registry import (
+    SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown, scan_markdown,
+    _ready_namespaces
+)
+from scripts.rerank import mmr_select
+from scripts.embeddings import content_hash
+from scripts.incremental import classify
+from scripts import instrumentation
+from scripts.config import OPENAI_API_KEY, EMBEDDING_DIMENSION
 
 
 def test_database_connection():
@@ -53,7 +63,7 @@ def test_pgvector_extension():
 def test_tables_exist():
     """Test all required tables exist."""
     print("Testing tables exist...")
-    required_tables = ["skills", "documents", "skill_sources", "skill_versions", "skill_references"]
+    required_tables = ["skills", "documents", "skill_sources", "skill_versions", "skill_references", "registry_state"]
     
     result = execute_query(
         "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"
@@ -186,6 +196,189 @@ def test_document_crud():
         return False
 
 
+def test_bulk_upsert():
+    """Test bulk skill and document upserts."""
+    print("Testing bulk upserts...")
+    registry = SkillRegistry()
+    
+    names = [f"test-bulk-skill-{i}" for i in range(3)]
+    paths = [f"docs/test-bulk-doc-{i}.md" for i in range(3)]
+    
+    def cleanup():
+        for name in names:
+            registry.delete_skill(name)
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM documents WHERE path = ANY(%s)", (paths,))
+    
+    try:
+        written = registry.bulk_upsert_skills(
+            [
+                {
+                    "name": name,
+                    "description": "Bulk test skill",
+                    "content": f"# {name}\n\nContent.",
+                    "path": f"skills/{name}/SKILL.md",
+                }
+                for name in names
+            ],
+            generate_embedding_flag=False
+        )
+        assert written == 3
+        assert all(registry.get_skill(name) for name in names)
+        print(f"  [PASS] Bulk inserted {written} skills")
+        
+        docs = [
+            {"title": f"Bulk Doc {i}", "content": f"# Bulk Doc {i}", "path": path}
+            for i, path in enumerate(paths)
+        ]
+        assert registry.bulk_upsert_documents(docs, generate_embedding_flag=False) == 3
+        print(f"  [PASS] Bulk inserted 3 documents")
+        
+        # Unchanged content is skipped by hash, changed content is rewritten
+        docs[0]["content"] = "# Bulk Doc 0\n\nChanged."
+        assert registry.bulk_upsert_documents(docs, generate_embedding_flag=False) == 1
+        assert registry.get_document(paths[0])["content"].endswith("Changed.")
+        print(f"  [PASS] Bulk upsert only rewrote the changed document")
+        
+        hashes = {path: content_hash(doc["content"]) for path, doc in zip(paths, docs)}
+        hashes[paths[1]] = "stale"
+        assert registry.unchanged_document_paths(hashes) == {paths[0], paths[2]}
+        print(f"  [PASS] Unchanged documents detected by hash")
+        
+        assert sorted(registry.delete_skills(names + ["test-bulk-missing"])) == names
+        assert sorted(registry.delete_documents(paths)) == sorted(paths)
+        print(f"  [PASS] Bulk deletes report what was deleted")
+        
+        cleanup()
+        return True
+    
+    except Exception as e:
+        print(f"  [FAIL] Bulk upsert failed: {e}")
+        cleanup()
+        return False
+
+
+def test_renames_and_state():
+    """Test path renames keep embeddings, path deletes, and registry state."""
+    print("Testing renames and index state...")
+    registry = SkillRegistry()
+    
+    old_path, new_path = "docs/test-rename-old.md", "docs/test-rename-new.md"
+    skill_name = "test-rename-skill"
+    
+    def cleanup():
+        registry.delete_skill(skill_name)
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM documents WHERE path = ANY(%s)", ([old_path, new_path],))
+            cur.execute("DELETE FROM registry_state WHERE key = 'test_key'")
+    
+    try:
+        assert classify("docs/sub/a.md") == "doc"
+        assert classify("skills/x/SKILL.md") == "skill"
+        assert classify("skills/x/references/r.md") == "reference"
+        assert classify("skills/x/scripts/a.py") is None
+        print("  [PASS] Changed paths classified")
+        
+        doc_id = registry.upsert_document(
+            title="Rename Test", content="# Rename Test", path=old_path, generate_embedding_flag=False
+        )
+        with get_cursor() as cur:
+            cur.execute(
+                "UPDATE documents SET embedding = %s WHERE id = %s",
+                ([0.1] * EMBEDDING_DIMENSION, doc_id)
+            )
+        assert registry.rename_document(old_path, new_path)
+        moved = execute_query("SELECT id, embedding FROM documents WHERE path = %s", (new_path,))
+        assert str(moved[0]["id"]) == doc_id and moved[0]["embedding"] is not None
+        assert not registry.rename_document(old_path, new_path)
+        print("  [PASS] Document rename kept its ID and embedding")
+        
+        registry.upsert_skill(
+            name=skill_name, description="", content="# Skill",
+            path=f"skills/{skill_name}/SKILL.md", generate_embedding_flag=False
+        )
+        assert registry.rename_skill(f"skills/{skill_name}/SKILL.md", "skills/moved/SKILL.md")
+        assert registry.get_skill_by_path("skills/moved/SKILL.md")["name"] == skill_name
+        assert registry.delete_skill_by_path("skills/moved/SKILL.md")
+        assert registry.delete_document(new_path)
+        print("  [PASS] Skill rename and path deletes")
+        
+        assert registry.get_state("test_key") is None
+        registry.set_state("test_key", "abc")
+        registry.set_state("test_key", "def")
+        assert registry.get_state("test_key") == "def"
+        print("  [PASS] Registry state round trip")
+        
+        cleanup()
+        return True
+    
+    except Exception as e:
+        print(f"  [FAIL] Renames and state failed: {e}")
+        cleanup()
+        return False
+
+
+def test_namespaces():
+    """Test that namespaces partition skills and documents."""
+    print("Testing namespaces...")
+    default = SkillRegistry()
+    tenant = SkillRegistry(namespace="test_tenant")
+    skill_name, doc_path = "test-namespace-skill", "docs/test-namespace.md"
+    
+    def cleanup():
+        for registry in (default, tenant):
+            registry.delete_skill(skill_name)
+            registry.delete_document(doc_path)
+        # Drop the tenant's partitions (links first) so runs leave no tables behind
+        with get_cursor() as cur:
+            for parent in ("skill_sources", "documents", "skills"):
+                cur.execute(f"DROP TABLE IF EXISTS {parent}_test_tenant")
+        _ready_namespaces.discard("test_tenant")
+    
+    try:
+        try:
+            SkillRegistry(namespace="Bad-Name")
+            print("  [FAIL] Invalid namespace accepted")
+            return False
+        except ValueError:
+            print("  [PASS] Invalid namespace rejected")
+        
+        partitions = execute_query("SELECT to_regclass('skills_test_tenant') AS partition")
+        assert partitions[0]["partition"] is not None
+        print("  [PASS] Partition created for new namespace")
+        
+        for registry, description in ((default, "default copy"), (tenant, "tenant copy")):
+            registry.upsert_skill(
+                name=skill_name, description=description, content="# Skill",
+                path=f"skills/{skill_name}/SKILL.md", generate_embedding_flag=False
+            )
+        tenant.upsert_document(
+            title="Namespace Test", content="# Namespace Test", path=doc_path,
+            generate_embedding_flag=False
+        )
+        
+        assert default.get_skill(skill_name)["description"] == "default copy"
+        assert tenant.get_skill(skill_name)["description"] == "tenant copy"
+        print("  [PASS] Same skill name kept apart per namespace")
+        
+        assert tenant.get_document(doc_path) is not None
+        assert default.get_document(doc_path) is None
+        assert doc_path not in [d["path"] for d in default.list_documents()]
+        print("  [PASS] Documents invisible outside their namespace")
+        
+        assert default.delete_skill(skill_name)
+        assert tenant.get_skill(skill_name) is not None
+        print("  [PASS] Deletes stay within a namespace")
+        
+        cleanup()
+        return True
+    
+    except Exception as e:
+        print(f"  [FAIL] Namespaces failed: {e}")
+        cleanup()
+        return False
+
+
 def test_skill_document_linking():
     """Test linking skills to documents."""
     print("Testing skill-document linking...")
@@ -224,6 +417,13 @@ def test_skill_document_linking():
         assert len(skills) == 1
         print(f"  [PASS] Retrieved document skills: {len(skills)} skill(s)")
         
+        # Skill with sources in one query
+        expanded = registry.get_skill_with_sources("test-link-skill")
+        assert len(expanded["sources"]) == 1
+        assert expanded["sources"][0]["id"] == doc_id
+        assert expanded["versions"] == []
+        print(f"  [PASS] Retrieved skill with sources in one query")
+        
         # Cleanup
         registry.delete_skill("test-link-skill")
         with get_cursor() as cur:
@@ -344,6 +544,99 @@ Some content here.
         return False
 
 
+def test_markdown_scan():
+    """Test combined frontmatter + title scanning."""
+    print("Testing markdown scan...")
+    
+    try:
+        frontmatter, title = scan_markdown("---\nname: named-doc\n---\n\n# Heading\n")
+        assert frontmatter["name"] == "named-doc"
+        assert title == "named-doc"
+        
+        frontmatter, title = scan_markdown("# Heading Only\n\nBody.")
+        assert frontmatter == {}
+        assert title == "Heading Only"
+        
+        # The title comes from after the frontmatter, never from a YAML comment
+        frontmatter, title = scan_markdown("---\n# comment\ndoc_type: blog\n---\n\n# Body Title\n")
+        assert frontmatter == {"doc_type": "blog"}
+        assert title == "Body Title"
+        
+        # Empty or non-mapping frontmatter yields an empty dict
+        assert parse_skill_frontmatter("---\n\n---\n# T") == {}
+        assert parse_skill_frontmatter("---\n- a\n- b\n---\n# T") == {}
+        print(f"  [PASS] Scanned frontmatter and titles")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Markdown scan failed: {e}")
+        return False
+
+
+def test_mmr_rerank():
+    """Test MMR re-ranking prefers coverage over near-duplicates."""
+    print("Testing MMR re-ranking...")
+    
+    query = [1.0, 0.0, 0.0]
+    candidates = [
+        [0.9, 0.1, 0.0],   # Best match
+        [0.9, 0.11, 0.0],  # Near-duplicate of the best match
+        [0.7, 0.0, 0.7],   # Relevant, but covers a different direction
+    ]
+    
+    try:
+        relevance_only = mmr_select(query, candidates, k=2, lambda_mult=1.0)
+        assert relevance_only == [0, 1]
+        print(f"  [PASS] lambda=1.0 keeps relevance order: {relevance_only}")
+        
+        diverse = mmr_select(query, candidates, k=2, lambda_mult=0.5)
+        assert diverse == [0, 2]
+        print(f"  [PASS] lambda=0.5 skips the near-duplicate: {diverse}")
+        
+        assert mmr_select(query, candidates, k=10) == mmr_select(query, candidates, k=3)
+        assert mmr_select(query, [], k=3) == []
+        print(f"  [PASS] Handles k larger than the pool and empty pools")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] MMR re-ranking failed: {e}")
+        return False
+
+
+def test_instrumentation():
+    """Test span recording and the metrics sinks."""
+    print("Testing instrumentation...")
+    
+    histogram = instrumentation.HistogramSink()
+    prometheus = instrumentation.PrometheusSink()
+    
+    try:
+        instrumentation.enable(histogram, prometheus)
+        registry = SkillRegistry()
+        registry.list_skills()
+        registry.get_stats()
+        instrumentation.increment("test.cache_hit")
+        instrumentation.disable()
+        
+        # Disabled instrumentation records nothing
+        registry.list_skills()
+        
+        summary = histogram.summary()
+        assert summary["registry.list_skills"]["count"] == 1
+        assert summary["db.execute_query"]["count"] >= 2
+        assert summary["db.connect"]["count"] >= 2
+        assert summary["counters"]["test.cache_hit"] == 1
+        print(f"  [PASS] Recorded {len(summary) - 1} span types")
+        
+        text = prometheus.render()
+        assert 'registry_span_duration_seconds_count{span="registry.get_stats"} 1' in text
+        print(f"  [PASS] Rendered Prometheus metrics")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Instrumentation failed: {e}")
+        return False
+    finally:
+        instrumentation.disable()
+
+
 def test_stats():
     """Test stats retrieval."""
     print("Testing stats...")
@@ -361,6 +654,42 @@ def test_stats():
         return False
 
 
+def test_prepared_statements():
+    """Test hot queries prepared on pooled connections give the same results."""
+    print("Testing prepared statements...")
+    registry = SkillRegistry()
+    name = "test-prepared-skill"
+    
+    try:
+        registry.upsert_skill(
+            name=name, description="Prepared", content="# Prepared",
+            path=f"skills/{name}/SKILL.md", generate_embedding_flag=False
+        )
+        plain = registry.get_skill(name)
+        
+        init_pool(maxconn=1)
+        try:
+            # Same pooled connection: prepared by the first call, executed by the rest
+            first = registry.get_skill(name)
+            second = registry.get_skill(name)
+            prepared = execute_query(
+                "SELECT name FROM pg_prepared_statements WHERE name = 'get_skill'"
+            )
+        finally:
+            close_pool()
+        
+        assert plain["id"] == first["id"] == second["id"]
+        assert prepared, "get_skill was not prepared on the pooled connection"
+        print("  [PASS] Prepared get_skill matches the plain query")
+        
+        registry.delete_skill(name)
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Prepared statements failed: {e}")
+        registry.delete_skill(name)
+        return False
+
+
 def test_semantic_search():
     """Test semantic search (requires OPENAI_API_KEY)."""
     print("Testing semantic search...")
@@ -421,11 +750,18 @@ def main():
     results.append(("Tables Exist", test_tables_exist()))
     results.append(("Frontmatter Parsing", test_frontmatter_parsing()))
     results.append(("Title Extraction", test_title_extraction()))
+    results.append(("Markdown Scan", test_markdown_scan()))
+    results.append(("MMR Re-ranking", test_mmr_rerank()))
     results.append(("Skill CRUD", test_skill_crud()))
     results.append(("Document CRUD", test_document_crud()))
+    results.append(("Bulk Upsert", test_bulk_upsert()))
+    results.append(("Renames and Index State", test_renames_and_state()))
+    results.append(("Namespaces", test_namespaces()))
     results.append(("Skill-Document Linking", test_skill_document_linking()))
     results.append(("Version Tracking", test_version_tracking()))
     results.append(("Stats", test_stats()))
+    results.append(("Prepared Statements", test_prepared_statements()))
+    results.append(("Instrumentation", test_instrumentation()))
     results.append(("Semantic Search", test_semantic_search()))
     
     # Summary
@@ -7,15 +7,23 @@ PRODUCTION NOTES:
 - The attention estimation functions in this module simulate U-shaped attention curves
   for demonstration purposes. Production systems should extract actual attention weights
   from model internals when available.
-- Token estimation uses simplified heuristics (~4 chars/token). Production systems
-  should use model-specific tokenizers for accurate counts.
+- Token counts come from the shared tokenizer in context-fundamentals/scripts/tokenizer.py
+  (the model's BPE encoding via tiktoken, ~4 chars/token if it is unavailable).
 - The poisoning and hallucination detection uses pattern matching as a proxy.
   Production systems may benefit from fine-tuned classifiers or model-based detection.
 """
 
 import numpy as np
+from pathlib import Path
 from typing import List, Dict
 import re
+import runpy
+
+# Shared with the other context skills (see load_tokenizer.py)
+runpy.run_path(str(
+    Path(__file__).resolve().parents[2] / "context-fundamentals" / "scripts" / "load_tokenizer.py"
+))
+from context_fundamentals_tokenizer import DEFAULT_MODEL, count_tokens
 
 
 def measure_attention_distribution(context_tokens: List[str], query: str) -> List[Dict]:
@@ -296,18 +304,20 @@ class PoisoningDetector:
 # Context Health Score
 
 class ContextHealthAnalyzer:
-    def __init__(self, context_limit: int = 100000):
+    def __init__(self, context_limit: int = 100000, model: str = DEFAULT_MODEL):
         self.context_limit = context_limit
+        self.model = model
         self.metrics_history = []
     
     def analyze(self, context: str, critical_positions: List[int] = None) -> Dict:
         """
         Perform comprehensive context health analysis.
         """
+        # Words stand in for positions in the attention simulation
         tokens = context.split()
         
         # Basic metrics
-        token_count = len(tokens)
+        token_count = count_tokens(context, self.model)
         utilization = token_count / self.context_limit
         
         # Attention analysis
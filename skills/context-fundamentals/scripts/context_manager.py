@@ -3,46 +3,39 @@ Context Management Utilities
 
 This module provides utilities for managing context in agent systems.
 
-Note: This module uses simplified estimation functions for demonstration.
-Production systems should use actual tokenizers (tiktoken for OpenAI,
-model-specific tokenizers for other providers) for accurate token counts.
+Token counts come from the shared tokenizer module (tokenizer.py): the
+model's BPE encoding via tiktoken, memoized by content hash, with the
+~4 characters per token heuristic only as a fallback.
 """
 
+from pathlib import Path
 from typing import Dict, List
 import hashlib
+import runpy
 
+# Shared with the other context skills (see load_tokenizer.py)
+runpy.run_path(str(Path(__file__).resolve().parent / "load_tokenizer.py"))
+from context_fundamentals_tokenizer import DEFAULT_MODEL, count_tokens, count_tokens_batch
 
-def estimate_token_count(text: str) -> int:
+
+def estimate_token_count(text: str, model: str = DEFAULT_MODEL) -> int:
     """
-    Estimate token count for text.
-    
-    Uses approximation: ~4 characters per token for English.
-    
-    WARNING: This is a rough estimate for demonstration purposes.
-    Production systems should use actual tokenizers:
-    - OpenAI: tiktoken library
-    - Anthropic: Model-specific tokenizers
-    - Other: Provider-specific tokenization
+    Count tokens in text for a model.
     
-    Actual tokenization varies by:
-    - Model architecture
-    - Content type (code vs prose)
-    - Language (non-English typically has higher token/char ratio)
+    Uses the model's BPE encoding when tiktoken and the encoding are
+    available, otherwise ~4 characters per token. Repeated text is
+    counted from cache.
     """
-    return len(text) // 4
+    return count_tokens(text, model)
 
 
-def estimate_message_tokens(messages: list) -> int:
+def estimate_message_tokens(messages: list, model: str = DEFAULT_MODEL) -> int:
     """Estimate token count for message list."""
-    total = 0
-    for msg in messages:
-        content = msg.get("content", "")
-        total += estimate_token_count(content)
-        total += 10  # Overhead for role/formatting
-    return total
+    counts = count_tokens_batch([msg.get("content", "") for msg in messages], model)
+    return sum(counts) + 10 * len(messages)  # Overhead for role/formatting
 
 
-def count_tokens_by_type(context: Dict) -> Dict:
+def count_tokens_by_type(context: Dict, model: str = DEFAULT_MODEL) -> Dict:
     """Break down token usage by context type."""
     breakdown = {
         "system_prompt": 0,
@@ -55,21 +48,23 @@ def count_tokens_by_type(context: Dict) -> Dict:
     
     # System prompt
     if "system" in context:
-        breakdown["system_prompt"] = estimate_token_count(context["system"])
+        breakdown["system_prompt"] = estimate_token_count(context["system"], model)
     
     # Tool definitions
     if "tools" in context:
-        for tool in context["tools"]:
-            breakdown["tool_definitions"] += estimate_token_count(str(tool))
+        breakdown["tool_definitions"] = sum(
+            count_tokens_batch([str(tool) for tool in context["tools"]], model)
+        )
     
     # Retrieved documents
     if "documents" in context:
-        for doc in context["documents"]:
-            breakdown["retrieved_documents"] += estimate_token_count(doc)
+        breakdown["retrieved_documents"] = sum(
+            count_tokens_batch(context["documents"], model)
+        )
     
     # Message history
     if "messages" in context:
-        breakdown["message_history"] = estimate_message_tokens(context["messages"])
+        breakdown["message_history"] = estimate_message_tokens(context["messages"], model)
     
     return breakdown
 
@@ -79,8 +74,9 @@ def count_tokens_by_type(context: Dict) -> Dict:
 class ContextBuilder:
     """Build context with budget management."""
     
-    def __init__(self, context_limit: int = 100000):
+    def __init__(self, context_limit: int = 100000, model: str = DEFAULT_MODEL):
         self.context_limit = context_limit
+        self.model = model
         self.sections: Dict[str, str] = {}
         self.order: List[str] = []
     
@@ -94,7 +90,7 @@ class ContextBuilder:
             "content": content,
             "priority": priority,
             "category": category,
-            "tokens": estimate_token_count(content)
+            "tokens": estimate_token_count(content, self.model)
         }
     
     def build(self, max_tokens: int = None) -> str:
@@ -178,7 +174,7 @@ def truncate_context(context: str, max_tokens: int,
     return " ".join(kept)
 
 
-def truncate_messages(messages: list, max_tokens: int) -> list:
+def truncate_messages(messages: list, max_tokens: int, model: str = DEFAULT_MODEL) -> list:
     """
     Truncate message history while preserving structure.
     
@@ -199,10 +195,11 @@ def truncate_messages(messages: list, max_tokens: int) -> list:
         else:
             recent_messages.append(msg)
     
-    # Calculate token usage
-    tokens_for_system = estimate_token_count(system_prompt["content"]) if system_prompt else 0
-    tokens_for_recent = estimate_message_tokens(recent_messages)
-    tokens_for_summary = estimate_token_count(summary["content"]) if summary else 0
+    # Calculate token usage (one batch; the loop below reads the same counts)
+    recent_counts = count_tokens_batch([msg.get("content", "") for msg in recent_messages], model)
+    tokens_for_system = estimate_token_count(system_prompt["content"], model) if system_prompt else 0
+    tokens_for_recent = sum(recent_counts) + 10 * len(recent_messages)
+    tokens_for_summary = estimate_token_count(summary["content"], model) if summary else 0
     
     available = max_tokens - tokens_for_system - tokens_for_summary
     
@@ -212,8 +209,7 @@ def truncate_messages(messages: list, max_tokens: int) -> list:
         truncated_recent = []
         current_tokens = 0
         
-        for msg in reversed(recent_messages):
-            msg_tokens = estimate_token_count(msg.get("content", ""))
+        for msg, msg_tokens in zip(reversed(recent_messages), reversed(recent_counts)):
             if current_tokens + msg_tokens <= available:
                 truncated_recent.insert(0, msg)
                 current_tokens += msg_tokens
@@ -232,11 +228,12 @@ def truncate_messages(messages: list, max_tokens: int) -> list:
 
 # Context Validation
 
-def validate_context_structure(context: Dict) -> Dict:
+def validate_context_structure(context: Dict, model: str = DEFAULT_MODEL) -> Dict:
     """
     Validate context structure for common issues.
     
-    Returns validation results with issues and recommendations.
+    Section lengths are counted with the model's tokenizer. Returns
+    validation results with issues and recommendations.
     """
     issues = []
     recommendations = []
@@ -248,7 +245,7 @@ def validate_context_structure(context: Dict) -> Dict:
             recommendations.append(f"Remove or populate {section}")
     
     # Check for excessive length
-    total_tokens = sum(estimate_token_count(str(c)) for c in context.values())
+    total_tokens = sum(count_tokens_batch([str(c) for c in context.values()], model))
     if total_tokens > 80000:
         issues.append(f"Context length ({total_tokens} tokens) exceeds recommended limit")
         recommendations.append("Consider context compaction or partitioning")
@@ -0,0 +1,26 @@
+"""
+Load tokenizer.py once per process as the module context_fundamentals_tokenizer.
+
+The context skills run this file with runpy.run_path() and then import
+from context_fundamentals_tokenizer. Loading by path under a unique name
+leaves sys.path alone, so an installed "tokenizer" package is never used,
+and every skill shares one module and one count cache.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+MODULE_NAME = "context_fundamentals_tokenizer"
+
+if MODULE_NAME not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        MODULE_NAME, Path(__file__).resolve().parent / "tokenizer.py"
+    )
+    sys.modules[MODULE_NAME] = importlib.util.module_from_spec(_spec)
+    try:
+        _spec.loader.exec_module(sys.modules[MODULE_NAME])
+    except BaseException:
+        # Never leave a half-initialised module for the next import to find
+        sys.modules.pop(MODULE_NAME, None)
+        raise
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared tokenizer.
+
+Run directly or with pytest:
+    python test_tokenizer.py
+"""
+
+import os
+import runpy
+import sys
+
+import pytest
+
+runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_tokenizer.py"))
+import context_fundamentals_tokenizer as tokenizer
+from context_fundamentals_tokenizer import Tokenizer, encoding_name_for_model
+
+
+class FakeEncoding:
+    """One token per word, recording which texts each call encoded."""
+    
+    def __init__(self):
+        self.single = []
+        self.batches = []
+    
+    def encode_ordinary(self, text):
+        self.single.append(text)
+        return text.split()
+    
+    def encode_ordinary_batch(self, texts):
+        self.batches.append(list(texts))
+        return [text.split() for text in texts]
+
+
+def fake_tokenizer(cache_size=10000):
+    """A Tokenizer counting with FakeEncoding, so no encoding files are needed."""
+    counter = Tokenizer(cache_size=cache_size)
+    counter._encoding, counter._loaded = FakeEncoding(), True
+    return counter
+
+
+def test_cache_hits_and_misses():
+    """Repeated texts are counted from the cache and not encoded again."""
+    print("Testing cache accounting...")
+    
+    counter = fake_tokenizer()
+    assert counter.count_batch(["one two", "three"]) == [2, 1]
+    assert (counter.hits, counter.misses) == (0, 2)
+    assert counter.count("one two") == 2
+    assert counter.count_batch(["three", "four five six"]) == [1, 3]
+    assert (counter.hits, counter.misses) == (2, 3)
+    
+    encoding = counter._encoding
+    assert encoding.batches == [["one two", "three"]]
+    # A single miss is encoded without the batch call
+    assert encoding.single == ["four five six"]
+    
+    print("  [PASS] Hits and misses counted, cached texts not re-encoded")
+
+
+def test_batch_deduplicates_texts():
+    """A text repeated within one batch is encoded once and counted for every row."""
+    print("Testing deduplication within a batch...")
+    
+    counter = fake_tokenizer()
+    assert counter.count_batch(["a b", "c", "a b", "a b"]) == [2, 1, 2, 2]
+    assert counter._encoding.batches == [["a b", "c"]]
+    assert (counter.hits, counter.misses) == (0, 2)
+    
+    print("  [PASS] Each distinct text encoded once")
+
+
+def test_lru_eviction():
+    """The cache keeps at most cache_size texts, evicting the least recently used."""
+    print("Testing LRU eviction...")
+    
+    counter = fake_tokenizer(cache_size=2)
+    counter.count("a")
+    counter.count("b")
+    counter.count("a")  # Now b is the least recently used
+    counter.count("c")
+    assert len(counter._cache) == 2
+    assert (counter.hits, counter.misses) == (1, 3)
+    
+    counter.count("a")
+    assert (counter.hits, counter.misses) == (2, 3)
+    counter.count("b")
+    assert (counter.hits, counter.misses) == (2, 4)
+    
+    uncached = fake_tokenizer(cache_size=0)
+    uncached.count("a")
+    uncached.count("a")
+    assert len(uncached._cache) == 0 and uncached.misses == 2
+    
+    print("  [PASS] Least recently used text evicted at cache_size")
+
+
+def test_heuristic_fallback(monkeypatch):
+    """Without tiktoken, counts are ~4 characters per token."""
+    print("Testing the heuristic fallback...")
+    
+    monkeypatch.setattr(tokenizer, "tiktoken", None)
+    counter = Tokenizer("gpt-4o")
+    assert not counter.exact
+    assert counter.count_batch(["abcdefgh", "", "abc"]) == [2, 0, 0]
+    assert counter.count("x" * 400) == tokenizer.heuristic_token_count("x" * 400) == 100
+    
+    print("  [PASS] Heuristic counts when tiktoken is missing")
+
+
+@pytest.mark.parametrize("tiktoken_installed", [True, False])
+def test_encoding_name_for_model(monkeypatch, tiktoken_installed):
+    """Models map to their BPE encoding, with or without tiktoken's own table."""
+    print("Testing encoding selection...")
+    
+    if not tiktoken_installed:
+        monkeypatch.setattr(tokenizer, "tiktoken", None)
+    assert encoding_name_for_model("gpt-4o") == "o200k_base"
+    assert encoding_name_for_model("gpt-4") == "cl100k_base"
+    assert encoding_name_for_model("claude-sonnet") == tokenizer.DEFAULT_ENCODING
+    
+    print("  [PASS] gpt-4o -> o200k_base, gpt-4 -> cl100k_base")
+
+
+def main():
+    sys.exit(pytest.main([__file__, "-q"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Shared Token Counting
+
+This module counts tokens with real BPE encoders (tiktoken) selected per
+model, and is used by the context management, optimization and
+degradation scripts so every budget is measured the same way.
+
+Counts are memoized by content hash, so system prompts, tool definitions
+and messages that are counted on every turn are only encoded once. When
+tiktoken or the model's encoding is unavailable (not installed, or the
+encoding files cannot be downloaded), counts fall back to the
+~4 characters per token heuristic.
+
+Note: Anthropic and Google do not publish offline tokenizers. Their
+models are counted with DEFAULT_ENCODING, which is much closer than the
+character heuristic for code and non-English text but not exact; use
+the provider's token counting API where exact numbers matter.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # Counts fall back to the heuristic
+    tiktoken = None
+
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+# Model name prefixes tiktoken does not know, most specific first
+MODEL_ENCODINGS = [
+    ("gpt-5", "o200k_base"),
+    ("gpt-4.1", "o200k_base"),
+    ("gpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("o4", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+]
+
+
+def heuristic_token_count(text: str) -> int:
+    """Approximate token count: ~4 characters per token for English."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def encoding_name_for_model(model: str) -> str:
+    """Name of the BPE encoding used to count tokens for a model."""
+    if tiktoken is not None:
+        try:
+            return tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            pass
+    for prefix, encoding in MODEL_ENCODINGS:
+        if model.startswith(prefix):
+            return encoding
+    return DEFAULT_ENCODING
+
+
+class Tokenizer:
+    """
+    Token counter for one model, with an LRU cache keyed by content hash.
+    
+    Safe to share between threads. hits and misses count cache lookups.
+    """
+    
+    def __init__(self, model: str = DEFAULT_MODEL, cache_size: int = 10000):
+        self.model = model
+        self.encoding_name = encoding_name_for_model(model)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encoding = None
+        self._loaded = False
+    
+    @property
+    def exact(self) -> bool:
+        """True when counts come from a BPE encoder rather than the heuristic."""
+        return self._load() is not None
+    
+    def _load(self):
+        """The tiktoken encoding, loaded on first use; None if unavailable."""
+        if not self._loaded:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception:
+                    # Encoding files are fetched on first use and may be unreachable
+                    encoding = None
+            with self._lock:
+                self._encoding, self._loaded = encoding, True
+        return self._encoding
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in text."""
+        return self.count_batch([text])[0]
+    
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """Token counts for many texts; uncached texts are encoded in one batch."""
+        keys = [hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+                for text in texts]
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                count = self._cache.get(key)
+                if count is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    counts[i] = count
+            self.hits += len(texts) - sum(len(rows) for rows in missing.values())
+            self.misses += len(missing)
+        
+        if missing:
+            # Each distinct text is encoded once, outside the lock
+            firsts = [rows[0] for rows in missing.values()]
+            encoding = self._load()
+            if encoding is None:
+                encoded = [heuristic_token_count(texts[i]) for i in firsts]
+            elif len(firsts) == 1:
+                # The batch call starts a thread pool, which costs more than one encode
+                encoded = [len(encoding.encode_ordinary(texts[firsts[0]]))]
+            else:
+                encoded = [len(tokens) for tokens in
+                           encoding.encode_ordinary_batch([texts[i] for i in firsts])]
+            
+            with self._lock:
+                for (key, rows), count in zip(missing.items(), encoded):
+                    for i in rows:
+                        counts[i] = count
+                    if self.cache_size:
+                        self._cache[key] = count
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        return counts
+
+
+_tokenizers: Dict[str, Tokenizer] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(model: str = DEFAULT_MODEL) -> Tokenizer:
+    """The shared Tokenizer for a model, created on first use."""
+    with _tokenizers_lock:
+        if model not in _tokenizers:
+            _tokenizers[model] = Tokenizer(model)
+        return _tokenizers[model]
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Number of tokens in text for a model."""
+    return get_tokenizer(model).count(text)
+
+
+def count_tokens_batch(texts: List[str], model: str = DEFAULT_MODEL) -> List[int]:
+    """Token counts for many texts for a model, encoded in one batch."""
+    return get_tokenizer(model).count_batch(texts)
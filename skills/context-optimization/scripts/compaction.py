@@ -4,11 +4,9 @@ Context Optimization Utilities
 This module provides utilities for context compaction, observation masking, and budget management.
 
 PRODUCTION NOTES:
-- Token estimation uses simplified heuristics (~4 chars/token for English).
-  Production systems should use model-specific tokenizers:
-  - OpenAI: tiktoken library
-  - Anthropic: anthropic tokenizer
-  - Local models: HuggingFace tokenizers
+- Token counts come from the shared tokenizer in
+  context-fundamentals/scripts/tokenizer.py: the model's BPE encoding via
+  tiktoken, memoized by content hash, with ~4 chars/token as a fallback.
   
 - Summarization functions use simple heuristics for demonstration.
   Production systems should use:
@@ -20,42 +18,37 @@ PRODUCTION NOTES:
   with actual inference infrastructure metrics.
 """
 
+from pathlib import Path
 from typing import List, Dict
 import hashlib
+import runpy
 import time
 
+# Shared with the other context skills (see load_tokenizer.py)
+runpy.run_path(str(
+    Path(__file__).resolve().parents[2] / "context-fundamentals" / "scripts" / "load_tokenizer.py"
+))
+from context_fundamentals_tokenizer import DEFAULT_MODEL, count_tokens, count_tokens_batch
 
-def estimate_token_count(text: str) -> int:
+
+def estimate_token_count(text: str, model: str = DEFAULT_MODEL) -> int:
     """
-    Estimate token count for text.
-    
-    Uses approximation: ~4 characters per token for English.
+    Count tokens in text for a model.
     
-    WARNING: This is a rough estimate. Actual tokenization varies by:
-    - Model (GPT-5.2, Claude 4.5, Gemini 3 have different tokenizers)
-    - Content type (code typically has higher token density)
-    - Language (non-English may have 2-3x higher token/char ratio)
-    
-    Production usage:
-        import tiktoken
-        enc = tiktoken.encoding_for_model("gpt-4")  # Use appropriate model
-        token_count = len(enc.encode(text))
+    Uses the model's BPE encoding when tiktoken and the encoding are
+    available, otherwise ~4 characters per token. Repeated text (tool
+    outputs, system prompts) is counted from cache.
     """
-    return len(text) // 4
+    return count_tokens(text, model)
 
 
-def estimate_message_tokens(messages: list) -> int:
+def estimate_message_tokens(messages: list, model: str = DEFAULT_MODEL) -> int:
     """Estimate token count for message list."""
-    total = 0
-    for msg in messages:
-        # Count content
-        content = msg.get("content", "")
-        total += estimate_token_count(content)
-        
-        # Add overhead for role/formatting
-        total += 10
+    # Count content in one batch
+    counts = count_tokens_batch([msg.get("content", "") for msg in messages], model)
     
-    return total
+    # Add overhead for role/formatting
+    return sum(counts) + 10 * len(messages)
 
 
 # Compaction Functions
@@ -242,8 +235,9 @@ class ObservationStore:
 # Context Budget Management
 
 class ContextBudget:
-    def __init__(self, total_limit: int):
+    def __init__(self, total_limit: int, model: str = DEFAULT_MODEL):
         self.total_limit = total_limit
+        self.model = model
         self.allocated = {
             "system_prompt": 0,
             "tool_definitions": 0,
@@ -269,6 +263,10 @@ class ContextBudget:
         self.allocated[category] += amount
         return True
     
+    def allocate_content(self, category: str, content: str) -> bool:
+        """Allocate the token count of content (for this budget's model) to category."""
+        return self.allocate(category, estimate_token_count(content, self.model))
+    
     def remaining(self) -> int:
         """Get remaining unallocated budget."""
         current = sum(self.allocated.values())
@@ -2,70 +2,1030 @@
 Memory System Implementation
 
 This module provides utilities for implementing memory systems.
+
+Benchmarks:
+    python memory_store.py benchmark-ann --n 100000
+    python memory_store.py benchmark-quantization --n 50000
+    python memory_store.py benchmark-time-range --n 100000 --window-days 7
+    python memory_store.py benchmark-sessions --sessions 200 --rows-per-session 500
+    python memory_store.py stress-concurrency --readers 8 --writers 2
 """
 
 import numpy as np
-from typing import List, Dict, Any, Optional
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import json
+import bisect
+import copy
 import hashlib
+import itertools
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import weakref
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
 
 
-class VectorStore:
-    """Simple vector store with metadata indexing."""
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """Scale a vector to unit length as float32 (zero vectors stay zero)."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale every row to unit length as float32 (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without a full sort."""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer; waiting writers go first.
+    
+    Re-entrant: a thread may re-acquire a lock it holds, and the writer
+    may also read. A reader cannot upgrade to writing (that would wait
+    on itself), so read-then-write sections must take the write lock.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writers_waiting = 0
+        self._local = threading.local()
+    
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, "reads", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.reads = depth + 1
+            try:
+                yield
+            finally:
+                self._local.reads = depth
+            return
+        
+        with self._condition:
+            while self._writer is not None or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        self._local.reads = 1
+        try:
+            yield
+        finally:
+            self._local.reads = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+    
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+        if getattr(self._local, "reads", 0):
+            raise RuntimeError("Cannot take the write lock while holding the read lock")
+        
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+
+def _reads(method):
+    """Run a method under its object's read lock."""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _writes(method):
+    """Run a method under its object's write lock."""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index (NumPy only).
+    
+    Rows are bucketed by their nearest of n_lists k-means centroids. A query
+    scores only the rows in the n_probe buckets whose centroids are closest
+    to it, so raising n_probe trades speed for recall. Vectors stay in the
+    owning VectorStore; the index only holds row ids and scores them
+    through the store (so compact encodings are searched directly).
+    """
+    
+    def __init__(self, n_lists: int = 256, n_probe: int = 8,
+                 min_train_size: Optional[int] = None,
+                 iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        # Enough points per centroid for k-means to be meaningful
+        self.min_train_size = min_train_size or 39 * n_lists
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[array] = []
+    
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+    
+    def build(self, vectors: np.ndarray, ids: np.ndarray):
+        """Train centroids on the given rows (vectors[i] is row ids[i]) and bucket all of them."""
+        self._train(vectors)
+        self._lists = [array("q") for _ in range(len(self.centroids))]
+        self.add(ids, vectors)
+    
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        """Bucket new rows under their nearest centroid."""
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        buckets, starts = np.unique(assignments[order], return_index=True)
+        for bucket, part in zip(buckets, np.split(np.asarray(ids)[order], starts[1:])):
+            self._lists[bucket].extend(part.tolist())
+    
+    def purge(self, deleted: np.ndarray):
+        """Drop tombstoned row ids from the buckets."""
+        for i, bucket in enumerate(self._lists):
+            ids = np.array(bucket, dtype=np.int64)
+            self._lists[i] = array("q", ids[~deleted[ids]].tolist())
+    
+    def expected_scan(self, n_rows: int) -> int:
+        """Rows a query scores on average; smaller candidate sets are cheaper to scan exactly."""
+        return n_rows * min(self.n_probe, self.n_lists) // max(len(self._lists), 1)
+    
+    def search(self, score: Callable[[np.ndarray, np.ndarray], np.ndarray],
+               query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None):
+        """
+        Approximate top-k rows as (ids, scores), best first.
+        
+        score(ids, query) scores the probed rows. Only rows with
+        allowed[id] set are returned. When the probed buckets hold fewer
+        than k allowed rows (selective filters), more buckets are probed
+        until k are found or every bucket has been scanned.
+        """
+        order = np.argsort(-(self.centroids @ query))
+        n_probe = min(self.n_probe, len(order))
+        probed, parts, found = 0, [], 0
+        while True:
+            for bucket in order[probed:n_probe]:
+                ids = np.array(self._lists[bucket], dtype=np.int64)
+                if allowed is not None:
+                    ids = ids[allowed[ids]]
+                parts.append(ids)
+                found += len(ids)
+            probed = n_probe
+            if found >= k or probed == len(order):
+                break
+            n_probe = min(2 * n_probe, len(order))
+        
+        ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        scores = score(ids, query)
+        top = _top_k(scores, k)
+        return ids[top], scores[top]
+    
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """Nearest centroid per row, in chunks to bound the score matrix."""
+        return np.concatenate([
+            np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), chunk)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+    
+    def _train(self, vectors: np.ndarray):
+        """Spherical k-means (vectors are unit length) on a bounded sample."""
+        rng = np.random.default_rng(self.seed)
+        n_lists = min(self.n_lists, len(vectors))
+        sample_size = min(len(vectors), 256 * n_lists)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        self.centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        
+        for _ in range(self.iterations):
+            assignments = self._assign(sample)
+            order = np.argsort(assignments, kind="stable")
+            buckets, starts = np.unique(assignments[order], return_index=True)
+            sums = np.zeros_like(self.centroids)
+            sums[buckets] = np.add.reduceat(sample[order], starts, axis=0)
+            # Re-seed empty buckets from random sample points
+            empty = np.setdiff1d(np.arange(n_lists), buckets)
+            sums[empty] = sample[rng.choice(sample_size, len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self.centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class Quantizer:
+    """
+    Full-precision (float32) row storage, and the interface of the compact ones.
+    
+    A quantizer encodes unit-length float32 rows into codes and scores
+    codes against a float32 query without decoding whole rows first.
+    Quantizers that learn their encoding stay untrained until the owning
+    VectorStore holds min_train_size rows and calls train().
+    """
+    
+    precision = "float32"
+    dtype = np.float32
+    # Scores from codes are exact, so no full-precision side store is needed
+    exact = True
+    min_train_size = 0
+    
+    @property
+    def trained(self) -> bool:
+        return True
+    
+    def code_width(self, dimension: int) -> int:
+        """Code entries per row."""
+        return dimension
+    
+    def bytes_per_vector(self, dimension: int) -> int:
+        return self.code_width(dimension) * np.dtype(self.dtype).itemsize
+    
+    def train(self, vectors: np.ndarray):
+        pass
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=self.dtype)
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+    
+    def score(self, codes: np.ndarray, query: np.ndarray, chunk: int = 16384) -> np.ndarray:
+        """Inner products of encoded rows with a query, in chunks to bound temporaries."""
+        if len(codes) <= chunk:
+            return self._score(codes, query)
+        return np.concatenate([
+            self._score(codes[i:i + chunk], query) for i in range(0, len(codes), chunk)
+        ])
+    
+    def _score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return codes @ query
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        """Learned parameters, for persistence."""
+        return {}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        pass
+
+
+class Float16Quantizer(Quantizer):
+    """
+    Half-precision rows: 2x smaller than float32, scores within about 1e-3.
+    
+    NumPy has no half-precision matrix product, so scans convert codes to
+    float32 chunk by chunk and are slower than float32 scans.
+    """
+    
+    precision = "float16"
+    dtype = np.float16
+    exact = False
+    
+    def _score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ query
+
+
+class ScalarQuantizer(Quantizer):
+    """
+    int8 scalar quantization: 4x smaller than float32.
+    
+    Each dimension is mapped linearly from the [min, max] range seen in
+    training onto [-127, 127] (later values outside it are clipped). A
+    query is scored with one product of the codes against the query scaled
+    per dimension, plus a constant offset.
+    """
+    
+    precision = "int8"
+    dtype = np.int8
+    exact = False
+    
+    def __init__(self, min_train_size: int = 1000):
+        self.min_train_size = min_train_size
+        self.center: Optional[np.ndarray] = None
+        self.step: Optional[np.ndarray] = None
+    
+    @property
+    def trained(self) -> bool:
+        return self.step is not None
+    
+    def train(self, vectors: np.ndarray):
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self.center = ((high + low) / 2).astype(np.float32)
+        self.step = np.maximum((high - low) / 254, 1e-12).astype(np.float32)
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.center) / self.step)
+        return np.clip(codes, -127, 127).astype(np.int8)
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.step + self.center
+    
+    def score(self, codes: np.ndarray, query: np.ndarray, chunk: int = 16384) -> np.ndarray:
+        return super().score(codes, query * self.step, chunk) + np.float32(self.center @ query)
+    
+    def _score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ query
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"center": self.center, "step": self.step}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.center, self.step = state["center"], state["step"]
+
+
+class ProductQuantizer(Quantizer):
+    """
+    Residual product quantization: one byte per subvector_dim dimensions,
+    plus one for a coarse centroid.
+    
+    Each row is first assigned its nearest of n_centroids k-means centroids
+    over whole rows, and only the residual (row minus that centroid) is
+    product quantized: split into subvectors, each replaced by the id of
+    its nearest of n_centroids centroids learned per subspace. Quantizing
+    residuals instead of rows roughly doubles recall at the same code size.
+    With the default 2 dimensions per byte a 128-dimensional row takes 65
+    bytes, about 8x less than float32. Queries are scored by asymmetric
+    distance computation: a table of centroid x query inner products is
+    built once per query, then each row's score is a sum of table lookups.
+    """
+    
+    precision = "pq"
+    dtype = np.uint8
+    exact = False
+    
+    def __init__(self, subvector_dim: int = 2, n_centroids: int = 256,
+                 min_train_size: Optional[int] = None, iterations: int = 10,
+                 seed: int = 0):
+        if not 1 <= n_centroids <= 256:
+            raise ValueError("n_centroids must be between 1 and 256 (codes are one byte)")
+        self.subvector_dim = subvector_dim
+        self.n_centroids = n_centroids
+        self.min_train_size = min_train_size or 39 * n_centroids
+        self.iterations = iterations
+        self.seed = seed
+        # (n_centroids, dimension)
+        self.coarse: Optional[np.ndarray] = None
+        # (n_subvectors, n_centroids, subvector_dim), over residuals
+        self.codebooks: Optional[np.ndarray] = None
+    
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+    
+    def code_width(self, dimension: int) -> int:
+        if dimension % self.subvector_dim:
+            raise ValueError(
+                f"dimension {dimension} is not a multiple of subvector_dim {self.subvector_dim}"
+            )
+        return 1 + dimension // self.subvector_dim
+    
+    def train(self, vectors: np.ndarray):
+        """Coarse k-means on a bounded sample, then k-means per subspace of its residuals."""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), 32 * self.n_centroids)
+        sample = np.asarray(vectors[rng.choice(len(vectors), sample_size, replace=False)],
+                            dtype=np.float32)
+        coarse = self._kmeans(sample[None], rng)[0]
+        residuals = sample - coarse[self._nearest(sample[None], coarse[None])[0]]
+        self.codebooks = self._kmeans(self._subspaces(residuals), rng)
+        self.coarse = coarse
+    
+    def _kmeans(self, parts: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """k-means in every subspace at once: (m, n, width) parts -> (m, k, width) centroids."""
+        n_subvectors, n, width = parts.shape
+        k = min(self.n_centroids, n)
+        codebooks = parts[:, rng.choice(n, k, replace=False)].copy()
+        offsets = k * np.arange(n_subvectors)[:, None]
+        
+        for _ in range(self.iterations):
+            flat = (self._nearest(parts, codebooks) + offsets).ravel()
+            counts = np.bincount(flat, minlength=n_subvectors * k).reshape(n_subvectors, k)
+            sums = np.stack([
+                np.bincount(flat, weights=parts[..., d].ravel(), minlength=n_subvectors * k)
+                for d in range(width)
+            ], axis=-1).reshape(n_subvectors, k, width)
+            # Empty centroids keep their position
+            filled = counts > 0
+            codebooks[filled] = sums[filled] / counts[filled][:, None]
+        return codebooks.astype(np.float32)
+    
+    def encode(self, vectors: np.ndarray, chunk: int = 4096) -> np.ndarray:
+        """Coarse centroid id in column 0, residual subvector ids after it."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), 1 + len(self.codebooks)), dtype=np.uint8)
+        for i in range(0, len(vectors), chunk):
+            rows = vectors[i:i + chunk]
+            nearest = self._nearest(rows[None], self.coarse[None])[0]
+            codes[i:i + chunk, 0] = nearest
+            codes[i:i + chunk, 1:] = self._nearest(
+                self._subspaces(rows - self.coarse[nearest]), self.codebooks
+            ).T
+        return codes
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(len(self.codebooks)), codes[:, 1:]]
+        return self.coarse[codes[:, 0]] + parts.reshape(len(codes), -1)
+    
+    def score(self, codes: np.ndarray, query: np.ndarray, chunk: int = 16384) -> np.ndarray:
+        # Inner product of every centroid with the query (coarse) or the
+        # matching query subvector (residual), one row per code column
+        table = np.concatenate([
+            (self.coarse @ query)[None],
+            np.einsum("mkd,md->mk", self.codebooks, query.reshape(-1, self.subvector_dim)),
+        ])
+        return super().score(codes, table, chunk)
+    
+    def _score(self, codes: np.ndarray, table: np.ndarray) -> np.ndarray:
+        return table[np.arange(len(table)), codes].sum(axis=1)
+    
+    def _subspaces(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, dimension) rows as (n_subvectors, n, subvector_dim)."""
+        return vectors.reshape(len(vectors), -1, self.subvector_dim).transpose(1, 0, 2)
+    
+    @staticmethod
+    def _nearest(parts: np.ndarray, codebooks: np.ndarray, group: int = 4) -> np.ndarray:
+        """Nearest centroid id per (subspace, row), a few subspaces at a time to bound memory."""
+        norms = (codebooks ** 2).sum(axis=-1)
+        return np.concatenate([
+            np.argmin(
+                norms[j:j + group, None, :]
+                - 2 * parts[j:j + group] @ codebooks[j:j + group].transpose(0, 2, 1),
+                axis=-1
+            )
+            for j in range(0, len(parts), group)
+        ])
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"coarse": self.coarse, "codebooks": self.codebooks}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.coarse, self.codebooks = state["coarse"], state["codebooks"]
+
+
+# Storage precisions by name (IntegratedMemorySystem, benchmarks)
+QUANTIZERS = {
+    "float32": Quantizer,
+    "float16": Float16Quantizer,
+    "int8": ScalarQuantizer,
+    "pq": ProductQuantizer,
+}
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str, dimension: int) -> Tuple[Tuple[int, float], ...]:
+    """Map a token to two signed buckets of a dimension-sized vector."""
+    h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+    first = (h % dimension, 1.0 if (h >> 32) & 1 else -1.0)
+    second = ((h >> 33) % dimension, 1.0 if (h >> 63) & 1 else -1.0)
+    return first, second
+
+
+class EmbeddingProvider(ABC):
+    """
+    Interface of the embedding backends behind VectorStore.
+    
+    A real model (an embeddings API, a local sentence encoder) plugs in by
+    implementing embed_batch; rows need not be normalized, the store does
+    that. embed() is a batch of one unless overridden.
+    """
     
     def __init__(self, dimension: int = 768):
         self.dimension = dimension
-        self.vectors: List[np.ndarray] = []
+    
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+    
+    @abstractmethod
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """One embedding row per text."""
+
+
+class HashingEmbedder(EmbeddingProvider):
+    """
+    Deterministic bag-of-words embedding via feature hashing (the default).
+    
+    Texts sharing vocabulary get similar vectors, so similarity search
+    behaves realistically offline. No global RNG state is touched and the
+    vectors are identical across processes.
+    """
+    
+    _TOKEN = re.compile(r"\w+")
+    
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        positions, signs = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dimension
+            for token in self._TOKEN.findall(text.lower()):
+                for bucket, sign in _token_features(token, self.dimension):
+                    positions.append(offset + bucket)
+                    signs.append(sign)
+        
+        vectors = np.zeros(len(texts) * self.dimension, dtype=np.float32)
+        np.add.at(vectors, np.array(positions, dtype=np.int64), np.array(signs, dtype=np.float32))
+        return vectors.reshape(len(texts), self.dimension)
+
+
+class CachedEmbedder(EmbeddingProvider):
+    """
+    LRU cache of text -> embedding in front of another provider.
+    
+    Only texts missing from the cache are sent to the wrapped provider,
+    each once per batch and all in one embed_batch call.
+    """
+    
+    def __init__(self, provider: EmbeddingProvider, maxsize: int = 10000):
+        super().__init__(provider.dimension)
+        self.provider = provider
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        rows: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                vector = self._cache.get(text)
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+                    continue
+                self._cache.move_to_end(text)
+                rows[i] = vector
+            self.hits += len(texts) - sum(len(p) for p in missing.values())
+        
+        if missing:
+            vectors = np.asarray(self.provider.embed_batch(list(missing)), dtype=np.float32)
+            with self._lock:
+                for (text, positions), vector in zip(missing.items(), vectors):
+                    for i in positions:
+                        rows[i] = vector
+                    self._cache[text] = vector
+                    self._cache.move_to_end(text)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                self.misses += len(missing)
+        
+        if not rows:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.stack(rows)
+
+
+def _cached_embedder(embedder: Optional[EmbeddingProvider], dimension: int,
+                     cache_size: int) -> EmbeddingProvider:
+    """The given provider (HashingEmbedder if None) behind an LRU cache of cache_size texts."""
+    embedder = embedder or HashingEmbedder(dimension)
+    if embedder.dimension != dimension:
+        raise ValueError(
+            f"Embedder produces {embedder.dimension}-d vectors, store is {dimension}-d"
+        )
+    if cache_size and not isinstance(embedder, CachedEmbedder):
+        embedder = CachedEmbedder(embedder, cache_size)
+    return embedder
+
+
+class TimeIndex:
+    """
+    Row ids sorted by timestamp (epoch seconds), for [start, end) range selection.
+    
+    A range costs two binary searches plus the rows it returns. Rows that
+    arrive in time order (the usual case: facts stamped as they are
+    stored) extend the sorted arrays directly; out-of-order rows wait in
+    a buffer that is scanned directly and merged in once it outgrows
+    sqrt(n).
+    """
+    
+    MIN_BUFFER = 64
+    
+    def __init__(self):
+        self._times = np.empty(1024, dtype=np.float64)
+        self._rows = np.empty(1024, dtype=np.int64)
+        self._size = 0
+        self._pending: Dict[int, float] = {}  # row -> time
+    
+    def __len__(self) -> int:
+        return self._size + len(self._pending)
+    
+    def add(self, row: int, t: float):
+        if self._size and t < self._times[self._size - 1]:
+            self._pending[row] = t
+            if len(self._pending) > max(self.MIN_BUFFER, math.isqrt(self._size)):
+                self._merge()
+            return
+        if self._size == len(self._times):
+            self._times = np.concatenate([self._times, np.empty_like(self._times)])
+            self._rows = np.concatenate([self._rows, np.empty_like(self._rows)])
+        self._times[self._size] = t
+        self._rows[self._size] = row
+        self._size += 1
+    
+    def remove(self, row: int, t: float):
+        if self._pending.pop(row, None) is not None:
+            return
+        times = self._times[:self._size]
+        lo, hi = np.searchsorted(times, t, side="left"), np.searchsorted(times, t, side="right")
+        for position in (lo + np.flatnonzero(self._rows[lo:hi] == row)).tolist():
+            self._times[position:self._size - 1] = self._times[position + 1:self._size]
+            self._rows[position:self._size - 1] = self._rows[position + 1:self._size]
+            self._size -= 1
+    
+    def range(self, start: float, end: float) -> np.ndarray:
+        """Ids of rows with start <= time < end, in time order."""
+        times = self._times[:self._size]
+        lo, hi = np.searchsorted(times, start, side="left"), np.searchsorted(times, end, side="left")
+        rows = self._rows[lo:hi].copy()
+        extra = [(t, row) for row, t in self._pending.items() if start <= t < end]
+        if not extra:
+            return rows
+        times = np.concatenate([times[lo:hi], [t for t, _ in extra]])
+        rows = np.concatenate([rows, [row for _, row in extra]])
+        return rows[np.argsort(times, kind="stable")]
+    
+    def _merge(self):
+        """Insert the buffered rows into the sorted arrays."""
+        rows = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        times = np.fromiter(self._pending.values(), dtype=np.float64, count=len(self._pending))
+        order = np.argsort(times, kind="stable")
+        positions = np.searchsorted(self._times[:self._size], times[order], side="right")
+        self._times = np.insert(self._times[:self._size], positions, times[order])
+        self._rows = np.insert(self._rows[:self._size], positions, rows[order])
+        self._size = len(self._times)
+        self._pending = {}
+
+
+class VectorStore:
+    """
+    Simple vector store with metadata indexing.
+    
+    Embeddings are normalized to unit length when added and live in one
+    contiguous matrix, so cosine similarity against every memory is a
+    single matrix-vector product. The matrix holds float32 rows by default;
+    with a compact Quantizer it holds codes (float16, int8 or product
+    quantized) that are scored directly. rerank > 0 keeps a full-precision
+    side store and re-scores the best rerank * limit candidates from it;
+    once the quantizer is trained that store is a memory-mapped file (a
+    temporary one unless the store is persistent), so only the re-scored
+    rows are paged in.
+    
+    Texts are embedded by an EmbeddingProvider (HashingEmbedder unless
+    given) behind an LRU cache, so identical strings are embedded once.
+    
+    Safe to share between threads: searches hold the read lock and run in
+    parallel, mutations hold the write lock. Texts are embedded before
+    either is taken, so readers only wait for the in-memory part of an
+    insert.
+    
+    Every metadata key gets an inverted index (value -> sorted row ids), so
+    filtered searches intersect id lists first and score only the rows
+    that match. valid_from timestamps are also kept in a TimeIndex, so a
+    time-range search scores only the rows in its window.
+    
+    With an IVFIndex attached, large searches are approximate: exact
+    scoring is used until the store reaches the index's training size,
+    and for filtered searches whose candidate set is smaller than what a
+    probe would scan. Deleted rows are tombstoned, never reused.
+    """
+    
+    # Purge tombstones from the ANN buckets once this fraction of rows is deleted
+    PURGE_FRACTION = 0.2
+    
+    def __init__(self, dimension: int = 768, initial_capacity: int = 1024,
+                 index: Optional[IVFIndex] = None,
+                 quantizer: Optional[Quantizer] = None, rerank: int = 0,
+                 embedder: Optional[EmbeddingProvider] = None,
+                 embedding_cache_size: int = 10000,
+                 lock: Optional[ReadWriteLock] = None):
+        self.dimension = dimension
+        self.lock = lock or ReadWriteLock()
+        self.embedder = _cached_embedder(embedder, dimension, embedding_cache_size)
+        self.quantizer = quantizer or Quantizer()
+        self.rerank = rerank
+        capacity = max(initial_capacity, 1)
+        width = self.quantizer.code_width(dimension)
+        # Codes once the quantizer is trained; full-precision rows while it
+        # is not, or for re-ranking
+        self._codes: Optional[np.ndarray] = None
+        self._full: Optional[np.ndarray] = None
+        if self.quantizer.trained:
+            self._codes = np.zeros((capacity, width), dtype=self.quantizer.dtype)
+        if not self.quantizer.exact and (rerank or not self.quantizer.trained):
+            self._full = np.zeros((capacity, dimension), dtype=np.float32)
+            if self.quantizer.trained:
+                self._spill_full()
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._count = 0
+        self.deleted_count = 0
+        self._purged_count = 0
         self.metadata: List[Dict] = []
-        self.entity_index: Dict[str, List[int]] = {}
-        self.time_index: Dict[str, List[int]] = {}
+        # key -> value -> row ids, in insertion (= ascending) order
+        self.metadata_index: Dict[str, Dict[Any, array]] = {}
+        # key -> rows whose value is unhashable; filtered by comparison instead
+        self._unindexed: Dict[str, array] = {}
+        self.entity_index: Dict[str, array] = self.metadata_index.setdefault("entity", {})
+        self.time_index = TimeIndex()  # valid_from -> row ids
+        self.index: Optional[IVFIndex] = None
+        # Set by MemoryJournal for persistent stores
+        self.journal: Optional["MemoryJournal"] = None
+        self._path: Optional[Path] = None
+        self._vector_files: Dict[str, "MappedVectors"] = {}
+        self._maintenance = threading.Lock()
+        if index is not None:
+            self.attach_index(index)
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored unit-length embeddings, one row per memory (a view for float32 storage)."""
+        return self._rows(slice(0, self._count))
+    
+    def __len__(self) -> int:
+        return self._count - self.deleted_count
+    
+    def _reserve(self, extra: int):
+        """Grow the matrices geometrically so appends are amortized O(1)."""
+        needed = self._count + extra
+        if needed <= len(self._deleted):
+            return
+        capacity = max(needed, 2 * len(self._deleted))
+        for name in ("_codes", "_full"):
+            matrix = getattr(self, name)
+            if matrix is None or len(matrix) >= capacity:
+                continue
+            if name in self._vector_files:
+                matrix = self._vector_files[name].resize(capacity)
+            else:
+                grown = np.zeros((capacity, matrix.shape[1]), dtype=matrix.dtype)
+                grown[:self._count] = matrix[:self._count]
+                matrix = grown
+            setattr(self, name, matrix)
+        self._deleted = np.concatenate(
+            [self._deleted, np.zeros(capacity - len(self._deleted), dtype=bool)]
+        )
+    
+    def attach_index(self, index: IVFIndex):
+        """Use an ANN index for searches; builds it now if the store is large enough."""
+        with self.lock.write():
+            self.index = index
+        self._maintain()
+    
+    def _maintain(self):
+        """
+        Train the quantizer and build the ANN index once enough rows are stored.
+        
+        The k-means runs on a copy of the stored rows with no lock held,
+        so searches carry on; only the rows added meanwhile are encoded
+        and bucketed under the write lock, when the results are swapped
+        in. Entry points call this after releasing the write lock (it
+        still works, blocking readers, under a held one).
+        """
+        if not self._maintenance.acquire(blocking=False):
+            return  # Another thread is already at it
+        try:
+            self._train_quantizer()
+            self._build_index()
+        finally:
+            self._maintenance.release()
+    
+    def _train_quantizer(self):
+        """Fit a copy of the quantizer outside the lock, then encode every row with it."""
+        with self.lock.read():
+            if self.quantizer.trained or len(self) < self.quantizer.min_train_size:
+                return
+            n, full = self._count, self._full
+            sample = full[np.flatnonzero(~self._deleted[:n])]
+        
+        quantizer = copy.deepcopy(self.quantizer)
+        quantizer.train(sample)
+        # Stored rows never change, so those are encoded unlocked too
+        encoded = [quantizer.encode(full[start:min(start + 65536, n)]) for start in range(0, n, 65536)]
+        
+        with self.lock.write():
+            if "_codes" in self._vector_files:
+                codes = self._vector_files["_codes"].open(len(self._deleted))
+            else:
+                codes = np.zeros((len(self._deleted), quantizer.code_width(self.dimension)),
+                                 dtype=quantizer.dtype)
+            if encoded:
+                codes[:n] = np.concatenate(encoded)
+            for start in range(n, self._count, 65536):
+                stop = min(start + 65536, self._count)
+                codes[start:stop] = quantizer.encode(self._full[start:stop])
+            self._codes, self.quantizer = codes, quantizer
+            
+            if self._path is not None:
+                # Persistent full rows stay on disk (mapped, not resident) for re-ranking
+                tmp = self._path / (MemoryJournal.QUANTIZER_FILE + ".tmp")
+                with open(tmp, "wb") as f:
+                    np.savez(f, **quantizer.state())
+                os.replace(tmp, self._path / MemoryJournal.QUANTIZER_FILE)
+            elif self.rerank:
+                self._spill_full()
+            else:
+                self._full = None
+    
+    def _spill_full(self):
+        """Move the full-precision rows to a temporary mapped file, removed with the store."""
+        directory = tempfile.mkdtemp(prefix="vector_store_")
+        weakref.finalize(self, shutil.rmtree, directory, True)
+        vector_file = MappedVectors(Path(directory) / MemoryJournal.VECTORS_FILE, self.dimension)
+        full = vector_file.open(len(self._deleted))
+        full[:self._count] = self._full[:self._count]
+        self._full, self._vector_files["_full"] = full, vector_file
+    
+    def _build_index(self):
+        """Build a copy of the ANN index outside the lock, then catch it up and swap it in."""
+        with self.lock.read():
+            if self.index is None or self.index.trained or len(self) < self.index.min_train_size:
+                return
+            attached, n, deleted_count = self.index, self._count, self.deleted_count
+            live = np.flatnonzero(~self._deleted[:n])
+            vectors = self._rows(live)
+        
+        index = copy.deepcopy(attached)
+        index.build(vectors, live)
+        
+        with self.lock.write():
+            if self.index is not attached:
+                return  # Replaced while building
+            if self._count > n:
+                index.add(np.arange(n, self._count), self._rows(slice(n, self._count)))
+            if self.deleted_count != deleted_count:
+                index.purge(self._deleted)
+            self.index, self._purged_count = index, self.deleted_count
     
     def add(self, text: str, metadata: Dict[str, Any] = None) -> int:
         """Add document to store."""
-        embedding = self._embed(text)
-        index = len(self.vectors)
-        
-        self.vectors.append(embedding)
-        self.metadata.append(metadata or {})
-        
-        # Index by entity
-        if "entity" in metadata:
-            entity = metadata["entity"]
-            if entity not in self.entity_index:
-                self.entity_index[entity] = []
-            self.entity_index[entity].append(index)
-        
-        # Index by time
-        if "valid_from" in metadata:
-            time_key = self._time_key(metadata["valid_from"])
-            if time_key not in self.time_index:
-                self.time_index[time_key] = []
-            self.time_index[time_key].append(index)
-        
+        index = self._append(_normalize(self._embed(text)), metadata or {})
+        self._maintain()
         return index
     
-    def search(self, query: str, limit: int = 5, 
-               filters: Dict[str, Any] = None) -> List[Dict]:
-        """Search for similar documents."""
-        query_embedding = self._embed(query)
-        
-        scores = []
-        for i, vec in enumerate(self.vectors):
-            score = np.dot(query_embedding, vec) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(vec) + 1e-8
-            )
-            
-            # Apply filters
-            if filters and not self._matches_filters(self.metadata[i], filters):
-                score = -1
+    def add_batch(self, texts: List[str],
+                  metadatas: Optional[List[Dict[str, Any]]] = None) -> List[int]:
+        """Add many documents with one embedding call, one matrix growth and one index update."""
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        if len(metadatas) != len(texts):
+            raise ValueError("texts and metadatas must have the same length")
+        if not texts:
+            return []
+        indices = self._append_batch(_normalize_rows(self._embed_batch(texts)), metadatas)
+        self._maintain()
+        return indices
+    
+    @_writes
+    def delete(self, index: int) -> bool:
+        """Tombstone a row: it stays in place but no search returns it."""
+        if not 0 <= index < self._count or self._deleted[index]:
+            return False
+        self._deleted[index] = True
+        self.deleted_count += 1
+        if self.journal is not None:
+            self.journal.record("delete", index=index)
+        
+        stale = self.deleted_count - self._purged_count
+        if self.index is not None and self.index.trained and stale > self.PURGE_FRACTION * self._count:
+            self.index.purge(self._deleted)
+            self._purged_count = self.deleted_count
+        return True
+    
+    def _append(self, embedding: np.ndarray, metadata: Dict[str, Any]) -> int:
+        """Store a unit-length embedding and index its metadata."""
+        return self._append_batch(embedding[None, :], [metadata])[0]
+    
+    @_writes
+    def _append_batch(self, embeddings: np.ndarray, metadatas: List[Dict[str, Any]]) -> List[int]:
+        """Store unit-length embeddings (one per row) and index their metadata."""
+        start, n = self._count, len(embeddings)
+        
+        self._reserve(n)
+        if self._full is not None:
+            self._full[start:start + n] = embeddings
+        if self._codes is not None:
+            self._codes[start:start + n] = self.quantizer.encode(embeddings)
+        self._count += n
+        self.metadata.extend(metadatas)
+        
+        for index, metadata in enumerate(metadatas, start):
+            self._index_metadata(index, metadata)
             
-            scores.append((i, score))
+            # Index by time
+            timestamp = self._timestamp(metadata.get("valid_from"))
+            if timestamp is not None:
+                self.time_index.add(index, timestamp)
+        
+        # Training and index builds wait for _maintain(), outside the lock
+        if self.index is not None and self.index.trained:
+            self.index.add(np.arange(start, start + n), embeddings)
+        if self.journal is not None:
+            self.journal.record("add", index=start, rows=metadatas)
+        
+        return list(range(start, start + n))
+    
+    def _restore(self, path: Path, metadata: List[Dict], deleted: List[int]):
+        """Adopt persisted rows: vectors stay on disk, indexes are rebuilt from metadata."""
+        self._path = path
+        width = self.quantizer.code_width(self.dimension)
+        if self.quantizer.exact:
+            self._vector_files = {"_codes": MappedVectors(path / MemoryJournal.VECTORS_FILE, width)}
+        else:
+            self._vector_files = {
+                "_full": MappedVectors(path / MemoryJournal.VECTORS_FILE, self.dimension),
+                "_codes": MappedVectors(path / MemoryJournal.CODES_FILE, width, self.quantizer.dtype),
+            }
+            if (path / MemoryJournal.QUANTIZER_FILE).exists():
+                with np.load(path / MemoryJournal.QUANTIZER_FILE) as state:
+                    self.quantizer.load_state(dict(state))
         
-        scores.sort(key=lambda x: x[1], reverse=True)
+        self._codes = self._full = None
+        for name, vector_file in self._vector_files.items():
+            if name == "_full" or self.quantizer.trained:
+                setattr(self, name, vector_file.open(len(metadata)))
+        capacity = min(len(m) for m in (self._codes, self._full) if m is not None)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._deleted[deleted] = True
+        self._count = len(metadata)
+        self.deleted_count = len(deleted)
+        self.metadata = metadata
+        for index, row in enumerate(metadata):
+            self._index_metadata(index, row)
+            timestamp = self._timestamp(row.get("valid_from"))
+            if timestamp is not None:
+                self.time_index.add(index, timestamp)
+        self._maintain()
+    
+    def flush(self):
+        """Write memory-mapped rows to disk (persistent stores only)."""
+        for vector_file in self._vector_files.values():
+            vector_file.flush()
+    
+    def search(self, query: str, limit: int = 5, 
+               filters: Dict[str, Any] = None,
+               time_range: Optional[Tuple[Any, Any]] = None) -> List[Dict]:
+        """
+        Search for similar documents.
+        
+        time_range=(start, end) keeps rows whose valid_from is in
+        [start, end) (datetimes, ISO strings or epoch seconds; None leaves
+        a side open). Only the rows in that window are scored.
+        """
+        return self._search(_normalize(self._embed(query)), limit, filters, time_range)
+    
+    @_reads
+    def _search(self, query_embedding: np.ndarray, limit: int,
+                filters: Optional[Dict[str, Any]] = None,
+                time_range: Optional[Tuple[Any, Any]] = None) -> List[Dict]:
+        """search() for an already embedded (unit-length) query."""
+        # Pre-filter: only rows matching every filter are scored
+        candidates = self._candidates(filters) if filters else None
+        if time_range is not None:
+            window = self._time_window(*time_range)
+            candidates = window if candidates is None else np.intersect1d(
+                candidates, window, assume_unique=True
+            )
+        ids, scores = self._rank(query_embedding, limit, candidates)
         
         results = []
-        for idx, score in scores[:limit]:
+        for idx, score in zip(ids.tolist(), scores.tolist()):
             if score > 0:
                 results.append({
                     "index": idx,
@@ -79,39 +1039,190 @@ class VectorStore:
     def search_by_entity(self, entity: str, query: str = "", 
                          limit: int = 5) -> List[Dict]:
         """Search within specific entity."""
-        indices = self.entity_index.get(entity, [])
-        
-        if not indices:
-            return []
+        query_embedding = _normalize(self._embed(query)) if query else None
         
-        if query:
-            query_embedding = self._embed(query)
-            scored = []
-            for i in indices:
-                vec = self.vectors[i]
-                score = np.dot(query_embedding, vec) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(vec) + 1e-8
-                )
-                scored.append((i, score, self.metadata[i]))
+        with self.lock.read():
+            indices = np.array(self.entity_index.get(entity, ()), dtype=np.int64)
+            indices = indices[~self._deleted[indices]]
             
-            scored.sort(key=lambda x: x[1], reverse=True)
-            return [{"index": i, "score": s, "metadata": m} 
-                    for i, s, m in scored[:limit]]
-        else:
-            return [{"index": i, "score": 1.0, "metadata": self.metadata[i]} 
-                    for i in indices[:limit]]
+            if not len(indices):
+                return []
+            
+            if query_embedding is not None:
+                ids, scores = self._rank(query_embedding, limit, indices)
+                return [{"index": i, "score": s, "metadata": self.metadata[i]}
+                        for i, s in zip(ids.tolist(), scores.tolist())]
+            else:
+                return [{"index": i, "score": 1.0, "metadata": self.metadata[i]} 
+                        for i in indices[:limit].tolist()]
+    
+    def _rank(self, query_embedding: np.ndarray, limit: int,
+              candidates: Optional[np.ndarray] = None):
+        """
+        Top rows for a query as (ids, scores), best first.
+        
+        candidates restricts the search to those row ids. Tombstoned rows
+        are never returned.
+        """
+        reranking = self.rerank > 0 and self._codes is not None and self._full is not None
+        if not reranking:
+            return self._rank_codes(query_embedding, limit, candidates)
+        
+        ids, _ = self._rank_codes(query_embedding, limit * self.rerank, candidates)
+        scores = self._full[ids] @ query_embedding
+        top = _top_k(scores, limit)
+        return ids[top], scores[top]
+    
+    def _rank_codes(self, query_embedding: np.ndarray, limit: int,
+                    candidates: Optional[np.ndarray] = None):
+        """Top rows scored from the stored codes (full rows before the quantizer is trained)."""
+        if candidates is not None and self.deleted_count:
+            candidates = candidates[~self._deleted[candidates]]
+        
+        if self.index is not None and self.index.trained and (
+            candidates is None or len(candidates) > self.index.expected_scan(len(self))
+        ):
+            allowed = None
+            if candidates is not None:
+                allowed = np.zeros(self._count, dtype=bool)
+                allowed[candidates] = True
+            elif self.deleted_count:
+                allowed = ~self._deleted[:self._count]
+            return self.index.search(self._score, query_embedding, limit, allowed)
+        
+        if candidates is None:
+            scores = self._score(None, query_embedding)
+            if self.deleted_count:
+                scores[self._deleted[:self._count]] = -np.inf
+            top = _top_k(scores, limit)
+            top = top[np.isfinite(scores[top])]
+            return top, scores[top]
+        
+        scores = self._score(candidates, query_embedding)
+        top = _top_k(scores, limit)
+        return candidates[top], scores[top]
+    
+    def _score(self, ids: Optional[np.ndarray], query_embedding: np.ndarray) -> np.ndarray:
+        """Scores of rows ids (every row when None) against a query, from their codes."""
+        rows = slice(0, self._count) if ids is None else ids
+        if self._codes is None:
+            return self._full[rows] @ query_embedding
+        return self.quantizer.score(self._codes[rows], query_embedding)
+    
+    def _rows(self, ids) -> np.ndarray:
+        """Full-precision rows; decoded from codes when no side store is kept."""
+        if self.quantizer.exact:
+            return self._codes[ids]
+        if self._full is not None:
+            return self._full[ids]
+        return self.quantizer.decode(self._codes[ids])
     
     def _embed(self, text: str) -> np.ndarray:
         """Generate embedding for text."""
-        # In production, use actual embedding model
-        np.random.seed(hash(text) % (2**32))
-        return np.random.randn(self.dimension)
+        return self.embedder.embed(text)
+    
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embeddings for many texts, one row each (one call to a batching model)."""
+        return self.embedder.embed_batch(texts)
+    
+    @staticmethod
+    def _timestamp(value: Any) -> Optional[float]:
+        """Epoch seconds of a datetime, ISO string or number; None for anything else."""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return value.timestamp() if isinstance(value, datetime) else None
+    
+    def _time_window(self, start: Any = None, end: Any = None) -> np.ndarray:
+        """Sorted ids of rows whose valid_from is in [start, end); None leaves a side open."""
+        bounds = []
+        for bound, unbounded in ((start, -math.inf), (end, math.inf)):
+            timestamp = unbounded if bound is None else self._timestamp(bound)
+            if timestamp is None:
+                raise ValueError(f"Not a timestamp: {bound!r}")
+            bounds.append(timestamp)
+        return np.sort(self.time_index.range(*bounds))
+    
+    @_writes
+    def update_metadata(self, index: int, updates: Dict[str, Any]):
+        """Change metadata fields of a row, keeping the inverted indexes in step."""
+        metadata = self.metadata[index]
+        for key, value in updates.items():
+            if key in metadata:
+                self._unindex_value(index, key, metadata[key])
+            if key == "valid_from":
+                old, new = self._timestamp(metadata.get(key)), self._timestamp(value)
+                if old is not None:
+                    self.time_index.remove(index, old)
+                if new is not None:
+                    self.time_index.add(index, new)
+            metadata[key] = value
+            self._index_value(index, key, value)
+        if self.journal is not None:
+            self.journal.record("update", index=index, metadata=updates)
+    
+    def _index_metadata(self, index: int, metadata: Dict[str, Any]):
+        """Add a row to the inverted index of each of its metadata keys."""
+        for key, value in metadata.items():
+            self._index_value(index, key, value)
     
-    def _time_key(self, timestamp: Any) -> str:
-        """Create time key for indexing."""
-        if isinstance(timestamp, datetime):
-            return timestamp.strftime("%Y-%m")
-        return str(timestamp)
+    def _index_value(self, index: int, key: str, value: Any):
+        try:
+            ids = self.metadata_index.setdefault(key, {}).setdefault(value, array("q"))
+        except TypeError:
+            ids = self._unindexed.setdefault(key, array("q"))
+        # Appends keep the list sorted; updates of older rows insert in place
+        if not ids or ids[-1] < index:
+            ids.append(index)
+        else:
+            ids.insert(bisect.bisect_left(ids, index), index)
+    
+    def _unindex_value(self, index: int, key: str, value: Any):
+        try:
+            ids = self.metadata_index[key][value]
+        except TypeError:
+            ids = self._unindexed[key]
+        ids.remove(index)
+    
+    def _postings(self, key: str, value: Any) -> np.ndarray:
+        """Sorted ids of rows whose metadata[key] equals value."""
+        try:
+            ids = self.metadata_index.get(key, {}).get(value)
+        except TypeError:
+            ids = None
+        ids = np.array(ids if ids is not None else (), dtype=np.int64)
+        
+        unindexed = self._unindexed.get(key)
+        if unindexed:
+            extra = [i for i in unindexed if self.metadata[i][key] == value]
+            if extra:
+                ids = np.union1d(ids, extra)
+        return ids
+    
+    def _candidates(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Sorted ids of rows matching every filter (same semantics as _matches_filters)."""
+        candidates = None
+        for key, value in filters.items():
+            values = value if isinstance(value, list) else [value]
+            postings = [self._postings(key, v) for v in values]
+            if len(postings) == 1:
+                ids = postings[0]
+            elif postings:
+                ids = np.unique(np.concatenate(postings))
+            else:
+                ids = np.empty(0, dtype=np.int64)
+            
+            if candidates is None:
+                candidates = ids
+            else:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        return candidates
     
     def _matches_filters(self, metadata: Dict, filters: Dict) -> bool:
         """Check if metadata matches filters."""
@@ -126,19 +1237,369 @@ class VectorStore:
         return True
 
 
+class ShardedVectorStore:
+    """
+    Vector store split into one VectorStore shard per session.
+    
+    Rows are routed by their session_id metadata; rows without one go to
+    the shared global shard (session GLOBAL). Each shard has its own
+    vectors, metadata, entity and time indexes, so a search filtered by
+    session scores only that session's shard plus the global one, and
+    dropping a session costs nothing for the others.
+    
+    With a directory attached every shard persists under
+    path/global and path/session-<quoted id> (a MemoryJournal each), and
+    shards can be evicted: evict(), evict_idle(), or automatically once
+    more than max_resident shards are loaded (least recently used first;
+    the global shard stays). An evicted shard is reloaded from disk the
+    next time it is needed. Eviction writes the shard's row count and
+    entities to summary.json, so entity searches and consolidation skip
+    shards that cannot match without loading them, also after a reopen.
+    The summary is removed while the shard is loaded: a shard that was
+    resident when the process died has none, and is loaded to be checked.
+    
+    Row indices are shard-local: results carry a "session" key, and
+    delete()/update_metadata() take the session and the index.
+    
+    Safe to share between threads. Shards lock independently unless a
+    shared lock is given; the shard map has its own lock, which mutations
+    hold throughout so a shard is never evicted mid-write.
+    """
+    
+    GLOBAL = ""
+    SUMMARY_FILE = "summary.json"
+    
+    def __init__(self, dimension: int = 768, precision: str = "float32", rerank: int = 0,
+                 embedder: Optional[EmbeddingProvider] = None,
+                 embedding_cache_size: int = 10000,
+                 index_factory: Optional[Callable[[], IVFIndex]] = None,
+                 max_resident: Optional[int] = None,
+                 lock: Optional[ReadWriteLock] = None):
+        if precision not in QUANTIZERS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {sorted(QUANTIZERS)}")
+        self.dimension = dimension
+        self.precision = precision
+        self.rerank = rerank
+        # One embedding cache for every shard
+        self.embedder = _cached_embedder(embedder, dimension, embedding_cache_size)
+        self.index_factory = index_factory
+        self.max_resident = max_resident
+        self.lock = lock
+        # Resident shards, least recently used first
+        self.shards: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._journals: Dict[str, MemoryJournal] = {}
+        self._last_used: Dict[str, float] = {}
+        # session -> entities with rows in it, and rows appended to it
+        # (kept for evicted shards too)
+        self._entities: Dict[str, set] = {}
+        self._rows: Dict[str, int] = {}
+        # Sessions with a shard on disk that is not resident
+        self._on_disk: set = set()
+        self.path: Optional[Path] = None
+        self.snapshot_every = 10000
+        self.fsync = False
+        self._lock = threading.RLock()
+    
+    def attach_directory(self, path: str, snapshot_every: int = 10000, fsync: bool = False):
+        """Persist shards under path; shards already there are loaded on demand."""
+        with self._lock:
+            if self.shards:
+                raise ValueError("Attach a directory before adding rows")
+            self.path = Path(path)
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.snapshot_every, self.fsync = snapshot_every, fsync
+            for shard_dir in self.path.iterdir():
+                if shard_dir.name == "global":
+                    session = self.GLOBAL
+                elif shard_dir.name.startswith("session-"):
+                    session = unquote(shard_dir.name[len("session-"):])
+                else:
+                    continue
+                self._on_disk.add(session)
+                summary_path = shard_dir / self.SUMMARY_FILE
+                if summary_path.exists():
+                    with open(summary_path, encoding="utf-8") as f:
+                        summary = json.load(f)
+                    self._rows[session] = summary["rows"]
+                    self._entities[session] = set(summary["entities"])
+    
+    def _shard_path(self, session: str) -> Path:
+        return self.path / ("global" if session == self.GLOBAL else "session-" + quote(session, safe=""))
+    
+    def sessions(self) -> List[str]:
+        """Every session with a shard, resident or on disk."""
+        with self._lock:
+            return sorted(set(self.shards) | self._on_disk)
+    
+    def row_count(self, session: str) -> Optional[int]:
+        """
+        Rows ever appended to a session's shard, deleted ones included.
+        
+        Known without loading the shard once it has been evicted; None for
+        a shard on disk whose summary is missing.
+        """
+        with self._lock:
+            store = self.shards.get(session)
+            return store._count if store is not None else self._rows.get(session)
+    
+    def shard(self, session: str, create: bool = True) -> Optional[VectorStore]:
+        """The shard of a session, loading it from disk if evicted; None if absent and not create."""
+        with self._lock:
+            store = self.shards.get(session)
+            if store is None:
+                if session not in self._on_disk and not create:
+                    return None
+                store = self._load(session)
+                self.shards[session] = store
+                self._on_disk.discard(session)
+                self._entities[session] = set(store.entity_index)
+                self._rows.pop(session, None)
+            self.shards.move_to_end(session)
+            self._last_used[session] = time.monotonic()
+            
+            if self.max_resident is not None and self.path is not None:
+                # Least recently used first; shards that are training are skipped
+                for victim in [s for s in self.shards if s not in (session, self.GLOBAL)]:
+                    if len(self.shards) <= self.max_resident:
+                        break
+                    self.evict(victim)
+            return store
+    
+    def _load(self, session: str) -> VectorStore:
+        store = VectorStore(dimension=self.dimension, quantizer=QUANTIZERS[self.precision](),
+                            rerank=self.rerank, embedder=self.embedder,
+                            index=self.index_factory() if self.index_factory else None)
+        if self.path is not None:
+            path = self._shard_path(session)
+            # Stale as soon as the shard can change; rewritten on eviction
+            (path / self.SUMMARY_FILE).unlink(missing_ok=True)
+            journal = MemoryJournal(path, self.dimension, self.snapshot_every, self.fsync)
+            journal.attach(store, None)
+            self._journals[session] = journal
+        # Adopted last: loading takes the store's write lock, which a caller
+        # holding the shared lock for reading could not upgrade to
+        if self.lock is not None:
+            store.lock = self.lock
+        return store
+    
+    def evict(self, session: str, wait: bool = False) -> bool:
+        """
+        Write a shard to disk and drop it from memory.
+        
+        False if it was not resident, or (unless wait) if it is training
+        its quantizer or building its index; it can be evicted after that.
+        """
+        with self._lock:
+            if self.path is None:
+                raise ValueError("Only shards of a store with a directory can be evicted")
+            store = self.shards.get(session)
+            # Held for good: an evicted shard is never trained or indexed again
+            if store is None or not store._maintenance.acquire(blocking=wait):
+                return False
+            del self.shards[session]
+            # Searches still holding the shard keep reading its mapped rows
+            self._journals.pop(session).close()
+            self._last_used.pop(session, None)
+            self._on_disk.add(session)
+            self._rows[session] = store._count
+            
+            summary_path = self._shard_path(session) / self.SUMMARY_FILE
+            tmp = summary_path.with_name(self.SUMMARY_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"rows": store._count, "entities": list(self._entities[session])}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, summary_path)
+            return True
+    
+    def evict_idle(self, max_idle_seconds: float) -> List[str]:
+        """Evict every session shard unused for max_idle_seconds; returns their sessions."""
+        with self._lock:
+            cutoff = time.monotonic() - max_idle_seconds
+            idle = [s for s in self.shards if s != self.GLOBAL and self._last_used[s] < cutoff]
+            return [session for session in idle if self.evict(session)]
+    
+    def snapshot(self):
+        """Compact the journal of every resident shard."""
+        with self._write_lock(), self._lock:
+            journals = list(self._journals.items())
+            for session, journal in journals:
+                with self.shards[session].lock.write():
+                    journal.snapshot()
+        for _, journal in journals:
+            journal.wait()
+    
+    def close(self):
+        """
+        Write every resident shard to disk and close their journals.
+        
+        Waits for shards that are training or indexing, so the caller
+        must not hold the shared lock.
+        """
+        with self._lock:
+            for session in list(self._journals):
+                self.evict(session, wait=True)
+    
+    def add(self, text: str, metadata: Dict[str, Any] = None) -> Tuple[str, int]:
+        """Add document to its session's shard; returns (session, index)."""
+        location = self._append_batch(_normalize(self._embed(text))[None, :], [metadata or {}])[0]
+        self._maintain([location[0]])
+        return location
+    
+    def add_batch(self, texts: List[str],
+                  metadatas: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, int]]:
+        """Add many documents with one embedding call and one append per shard."""
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        if len(metadatas) != len(texts):
+            raise ValueError("texts and metadatas must have the same length")
+        if not texts:
+            return []
+        locations = self._append_batch(_normalize_rows(self._embed_batch(texts)), metadatas)
+        self._maintain({session for session, _ in locations})
+        return locations
+    
+    def _append_batch(self, embeddings: np.ndarray,
+                      metadatas: List[Dict[str, Any]]) -> List[Tuple[str, int]]:
+        """Store unit-length embeddings in their sessions' shards; returns (session, index) pairs."""
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(metadata.get("session_id") or self.GLOBAL, []).append(i)
+        
+        locations: List[Tuple[str, int]] = [None] * len(metadatas)
+        with self._write_lock(), self._lock:
+            for session, rows in groups.items():
+                store = self.shard(session)
+                indices = store._append_batch(embeddings[rows], [metadatas[i] for i in rows])
+                self._entities[session].update(
+                    metadatas[i]["entity"] for i in rows if "entity" in metadatas[i]
+                )
+                for i, index in zip(rows, indices):
+                    locations[i] = (session, index)
+        return locations
+    
+    def _maintain(self, sessions: Iterable[str]):
+        """VectorStore._maintain() for the resident shards of the given sessions."""
+        for session in sessions:
+            with self._lock:
+                store = self.shards.get(session)
+            if store is not None:
+                store._maintain()
+    
+    def delete(self, session: str, index: int) -> bool:
+        """Tombstone a row of a session's shard."""
+        with self._write_lock(), self._lock:
+            store = self.shard(session, create=False)
+            return store is not None and store.delete(index)
+    
+    def update_metadata(self, session: str, index: int, updates: Dict[str, Any]):
+        """Change metadata fields of a row (its session_id cannot move it to another shard)."""
+        with self._write_lock(), self._lock:
+            store = self.shard(session, create=False)
+            if store is None:
+                raise KeyError(f"No shard for session {session!r}")
+            store.update_metadata(index, updates)
+            if "entity" in updates:
+                self._entities[session].add(updates["entity"])
+    
+    def _write_lock(self):
+        # A shared lock is taken before the shard map's, never after
+        return self.lock.write() if self.lock is not None else nullcontext()
+    
+    def search(self, query: str, limit: int = 5,
+               filters: Dict[str, Any] = None,
+               time_range: Optional[Tuple[Any, Any]] = None,
+               include_global: bool = True) -> List[Dict]:
+        """
+        Search the shards that can hold matches, merging results by score.
+        
+        A session_id filter (a value or a list) selects those sessions'
+        shards, plus the global shard when include_global; without one
+        every shard is searched. Other filters and time_range apply
+        within each shard as in VectorStore.search.
+        """
+        filters = dict(filters or {})
+        query_embedding = _normalize(self._embed(query))
+        if "session_id" in filters:
+            wanted = filters.pop("session_id")
+            sessions = wanted if isinstance(wanted, list) else [wanted]
+            sessions = [s or self.GLOBAL for s in sessions]
+            if include_global:
+                sessions.append(self.GLOBAL)
+        else:
+            sessions = self.sessions()
+        
+        results = []
+        for session in dict.fromkeys(sessions):
+            store = self.shard(session, create=False)
+            if store is None:
+                continue
+            for result in store._search(query_embedding, limit, filters, time_range):
+                result["session"] = session
+                results.append(result)
+        results.sort(key=lambda r: -r["score"])
+        return results[:limit]
+    
+    def search_by_entity(self, entity: str, query: str = "",
+                         limit: int = 5) -> List[Dict]:
+        """Search within specific entity, in the shards known to hold it."""
+        with self._lock:
+            # Shards without a summary have unknown entities and must be checked
+            sessions = [s for s in self.sessions()
+                        if s not in self._entities or entity in self._entities[s]]
+        
+        results = []
+        for session in sessions:
+            store = self.shard(session, create=False)
+            if store is None:
+                continue
+            for result in store.search_by_entity(entity, query, limit):
+                result["session"] = session
+                results.append(result)
+        if query:
+            results.sort(key=lambda r: -r["score"])
+        return results[:limit]
+    
+    def _embed(self, text: str) -> np.ndarray:
+        return self.embedder.embed(text)
+    
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return self.embedder.embed_batch(texts)
+
+
 class PropertyGraph:
-    """Simple property graph storage."""
+    """
+    Simple property graph storage.
     
-    def __init__(self):
+    Edges are indexed per node in both directions and by type, so
+    relationship lookups cost O(degree) rather than a scan of every edge.
+    Safe to share between threads: queries hold the read lock, mutations
+    the write lock.
+    """
+    
+    def __init__(self, lock: Optional[ReadWriteLock] = None):
+        self.lock = lock or ReadWriteLock()
         self.nodes: Dict[str, Dict] = {}
         self.edges: Dict[str, Dict] = {}
         self.node_index: Dict[str, List[str]] = {}  # label -> node_ids
         self.edge_index: Dict[str, List[str]] = {}  # type -> edge_ids
+        self.outgoing: Dict[str, Dict[str, List[str]]] = {}  # source -> type -> edge_ids
+        self.incoming: Dict[str, Dict[str, List[str]]] = {}  # target -> type -> edge_ids
+        # Disambiguates ids generated within the same clock tick
+        self._sequence = itertools.count()
+        # Set by MemoryJournal for persistent graphs
+        self.journal: Optional["MemoryJournal"] = None
     
-    def create_node(self, label: str, properties: Dict = None) -> str:
-        """Create node with label and properties."""
-        import time
-        node_id = hashlib.md5(f"{label}{time.time()}".encode()).hexdigest()[:16]
+    @_writes
+    def create_node(self, label: str, properties: Dict = None,
+                    node_id: Optional[str] = None) -> str:
+        """Create node with label and properties (and a caller-chosen ID, if given)."""
+        if node_id is None:
+            node_id = hashlib.md5(
+                f"{label}{time.time()}{next(self._sequence)}".encode()
+            ).hexdigest()[:16]
+        elif node_id in self.nodes:
+            raise ValueError(f"Node already exists: {node_id}")
         
         self.nodes[node_id] = {
             "id": node_id,
@@ -150,19 +1611,22 @@ class PropertyGraph:
         if label not in self.node_index:
             self.node_index[label] = []
         self.node_index[label].append(node_id)
+        self._record_node(node_id)
         
         return node_id
     
+    @_writes
     def create_relationship(self, source_id: str, rel_type: str, 
                            target_id: str, properties: Dict = None) -> str:
         """Create directed relationship between nodes."""
-        import time
         if source_id not in self.nodes:
             raise ValueError(f"Unknown source node: {source_id}")
         if target_id not in self.nodes:
             raise ValueError(f"Unknown target node: {target_id}")
         
-        edge_id = hashlib.md5(f"{source_id}{rel_type}{target_id}{time.time()}".encode()).hexdigest()[:16]
+        edge_id = hashlib.md5(
+            f"{source_id}{rel_type}{target_id}{time.time()}{next(self._sequence)}".encode()
+        ).hexdigest()[:16]
         
         self.edges[edge_id] = {
             "id": edge_id,
@@ -173,59 +1637,146 @@ class PropertyGraph:
             "created_at": time.time()
         }
         
-        if rel_type not in self.edge_index:
-            self.edge_index[rel_type] = []
-        self.edge_index[rel_type].append(edge_id)
+        self._index_edge(self.edges[edge_id])
+        self._record_edge(edge_id)
         
         return edge_id
     
+    @_writes
+    def create_relationships(self, relationships: List[Tuple[str, str, str, Optional[Dict]]]) -> List[str]:
+        """
+        Create many (source_id, rel_type, target_id, properties) edges.
+        
+        All endpoints are checked before anything is created, so an unknown
+        node leaves the graph unchanged.
+        """
+        self._check_endpoints(relationships)
+        return [
+            self.create_relationship(source_id, rel_type, target_id, properties)
+            for source_id, rel_type, target_id, properties in relationships
+        ]
+    
+    def _check_endpoints(self, relationships: List[Tuple]):
+        """Raise unless the source and target (items 0 and 2) of every tuple exist."""
+        for relationship in relationships:
+            for node_id in (relationship[0], relationship[2]):
+                if node_id not in self.nodes:
+                    raise ValueError(f"Unknown node: {node_id}")
+    
+    @_writes
+    def delete_relationship(self, edge_id: str) -> bool:
+        """Delete an edge."""
+        edge = self.edges.pop(edge_id, None)
+        if edge is None:
+            return False
+        self._unindex_edge(edge)
+        if self.journal is not None:
+            self.journal.record("delete_edge", id=edge_id)
+        return True
+    
+    @_writes
+    def delete_node(self, node_id: str) -> bool:
+        """Delete a node and every edge touching it."""
+        node = self.nodes.get(node_id)
+        if node is None:
+            return False
+        for relationship in self.get_relationships(node_id):
+            self.delete_relationship(relationship["edge"]["id"])
+        del self.nodes[node_id]
+        self.node_index[node["label"]].remove(node_id)
+        if self.journal is not None:
+            self.journal.record("delete_node", id=node_id)
+        return True
+    
+    def _index_edge(self, edge: Dict):
+        """Add an edge to the type and adjacency indexes."""
+        self.edge_index.setdefault(edge["type"], []).append(edge["id"])
+        self.outgoing.setdefault(edge["source"], {}).setdefault(edge["type"], []).append(edge["id"])
+        self.incoming.setdefault(edge["target"], {}).setdefault(edge["type"], []).append(edge["id"])
+    
+    def _unindex_edge(self, edge: Dict):
+        self.edge_index[edge["type"]].remove(edge["id"])
+        self.outgoing[edge["source"]][edge["type"]].remove(edge["id"])
+        self.incoming[edge["target"]][edge["type"]].remove(edge["id"])
+    
+    def _record_node(self, node_id: str):
+        if self.journal is not None:
+            self.journal.record("node", node=self.nodes[node_id])
+    
+    def _record_edge(self, edge_id: str):
+        """Journal an edge's current state (replay overwrites, so updates re-record it)."""
+        if self.journal is not None:
+            self.journal.record("edge", edge=self.edges[edge_id])
+    
+    def _restore(self, nodes: Dict[str, Dict], edges: Dict[str, Dict]):
+        """Adopt persisted nodes and edges and rebuild the label, type and adjacency indexes."""
+        self.nodes, self.edges = nodes, edges
+        self.node_index, self.edge_index = {}, {}
+        self.outgoing, self.incoming = {}, {}
+        for node_id, node in nodes.items():
+            self.node_index.setdefault(node["label"], []).append(node_id)
+        for edge in edges.values():
+            self._index_edge(edge)
+    
+    @_reads
     def query(self, pattern: Dict) -> List[Dict]:
         """Query graph with simple pattern matching."""
         results = []
         
         # Match by edge type
         if "type" in pattern:
-            edge_ids = self.edge_index.get(pattern["type"], [])
-            for eid in edge_ids:
-                edge = self.edges[eid]
-                source = self.nodes.get(edge["source"], {})
-                target = self.nodes.get(edge["target"], {})
-                
-                # Match source label
-                if "source_label" in pattern:
-                    if source.get("label") != pattern["source_label"]:
-                        continue
-                
-                # Match target label
-                if "target_label" in pattern:
-                    if target.get("label") != pattern["target_label"]:
-                        continue
-                
-                results.append({
-                    "source": source,
-                    "edge": edge,
-                    "target": target
-                })
+            for eid in self.edge_index.get(pattern["type"], []):
+                result = self._match(pattern, eid)
+                if result is not None:
+                    results.append(result)
         
         return results
     
+    def _match(self, pattern: Dict, edge_id: str) -> Optional[Dict]:
+        """An edge with its endpoints if they match the pattern's labels, else None."""
+        edge = self.edges[edge_id]
+        source = self.nodes.get(edge["source"], {})
+        target = self.nodes.get(edge["target"], {})
+        
+        # Match source label
+        if "source_label" in pattern:
+            if source.get("label") != pattern["source_label"]:
+                return None
+        
+        # Match target label
+        if "target_label" in pattern:
+            if target.get("label") != pattern["target_label"]:
+                return None
+        
+        return {
+            "source": source,
+            "edge": edge,
+            "target": target
+        }
+    
+    @_reads
     def get_node(self, node_id: str) -> Optional[Dict]:
         """Get node by ID."""
         return self.nodes.get(node_id)
     
+    @_reads
     def get_relationships(self, node_id: str, 
-                          direction: str = "both") -> List[Dict]:
-        """Get relationships for a node."""
+                          direction: str = "both",
+                          rel_type: Optional[str] = None) -> List[Dict]:
+        """Get relationships for a node, optionally of one type."""
         relationships = []
         
-        for edge in self.edges.values():
-            if direction in ["outgoing", "both"] and edge["source"] == node_id:
+        if direction in ["outgoing", "both"]:
+            for edge_id in self._adjacent(self.outgoing, node_id, rel_type):
+                edge = self.edges[edge_id]
                 relationships.append({
                     "edge": edge,
                     "target": self.nodes.get(edge["target"]),
                     "direction": "outgoing"
                 })
-            if direction in ["incoming", "both"] and edge["target"] == node_id:
+        if direction in ["incoming", "both"]:
+            for edge_id in self._adjacent(self.incoming, node_id, rel_type):
+                edge = self.edges[edge_id]
                 relationships.append({
                     "edge": edge,
                     "source": self.nodes.get(edge["source"]),
@@ -233,11 +1784,292 @@ class PropertyGraph:
                 })
         
         return relationships
+    
+    def _adjacent(self, adjacency: Dict[str, Dict[str, List[str]]], node_id: str,
+                  rel_type: Optional[str] = None) -> List[str]:
+        """Edge ids on one side of a node, for one type or all of them."""
+        by_type = adjacency.get(node_id, {})
+        if rel_type is not None:
+            return list(by_type.get(rel_type, ()))
+        return [edge_id for edge_ids in by_type.values() for edge_id in edge_ids]
+    
+    def traverse(
+        self,
+        start_id: str,
+        max_depth: int = 2,
+        direction: str = "outgoing",
+        rel_types: Optional[Iterable[str]] = None,
+        node_labels: Optional[Iterable[str]] = None,
+        valid_at: Optional[datetime] = None,
+        strategy: str = "bfs",
+        max_nodes: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Lazily walk the graph from a node, yielding each reachable node once.
+        
+        Yields {"node", "depth", "path"} where path is the list of edges
+        from start_id. Only edges of rel_types (all if None) that are
+        valid at valid_at (if given) are followed, and only nodes with
+        one of node_labels (all if None) are entered. BFS yields nodes in
+        order of hop distance with shortest paths. DFS goes deep first but
+        still reaches everything within max_depth. Each node is expanded
+        at most once per depth it is first reached at, so the walk is
+        bounded by max_depth and max_nodes. Each step holds the read lock
+        only until it yields, so a slow consumer never blocks writers (and
+        may see their changes in later steps).
+        """
+        if start_id not in self.nodes:
+            raise ValueError(f"Unknown start node: {start_id}")
+        if strategy not in ("bfs", "dfs"):
+            raise ValueError(f"Unknown strategy: {strategy}")
+        rel_types = list(rel_types) if rel_types is not None else None
+        node_labels = set(node_labels) if node_labels is not None else None
+        at = valid_at.timestamp() if valid_at is not None else None
+        
+        # node -> (depth, previous node, edge used to reach it)
+        reached: Dict[str, Tuple[int, Optional[str], Optional[str]]] = {start_id: (0, None, None)}
+        yielded = {start_id}
+        frontier = deque([(start_id, 0)])
+        pop = frontier.popleft if strategy == "bfs" else frontier.pop
+        
+        while frontier:
+            node_id, depth = pop()
+            if reached[node_id][0] < depth:
+                continue  # Superseded by a shallower route
+            if node_id not in yielded:
+                yielded.add(node_id)
+                with self.lock.read():
+                    step = {"node": self.nodes.get(node_id), "depth": depth,
+                            "path": self._path_to(node_id, reached)}
+                if step["node"] is None or step["path"] is None:
+                    continue  # Deleted since it was reached
+                yield step
+                if max_nodes is not None and len(yielded) > max_nodes:
+                    return
+            if depth >= max_depth:
+                continue
+            
+            with self.lock.read():
+                for edge_id, neighbour in self._neighbours(node_id, direction, rel_types):
+                    if neighbour in reached and reached[neighbour][0] <= depth + 1:
+                        continue
+                    if at is not None and not self._valid_at(edge_id, at):
+                        continue
+                    node = self.nodes.get(neighbour)
+                    if node is None or (node_labels is not None and node["label"] not in node_labels):
+                        continue
+                    reached[neighbour] = (depth + 1, node_id, edge_id)
+                    frontier.append((neighbour, depth + 1))
+    
+    def shortest_path(self, source_id: str, target_id: str, max_depth: int = 6,
+                      **filters) -> Optional[List[Dict]]:
+        """Edges of a shortest path from source to target (traverse filters apply), or None."""
+        for step in self.traverse(source_id, max_depth=max_depth, strategy="bfs", **filters):
+            if step["node"]["id"] == target_id:
+                return step["path"]
+        return None
+    
+    def _neighbours(self, node_id: str, direction: str,
+                    rel_types: Optional[List[str]]) -> Iterator[Tuple[str, str]]:
+        """(edge_id, neighbour_id) pairs from the adjacency indexes."""
+        sides = []
+        if direction in ["outgoing", "both"]:
+            sides.append((self.outgoing, "target"))
+        if direction in ["incoming", "both"]:
+            sides.append((self.incoming, "source"))
+        for adjacency, end in sides:
+            by_type = adjacency.get(node_id, {})
+            for rel_type in (rel_types if rel_types is not None else list(by_type)):
+                for edge_id in tuple(by_type.get(rel_type, ())):
+                    yield edge_id, self.edges[edge_id][end]
+    
+    def _path_to(self, node_id: str, reached: Dict) -> Optional[List[Dict]]:
+        """Edges from the start to node_id, or None if one has been deleted meanwhile."""
+        path = []
+        _, previous, edge_id = reached[node_id]
+        while edge_id is not None:
+            edge = self.edges.get(edge_id)
+            if edge is None:
+                return None
+            path.append(edge)
+            _, previous, edge_id = reached[previous]
+        return path[::-1]
+    
+    def _valid_at(self, edge_id: str, at: float) -> bool:
+        """Whether an edge holds at epoch time at; plain graphs have no validity."""
+        return True
+
+
+def _epoch(value: Any, default: float) -> float:
+    """Seconds since the epoch for a datetime or ISO string; default for None."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class _IntervalNode:
+    """Node of a centered interval tree; leaves only use positions."""
+    
+    __slots__ = ("center", "by_start", "starts", "by_end", "neg_ends", "left", "right", "positions")
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+
+class IntervalIndex:
+    """
+    Validity intervals [start, end) as epoch seconds, keyed by edge id.
+    
+    Answers "valid at T" (stabbing) and range-overlap queries in
+    O(log n + hits) with a centered interval tree over NumPy arrays. The
+    tree is built on the first query after a change. Inserts made since
+    then wait in a buffer that is scanned directly until it outgrows
+    sqrt(n). Changing or removing an interval already in the tree forces
+    a rebuild. Since queries may rebuild, concurrent queries take turns;
+    writers must be excluded by the caller (the owning graph's lock).
+    """
+    
+    LEAF_SIZE = 64
+    
+    def __init__(self):
+        self._intervals: Dict[str, Tuple[float, float]] = {}
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        self._tree: Optional[_IntervalNode] = None
+        self._query_lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._intervals)
+    
+    def set(self, key: str, start: float, end: float):
+        """Insert or update an interval."""
+        if self._tree is not None:
+            if key in self._intervals and key not in self._pending:
+                self._tree = None
+            else:
+                self._pending[key] = (start, end)
+        self._intervals[key] = (start, end)
+    
+    def get(self, key: str) -> Tuple[float, float]:
+        return self._intervals[key]
+    
+    def remove(self, key: str):
+        if self._intervals.pop(key, None) is not None and self._tree is not None:
+            if self._pending.pop(key, None) is None:
+                self._tree = None
+    
+    def stab(self, t: float, inclusive_end: bool = False) -> List[str]:
+        """Keys with start <= t < end (or <= end), ordered by start."""
+        with self._query_lock:
+            self._ensure_tree()
+            hits = self._stab_positions(t, inclusive_end)
+            extra = [
+                (start, key) for key, (start, end) in self._pending.items()
+                if start <= t and (end >= t if inclusive_end else end > t)
+            ]
+            return self._ordered(hits, extra)
+    
+    def overlap(self, start: float, end: float) -> List[str]:
+        """Keys whose closed interval intersects [start, end], ordered by start."""
+        with self._query_lock:
+            self._ensure_tree()
+            hits = self._stab_positions(start, inclusive_end=True)
+            if end >= start:
+                # Everything starting inside (start, end] overlaps as well
+                lo = np.searchsorted(self._sorted_starts, start, side="right")
+                hi = np.searchsorted(self._sorted_starts, end, side="right")
+                hits = np.concatenate([hits, self._start_order[lo:hi]])
+            else:
+                hits = hits[self._starts[hits] <= end]
+            extra = [
+                (s, key) for key, (s, e) in self._pending.items()
+                if e >= start and s <= end
+            ]
+            return self._ordered(hits, extra)
+    
+    def _ordered(self, positions: np.ndarray, extra: List[Tuple[float, str]]) -> List[str]:
+        starts = np.concatenate([self._starts[positions], [s for s, _ in extra]])
+        keys = [self._keys[i] for i in positions.tolist()] + [k for _, k in extra]
+        return [keys[i] for i in np.argsort(starts, kind="stable").tolist()]
+    
+    def _stab_positions(self, t: float, inclusive_end: bool) -> np.ndarray:
+        hits = []
+        end_side = "right" if inclusive_end else "left"
+        node = self._tree
+        while node is not None:
+            if node.positions is not None:
+                positions = node.positions
+                ends = self._ends[positions]
+                alive = ends >= t if inclusive_end else ends > t
+                hits.append(positions[(self._starts[positions] <= t) & alive])
+                break
+            if t < node.center:
+                # Every interval here ends at or after center > t
+                hits.append(node.by_start[:np.searchsorted(node.starts, t, side="right")])
+                node = node.left
+            else:
+                # Every interval here starts at or before center <= t
+                hits.append(node.by_end[:np.searchsorted(node.neg_ends, -t, side=end_side)])
+                node = node.right if t > node.center else None
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
+    
+    def _ensure_tree(self):
+        limit = max(self.LEAF_SIZE, math.isqrt(len(self._intervals)))
+        if self._tree is not None and len(self._pending) <= limit:
+            return
+        self._keys = list(self._intervals)
+        bounds = np.array(list(self._intervals.values()), dtype=np.float64).reshape(-1, 2)
+        self._starts, self._ends = bounds[:, 0].copy(), bounds[:, 1].copy()
+        self._start_order = np.argsort(self._starts, kind="stable")
+        self._sorted_starts = self._starts[self._start_order]
+        self._tree = self._build(np.arange(len(self._keys)))
+        self._pending = {}
+    
+    def _build(self, positions: np.ndarray) -> _IntervalNode:
+        if len(positions) <= self.LEAF_SIZE:
+            return _IntervalNode(positions=positions)
+        
+        starts, ends = self._starts[positions], self._ends[positions]
+        points = np.concatenate([starts, ends])
+        points = points[np.isfinite(points)]
+        center = float(np.median(points)) if len(points) else 0.0
+        
+        # At least half the endpoints are >= and <= center, so both sides shrink
+        left, right = ends < center, starts > center
+        here = positions[~(left | right)]
+        by_start = here[np.argsort(self._starts[here], kind="stable")]
+        by_end = here[np.argsort(-self._ends[here], kind="stable")]
+        return _IntervalNode(
+            center=center,
+            by_start=by_start,
+            starts=self._starts[by_start],
+            by_end=by_end,
+            neg_ends=-self._ends[by_end],
+            left=self._build(positions[left]) if left.any() else None,
+            right=self._build(positions[right]) if right.any() else None,
+        )
 
 
 class TemporalKnowledgeGraph(PropertyGraph):
-    """Property graph with temporal validity for facts."""
+    """
+    Property graph with temporal validity for facts.
+    
+    Validity intervals are kept as epoch seconds in an IntervalIndex per
+    edge type, so point-in-time and range queries cost O(log E + hits)
+    and parse no strings. Edges without validity are valid at all times.
+    """
     
+    # Reported for edges without valid_from
+    EPOCH_START = datetime(1970, 1, 1)
+    
+    def __init__(self, lock: Optional[ReadWriteLock] = None):
+        super().__init__(lock)
+        self.interval_index: Dict[str, IntervalIndex] = {}  # type -> intervals
+        self._valid_from: Dict[str, datetime] = {}  # edge_id -> parsed valid_from
+    
+    @_writes
     def create_temporal_relationship(
         self, 
         source_id: str, 
@@ -257,67 +2089,516 @@ class TemporalKnowledgeGraph(PropertyGraph):
         self.edges[edge_id]["valid_until"] = (
             valid_until.isoformat() if valid_until else None
         )
+        self._index_validity(self.edges[edge_id])
+        self._record_edge(edge_id)
         
         return edge_id
     
+    @_writes
+    def create_temporal_relationships(
+        self,
+        relationships: List[Tuple[str, str, str, datetime, Optional[datetime], Optional[Dict]]]
+    ) -> List[str]:
+        """
+        Create many (source_id, rel_type, target_id, valid_from, valid_until,
+        properties) edges; endpoints are all checked first.
+        """
+        self._check_endpoints(relationships)
+        return [
+            self.create_temporal_relationship(source_id, rel_type, target_id,
+                                              valid_from, valid_until, properties)
+            for source_id, rel_type, target_id, valid_from, valid_until, properties in relationships
+        ]
+    
+    @_writes
+    def close_relationship(self, edge_id: str, valid_until: datetime):
+        """End an edge's validity (a superseded fact stays queryable for the past)."""
+        edge = self.edges[edge_id]
+        edge["valid_until"] = valid_until.isoformat()
+        self._index_validity(edge)
+        self._record_edge(edge_id)
+    
+    def _index_edge(self, edge: Dict):
+        super()._index_edge(edge)
+        self._index_validity(edge)
+    
+    def _unindex_edge(self, edge: Dict):
+        super()._unindex_edge(edge)
+        self.interval_index[edge["type"]].remove(edge["id"])
+        self._valid_from.pop(edge["id"], None)
+    
+    def _index_validity(self, edge: Dict):
+        """Parse an edge's validity once, at write time."""
+        valid_from = edge.get("valid_from")
+        valid_from = datetime.fromisoformat(valid_from) if valid_from else None
+        self._valid_from[edge["id"]] = valid_from or self.EPOCH_START
+        self.interval_index.setdefault(edge["type"], IntervalIndex()).set(
+            edge["id"],
+            _epoch(valid_from, -math.inf),
+            _epoch(edge.get("valid_until"), math.inf)
+        )
+    
+    def _restore(self, nodes: Dict[str, Dict], edges: Dict[str, Dict]):
+        self.interval_index, self._valid_from = {}, {}
+        super()._restore(nodes, edges)
+    
+    def _valid_at(self, edge_id: str, at: float) -> bool:
+        start, end = self.interval_index[self.edges[edge_id]["type"]].get(edge_id)
+        return start <= at < end
+    
+    @_reads
     def query_at_time(self, query: Dict, query_time: datetime) -> List[Dict]:
         """Query graph state at specific time."""
-        results = []
-        
-        # Get base query results
-        base_results = self.query(query)
-        
-        for result in base_results:
-            edge = result["edge"]
-            valid_from = datetime.fromisoformat(edge.get("valid_from", "1970-01-01"))
-            valid_until = edge.get("valid_until")
-            
-            # Check temporal validity
-            if valid_from <= query_time:
-                if valid_until is None or datetime.fromisoformat(valid_until) > query_time:
-                    results.append({
-                        **result,
-                        "valid_from": valid_from,
-                        "valid_until": valid_until
-                    })
-        
-        return results
+        intervals = self.interval_index.get(query.get("type"))
+        if intervals is None:
+            return []
+        return self._temporal_results(query, intervals.stab(query_time.timestamp()))
     
+    @_reads
     def query_time_range(self, query: Dict, 
                          start_time: datetime, 
                          end_time: datetime) -> List[Dict]:
         """Query facts valid during time range."""
+        intervals = self.interval_index.get(query.get("type"))
+        if intervals is None:
+            return []
+        end = math.inf if end_time == datetime.max else end_time.timestamp()
+        return self._temporal_results(query, intervals.overlap(start_time.timestamp(), end))
+    
+    def _temporal_results(self, query: Dict, edge_ids: List[str]) -> List[Dict]:
+        """Label-matched results for candidate edges, ordered by valid_from."""
         results = []
-        
-        base_results = self.query(query)
-        
-        for result in base_results:
-            edge = result["edge"]
-            valid_from = datetime.fromisoformat(edge.get("valid_from", "1970-01-01"))
-            valid_until = edge.get("valid_until")
-            
-            # Check if overlaps with query range
-            until_dt = datetime.fromisoformat(valid_until) if valid_until else datetime.max
-            
-            if until_dt >= start_time and valid_from <= end_time:
+        for edge_id in edge_ids:
+            result = self._match(query, edge_id)
+            if result is not None:
                 results.append({
                     **result,
-                    "valid_from": valid_from,
-                    "valid_until": valid_until
+                    "valid_from": self._valid_from[edge_id],
+                    "valid_until": result["edge"].get("valid_until")
                 })
-        
         return results
 
 
+# Persistence
+
+class MappedVectors:
+    """A matrix (float32 by default) backed by a file and memory-mapped, so rows page in on demand."""
+    
+    def __init__(self, path: Path, dimension: int, dtype=np.float32):
+        self.path = path
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = self.dtype.itemsize * dimension
+        self.matrix: Optional[np.memmap] = None
+    
+    def open(self, min_rows: int) -> np.memmap:
+        """Map the file, extending it (with zeros) to hold at least min_rows rows."""
+        self.path.touch(exist_ok=True)
+        rows = max(os.path.getsize(self.path) // self._row_bytes, min_rows, 1)
+        if os.path.getsize(self.path) < rows * self._row_bytes:
+            with open(self.path, "r+b") as f:
+                f.truncate(rows * self._row_bytes)
+        self.matrix = np.memmap(self.path, dtype=self.dtype, mode="r+",
+                                shape=(rows, self.dimension))
+        return self.matrix
+    
+    def resize(self, rows: int) -> np.memmap:
+        """Grow the file and re-map it; existing rows are kept in place."""
+        self.flush()
+        return self.open(rows)
+    
+    def flush(self):
+        if self.matrix is not None:
+            self.matrix.flush()
+
+
+class MemoryJournal:
+    """
+    On-disk state of a persistent IntegratedMemorySystem directory:
+    
+        vectors.f32     embedding matrix, memory-mapped (never rewritten)
+        codes.bin       quantized rows, for stores with compact precision
+        quantizer.npz   the trained quantizer
+        header.json     dimension and storage precision, written when the
+                        directory is created
+        snapshot.json   compacted metadata and graph state
+        journal.jsonl   mutations since the snapshot, one JSON object per line
+                        (add, update, delete, node, edge, delete_edge,
+                        delete_node, consolidated)
+        journal.old.jsonl  the previous journal while a snapshot is written
+        archive.jsonl   facts retired by consolidation (cold storage)
+        sessions/       with shard_sessions: one directory of the files above
+                        per session shard (vectors only; the graph stays here)
+    
+    Every mutation is appended to the journal as it happens (and fsynced
+    with fsync=True, under the owner's write lock). Once snapshot_every
+    entries have accumulated, the state is compacted into a new snapshot:
+    the state is copied and the journal rotated under the write lock, and
+    the snapshot is written atomically by a background thread.
+    Reopening reads the snapshot, replays the journal and maps the vectors,
+    so only the rows a search touches are paged into memory.
+    """
+    
+    VECTORS_FILE = "vectors.f32"
+    CODES_FILE = "codes.bin"
+    QUANTIZER_FILE = "quantizer.npz"
+    HEADER_FILE = "header.json"
+    SNAPSHOT_FILE = "snapshot.json"
+    JOURNAL_FILE = "journal.jsonl"
+    ROTATED_FILE = "journal.old.jsonl"
+    
+    def __init__(self, path: str, dimension: int, snapshot_every: int = 10000,
+                 fsync: bool = False):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.pending = 0
+        self._vector_store: Optional[VectorStore] = None
+        self._graph: Optional[PropertyGraph] = None
+        self._file = None
+        self._batching = False
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._snapshot_error: Optional[BaseException] = None
+        # Watermarks of the last IntegratedMemorySystem.consolidate() pass
+        self.consolidated: Dict[str, float] = {}
+    
+    def attach(self, vector_store: Optional[VectorStore], graph: Optional[PropertyGraph]):
+        """
+        Load persisted state into an empty store and/or graph, then journal their mutations.
+        
+        When both share the journal file the graph adopts the store's lock.
+        """
+        if vector_store is not None and graph is not None:
+            graph.lock = vector_store.lock
+        state = self._read_snapshot()
+        self._check_header(state, vector_store)
+        if vector_store is None and state["metadata"]:
+            raise ValueError(f"Memory at {self.path} holds vectors but no store was given")
+        metadata, deleted = state["metadata"], set(state["deleted"])
+        self.consolidated = state.get("consolidated", {})
+        nodes, edges = state["nodes"], state["edges"]
+        
+        for entry in self._read_journal():
+            op = entry["op"]
+            if op == "add":
+                # Rows are appended in order; anything else is a stale duplicate
+                if entry["index"] == len(metadata):
+                    metadata.extend(entry["rows"])
+            elif op == "delete":
+                deleted.add(entry["index"])
+            elif op == "update":
+                metadata[entry["index"]].update(entry["metadata"])
+            elif op == "consolidated":
+                self.consolidated = entry["state"]
+            elif op == "node":
+                nodes[entry["node"]["id"]] = entry["node"]
+            elif op == "edge":
+                edges[entry["edge"]["id"]] = entry["edge"]
+            elif op == "delete_edge":
+                edges.pop(entry["id"], None)
+            elif op == "delete_node":
+                nodes.pop(entry["id"], None)
+            self.pending += 1
+        
+        if vector_store is not None:
+            vector_store._restore(self.path, metadata, sorted(deleted))
+            vector_store.journal = self
+        if graph is not None:
+            graph._restore(nodes, edges)
+            graph.journal = self
+        
+        self._vector_store, self._graph = vector_store, graph
+        self._file = open(self.path / self.JOURNAL_FILE, "a", encoding="utf-8")
+        if (self.path / self.ROTATED_FILE).exists():
+            # A snapshot was interrupted; its entries were replayed above
+            self.snapshot()
+            self.wait()
+    
+    def record(self, op: str, **payload):
+        """Append one mutation; compacts into a snapshot every snapshot_every entries."""
+        self._file.write(json.dumps({"op": op, **payload}, default=str) + "\n")
+        self.pending += 1
+        if not self._batching:
+            self._commit()
+    
+    @contextmanager
+    def batch(self):
+        """Group many mutations into one flush (and at most one snapshot)."""
+        if self._batching:
+            yield
+            return
+        self._batching = True
+        try:
+            yield
+        finally:
+            self._batching = False
+            self._commit()
+    
+    def _commit(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self.pending >= self.snapshot_every:
+            self.snapshot()
+    
+    def snapshot(self):
+        """
+        Compact the state into a new snapshot and start an empty journal.
+        
+        Call with the owner's write lock held. Only copying the state and
+        rotating the journal happen here; the vectors are flushed and the
+        snapshot written by a background thread (see wait()).
+        """
+        self.wait()
+        store, graph = self._vector_store, self._graph
+        state = {
+            "dimension": self.dimension,
+            "count": 0,
+            "metadata": [],
+            "deleted": [],
+            "nodes": {key: dict(node) for key, node in graph.nodes.items()} if graph is not None else {},
+            "edges": {key: dict(edge) for key, edge in graph.edges.items()} if graph is not None else {},
+            "consolidated": dict(self.consolidated),
+        }
+        if store is not None:
+            state.update(
+                precision=store.quantizer.precision,
+                count=store._count,
+                metadata=[dict(row) for row in store.metadata],
+                deleted=np.flatnonzero(store._deleted[:store._count]).tolist(),
+            )
+        
+        # Entries from here on go to a fresh journal
+        self._file.close()
+        journal, rotated = self.path / self.JOURNAL_FILE, self.path / self.ROTATED_FILE
+        if rotated.exists():
+            # A failed snapshot's entries are still needed
+            with open(rotated, "ab") as out, open(journal, "rb") as entries:
+                shutil.copyfileobj(entries, out)
+            os.remove(journal)
+        else:
+            os.replace(journal, rotated)
+        self._file = open(journal, "a", encoding="utf-8")
+        self.pending = 0
+        
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(state,), name="memory-snapshot", daemon=False
+        )
+        self._snapshot_thread.start()
+    
+    def wait(self):
+        """Block until the snapshot being written (if any) is on disk."""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+        if self._snapshot_error is not None:
+            error, self._snapshot_error = self._snapshot_error, None
+            raise error
+    
+    def _write_snapshot(self, state: Dict):
+        try:
+            if self._vector_store is not None:
+                self._vector_store.flush()
+            tmp = self.path / (self.SNAPSHOT_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path / self.SNAPSHOT_FILE)
+            os.remove(self.path / self.ROTATED_FILE)
+        except BaseException as error:
+            # The rotated journal is kept, so nothing is lost; wait() re-raises
+            self._snapshot_error = error
+    
+    def close(self):
+        self.wait()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._vector_store is not None:
+            self._vector_store.flush()
+            self._vector_store.journal = None
+        if self._graph is not None:
+            self._graph.journal = None
+    
+    def _check_header(self, state: Dict, vector_store: Optional[VectorStore]):
+        """
+        Refuse to open the directory at another dimension or precision.
+        
+        Checked before any vectors, codes or quantizer are loaded. Writes
+        the header if the directory has none (or lacks the precision).
+        """
+        header_path = self.path / self.HEADER_FILE
+        header = {}
+        if header_path.exists():
+            with open(header_path, encoding="utf-8") as f:
+                header = json.load(f)
+        if "dimension" not in header or (vector_store is not None and "precision" not in header):
+            # New directory, or one written before headers: trust its snapshot, if any
+            header.setdefault("dimension", state.get("dimension", self.dimension))
+            if vector_store is not None:
+                header.setdefault("precision", state.get("precision", vector_store.quantizer.precision))
+            tmp = self.path / (self.HEADER_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(header, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, header_path)
+        if header["dimension"] != self.dimension:
+            raise ValueError(
+                f"Memory at {self.path} has dimension {header['dimension']}, not {self.dimension}"
+            )
+        if vector_store is not None and header["precision"] != vector_store.quantizer.precision:
+            raise ValueError(
+                f"Memory at {self.path} is stored as {header['precision']}, "
+                f"not {vector_store.quantizer.precision}"
+            )
+    
+    def _read_snapshot(self) -> Dict:
+        snapshot = self.path / self.SNAPSHOT_FILE
+        if not snapshot.exists():
+            return {"metadata": [], "deleted": [], "nodes": {}, "edges": {}}
+        with open(snapshot, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["dimension"] != self.dimension:
+            raise ValueError(
+                f"Memory at {self.path} has dimension {state['dimension']}, not {self.dimension}"
+            )
+        return state
+    
+    def _read_journal(self):
+        """Entries of an interrupted snapshot's rotated journal, then of the journal."""
+        for name in (self.ROTATED_FILE, self.JOURNAL_FILE):
+            journal = self.path / name
+            if not journal.exists():
+                continue
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write from a crash; everything before it is intact
+                        break
+
+
+class ColdStorage:
+    """Append-only archive of retired facts: a JSON Lines file, or a list in memory."""
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.records: List[Dict] = []
+    
+    def archive(self, records: List[Dict]):
+        if not records:
+            return
+        if self.path is None:
+            self.records.extend(records)
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        if self.path is None:
+            yield from self.records
+        elif self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
 # Memory System Integration
 
 class IntegratedMemorySystem:
-    """Integrated memory system combining vector store and graph."""
+    """
+    Integrated memory system combining vector store and graph.
     
-    def __init__(self):
-        self.vector_store = VectorStore()
-        self.graph = TemporalKnowledgeGraph()
+    With shard_sessions the vector store is a ShardedVectorStore: each
+    session's facts live in their own shard, facts stored outside a
+    session (session_id "") in a global shard that every session's
+    retrieve_memories() also searches, and at most max_resident_sessions
+    session shards of a persistent system stay in memory.
+    """
+    
+    def __init__(self, dimension: int = 768, precision: str = "float32", rerank: int = 0,
+                 embedder: Optional[EmbeddingProvider] = None, shard_sessions: bool = False,
+                 max_resident_sessions: Optional[int] = None):
+        if precision not in QUANTIZERS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {sorted(QUANTIZERS)}")
+        # Shared by the store and graph, so multi-step operations are atomic
+        self.lock = ReadWriteLock()
+        if shard_sessions:
+            self.vector_store = ShardedVectorStore(
+                dimension=dimension, precision=precision, rerank=rerank, embedder=embedder,
+                max_resident=max_resident_sessions, lock=self.lock
+            )
+        else:
+            self.vector_store = VectorStore(dimension=dimension, quantizer=QUANTIZERS[precision](),
+                                            rerank=rerank, embedder=embedder, lock=self.lock)
+        self.graph = TemporalKnowledgeGraph(lock=self.lock)
         self.session_id: str = ""
+        self.journal: Optional[MemoryJournal] = None
+        self.cold_storage = ColdStorage()
+        # Relationship types that hold one target at a time (a newer edge supersedes)
+        self.exclusive_relationships: set = set()
+        self._consolidated: Dict[str, float] = {}
+        self._consolidating = threading.Lock()
+    
+    @classmethod
+    def open(cls, path: str, dimension: int = 768, snapshot_every: int = 10000,
+             fsync: bool = False, precision: str = "float32", rerank: int = 0,
+             embedder: Optional[EmbeddingProvider] = None, shard_sessions: bool = False,
+             max_resident_sessions: Optional[int] = None) -> "IntegratedMemorySystem":
+        """
+        Open (or create) a persistent memory system stored in directory path.
+        
+        Vectors are memory-mapped rather than read, and nothing is
+        re-embedded. Mutations are journaled until close(). With a compact
+        precision the full-precision rows stay on disk for re-ranking, and
+        only the codes a search scans are paged in. Session shards live
+        under path/sessions, each with its own journal; a directory must
+        always be opened with the same shard_sessions.
+        """
+        system = cls(dimension=dimension, precision=precision, rerank=rerank, embedder=embedder,
+                     shard_sessions=shard_sessions, max_resident_sessions=max_resident_sessions)
+        system.journal = MemoryJournal(path, dimension, snapshot_every, fsync)
+        sessions = system.journal.path / "sessions"
+        if shard_sessions:
+            system.vector_store.attach_directory(sessions, snapshot_every, fsync)
+            system.journal.attach(None, system.graph)
+        elif sessions.exists():
+            raise ValueError(f"Memory at {path} is sharded by session; open it with shard_sessions")
+        else:
+            system.journal.attach(system.vector_store, system.graph)
+        system.cold_storage = ColdStorage(system.journal.path / "archive.jsonl")
+        system._consolidated = system.journal.consolidated
+        return system
+    
+    def snapshot(self):
+        """Compact the journal into a snapshot now (persistent systems only)."""
+        with self.lock.write():
+            journal = self.journal
+            if journal is None:
+                return
+            journal.snapshot()
+        # Written without the lock; searches and inserts carry on meanwhile
+        journal.wait()
+        if isinstance(self.vector_store, ShardedVectorStore):
+            self.vector_store.snapshot()
+    
+    def close(self):
+        """Flush vectors and close the journal (persistent systems only)."""
+        with self.lock.write():
+            journal, self.journal = self.journal, None
+            if journal is not None:
+                journal.close()
+        if journal is not None and isinstance(self.vector_store, ShardedVectorStore):
+            self.vector_store.close()
+    
+    def _journal_batch(self):
+        """Group a multi-step mutation into one journal flush (a no-op in memory)."""
+        return self.journal.batch() if self.journal is not None else nullcontext()
     
     def start_session(self, session_id: str):
         """Start a new memory session."""
@@ -325,42 +2606,86 @@ class IntegratedMemorySystem:
     
     def store_fact(self, fact: str, entity: str, 
                    timestamp: datetime = None, 
-                   relationships: List[Dict] = None):
+                   relationships: List[Dict] = None) -> int:
         """Store a fact with entity and relationships."""
-        # Store in vector store
-        self.vector_store.add(fact, {
-            "text": fact,
+        return self.store_facts([{
+            "fact": fact,
             "entity": entity,
-            "valid_from": (timestamp or datetime.now()).isoformat(),
+            "timestamp": timestamp,
+            "relationships": relationships
+        }])[0]
+    
+    def store_facts(self, facts: List[Dict]) -> List[int]:
+        """
+        Store many facts at once; returns their vector store indices
+        ((session, index) pairs when sharded by session).
+        
+        Each item has "fact" and "entity", and optionally "timestamp" and
+        "relationships" (dicts with "type", "target" and "properties").
+        All texts are embedded in one batch, the vector matrix grows once,
+        and missing entity nodes (including relationship targets) are
+        created before the edges. Edges are valid from their fact's
+        timestamp. Embedding happens before the write lock is taken.
+        """
+        if not facts:
+            return []
+        now = datetime.now()
+        metadatas = [{
+            "text": item["fact"],
+            "entity": item["entity"],
+            "valid_from": (item.get("timestamp") or now).isoformat(),
             "session_id": self.session_id
-        })
+        } for item in facts]
+        relationships = [
+            (item["entity"], rel["type"], rel["target"],
+             item.get("timestamp") or now, None, rel.get("properties", {}))
+            for item in facts
+            for rel in item.get("relationships") or ()
+        ]
         
-        # Create entity node if not exists
-        entity_node = self.graph.get_node(entity)
-        if not entity_node:
-            self.graph.create_node("Entity", {"id": entity, "name": entity})
-        
-        # Create relationships
-        if relationships:
-            for rel in relationships:
-                self.graph.create_relationship(
-                    entity,
-                    rel["type"],
-                    rel["target"],
-                    properties=rel.get("properties", {})
-                )
+        embeddings = _normalize_rows(self.vector_store._embed_batch([item["fact"] for item in facts]))
+        
+        with self.lock.write(), self._journal_batch():
+            # Store in vector store
+            indices = self.vector_store._append_batch(embeddings, metadatas)
+            
+            # Create entity nodes that do not exist yet
+            entities = [item["entity"] for item in facts] + [rel[2] for rel in relationships]
+            for entity in dict.fromkeys(entities):
+                if self.graph.get_node(entity) is None:
+                    self.graph.create_node("Entity", {"id": entity, "name": entity}, node_id=entity)
+            
+            # Create relationships
+            self.graph.create_temporal_relationships(relationships)
+        
+        # Quantizer training and index builds, without the write lock
+        if isinstance(self.vector_store, ShardedVectorStore):
+            self.vector_store._maintain({session for session, _ in indices})
+        else:
+            self.vector_store._maintain()
+        return indices
     
     def retrieve_memories(self, query: str, 
                           entity_filter: str = None,
                           time_filter: Dict = None,
                           limit: int = 5) -> List[Dict]:
-        """Retrieve memories matching query."""
+        """
+        Retrieve memories matching query.
+        
+        time_filter {"start", "end"} (either optional) keeps facts whose
+        timestamp is in [start, end), e.g. {"start": now - timedelta(days=7)}
+        for the last week; only that window is scored.
+        """
         # Vector search
         filters = {"session_id": self.session_id}
         if entity_filter:
             filters["entity"] = entity_filter
+        time_range = None
+        if time_filter:
+            time_range = (time_filter.get("start"), time_filter.get("end"))
         
-        results = self.vector_store.search(query, limit=limit, filters=filters)
+        results = self.vector_store.search(query, limit=limit, filters=filters,
+                                           time_range=time_range)
         
         # Enrich with graph relationships
         for result in results:
@@ -370,6 +2695,7 @@ class IntegratedMemorySystem:
         
         return results
     
+    @_reads
     def retrieve_entity_context(self, entity: str) -> Dict:
         """Retrieve complete context for an entity."""
         # Get entity node
@@ -387,10 +2713,597 @@ class IntegratedMemorySystem:
             "memories": memories
         }
     
-    def consolidate(self):
-        """Consolidate memories and remove outdated information."""
-        # In production, implement actual consolidation logic
-        # - Merge related facts
-        # - Update validity periods
-        # - Archive obsolete facts
-        pass
+    def consolidate(self, similarity_threshold: float = 0.95,
+                    exclusive_types: Optional[Iterable[str]] = None,
+                    chunk: int = 256) -> Dict[str, int]:
+        """
+        Merge near-duplicate facts and retire superseded relationships.
+        
+        Only facts and edges added since the previous pass are examined:
+        
+        - Each new fact is compared (one matrix product per entity and
+          session) with the live facts of its entity in the same session.
+          If it is at least similarity_threshold similar to an older one,
+          it is merged into that canonical fact: the canonical fact's
+          merged_count and last_seen are updated, and the duplicate is
+          tombstoned and archived to cold storage.
+        - A new edge identical to an open older edge (same source, type and
+          target) is deleted. For exclusive relationship types, a new edge
+          closes older open edges of the same source and type by setting
+          their valid_until to its own start.
+        
+        Returns counts of facts scanned, vectors reclaimed, edges closed
+        and edges removed. Session shards are consolidated one at a time,
+        and evicted shards without new rows are not loaded.
+        
+        The pass takes the write lock for one chunk of new facts (of one
+        entity and session) or new edges at a time, so searches and inserts
+        interleave with a long pass. Facts and edges added during the pass
+        are left for the next one. One pass runs at a time.
+        """
+        graph = self.graph
+        exclusive = set(exclusive_types) if exclusive_types is not None else self.exclusive_relationships
+        report = {"facts_scanned": 0, "vectors_reclaimed": 0, "edges_closed": 0, "edges_removed": 0}
+        
+        with self._consolidating:
+            with self.lock.read():
+                # An int for one store, {session: rows} for session shards
+                since_rows = self._consolidated.get("rows", 0)
+                since_time = self._consolidated.get("edges_at", 0.0)
+                pass_time = time.time()
+            
+            rows_seen: Dict[Optional[str], int] = dict(since_rows) if isinstance(since_rows, dict) else {}
+            for session, since_row in self._unconsolidated(since_rows):
+                # Group new live facts by (entity, session)
+                groups: Dict[Tuple[Any, Any], List[int]] = {}
+                with self.lock.read():
+                    store = self._store(session)
+                    end = store._count
+                    for index in range(since_row, end):
+                        metadata = store.metadata[index]
+                        if store._deleted[index] or "entity" not in metadata:
+                            continue
+                        groups.setdefault((metadata["entity"], metadata.get("session_id")), []).append(index)
+                        report["facts_scanned"] += 1
+                
+                for (entity, session_id), new_rows in groups.items():
+                    for offset in range(0, len(new_rows), chunk):
+                        with self.lock.write(), self._journal_batch():
+                            # The shard may have been evicted and reloaded between chunks
+                            store = self._store(session)
+                            # Rows deleted since they were grouped are skipped
+                            rows = [row for row in new_rows[offset:offset + chunk]
+                                    if not store._deleted[row]]
+                            archived = self._merge_duplicates(store, entity, session_id, rows,
+                                                              similarity_threshold)
+                        report["vectors_reclaimed"] += len(archived)
+                        self.cold_storage.archive(archived)
+                rows_seen[session] = end
+            
+            # Edges created since the last pass, oldest first
+            with self.lock.read():
+                new_edges = sorted(
+                    (edge for edge in graph.edges.values() if edge["created_at"] > since_time),
+                    key=self._edge_start
+                )
+            for offset in range(0, len(new_edges), chunk):
+                with self.lock.write(), self._journal_batch():
+                    for edge in new_edges[offset:offset + chunk]:
+                        if edge["id"] in graph.edges and edge.get("valid_until") is None:
+                            self._supersede(edge, edge["type"] in exclusive, report)
+            
+            rows = rows_seen.pop(None) if None in rows_seen else rows_seen
+            with self.lock.write(), self._journal_batch():
+                self._consolidated = {"rows": rows, "edges_at": pass_time}
+                if self.journal is not None:
+                    self.journal.consolidated = self._consolidated
+                    self.journal.record("consolidated", state=self._consolidated)
+        
+        return report
+    
+    def _unconsolidated(self, since_rows: Any) -> List[Tuple[Optional[str], int]]:
+        """
+        (session, rows consolidated) for each shard that may have rows past
+        since_rows, or [(None, since_rows)] when not sharded.
+        """
+        if not isinstance(self.vector_store, ShardedVectorStore):
+            return [(None, since_rows)]
+        stores = []
+        for session in self.vector_store.sessions():
+            since_row = since_rows.get(session, 0) if isinstance(since_rows, dict) else since_rows
+            if self.vector_store.row_count(session) != since_row:
+                stores.append((session, since_row))
+        return stores
+    
+    def _store(self, session: Optional[str]) -> VectorStore:
+        """The shard of a session (loaded if evicted), or the store when not sharded."""
+        if session is None:
+            return self.vector_store
+        return self.vector_store.shard(session)
+    
+    def _merge_duplicates(self, store: VectorStore, entity: Any, session_id: Any,
+                          new_rows: List[int], threshold: float,
+                          chunk: int = 1024) -> List[Dict]:
+        """Merge new rows into older near-identical rows of store; returns archive records."""
+        members = store._candidates({"entity": entity, "session_id": session_id})
+        members = members[~store._deleted[members]]
+        merged = np.zeros(len(members), dtype=bool)
+        position = {index: i for i, index in enumerate(members.tolist())}
+        archived = []
+        
+        for offset in range(0, len(new_rows), chunk):
+            rows = new_rows[offset:offset + chunk]
+            similarity = store._rows(rows) @ store._rows(members).T
+            for row, scores in zip(rows, similarity):
+                # Oldest earlier fact that is similar enough and still canonical
+                older = (members < row) & ~merged & (scores >= threshold)
+                if not older.any():
+                    continue
+                canonical = int(members[np.argmax(older)])
+                merged[position[row]] = True
+                
+                metadata = store.metadata[canonical]
+                store.update_metadata(canonical, {
+                    "merged_count": metadata.get("merged_count", 0) + 1,
+                    "last_seen": max(metadata.get("last_seen", metadata.get("valid_from", "")),
+                                     store.metadata[row].get("valid_from", ""))
+                })
+                store.delete(row)
+                archived.append({
+                    "index": row,
+                    "merged_into": canonical,
+                    "similarity": float(scores[position[canonical]]),
+                    "metadata": store.metadata[row],
+                    "archived_at": datetime.now().isoformat()
+                })
+        return archived
+    
+    def _supersede(self, edge: Dict, exclusive: bool, report: Dict[str, int]):
+        """
+        Drop an edge that repeats an open one, or close the edges it replaces.
+        
+        An exclusive edge closes the open siblings that started before it,
+        and is itself closed at the start of the earliest sibling that
+        started after it (an edge stored out of order).
+        """
+        graph = self.graph
+        start = self._edge_start(edge)
+        next_start = None
+        for sibling in graph.get_relationships(edge["source"], "outgoing", edge["type"]):
+            other = sibling["edge"]
+            if other["id"] == edge["id"]:
+                continue
+            other_start = self._edge_start(other)
+            if other_start > start:
+                next_start = other_start if next_start is None else min(next_start, other_start)
+                continue
+            if other.get("valid_until") is not None:
+                continue
+            if other["target"] == edge["target"]:
+                graph.delete_relationship(edge["id"])
+                report["edges_removed"] += 1
+                return
+            if exclusive:
+                graph.close_relationship(other["id"], datetime.fromtimestamp(start))
+                report["edges_closed"] += 1
+        
+        if exclusive and next_start is not None:
+            graph.close_relationship(edge["id"], datetime.fromtimestamp(next_start))
+            report["edges_closed"] += 1
+    
+    @staticmethod
+    def _edge_start(edge: Dict) -> float:
+        """When an edge became true: valid_from if set, else when it was created."""
+        valid_from = edge.get("valid_from")
+        return _epoch(valid_from, 0.0) if valid_from else edge["created_at"]
+
+
+# Benchmarks
+
+def _clustered_vectors(rng: np.random.Generator, centers: np.ndarray, n: int) -> np.ndarray:
+    """Unit vectors scattered around random centers (ANN-friendly, like real embeddings)."""
+    points = centers[rng.integers(len(centers), size=n)]
+    points = points + 0.5 * rng.standard_normal(points.shape)
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def benchmark_ann(n: int = 100_000, dimension: int = 128, n_queries: int = 200,
+                  k: int = 10, n_lists: Optional[int] = None,
+                  n_probes: tuple = (1, 2, 4, 8, 16, 32), seed: int = 0) -> List[Dict]:
+    """
+    Recall@k and latency of IVFIndex against exact search.
+    
+    Runs every n_probe setting unfiltered and with a metadata pre-filter
+    that keeps 10% of rows. Returns one row per (filter, n_probe).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 16), dimension))
+    store = VectorStore(dimension=dimension, initial_capacity=n)
+    for i, vector in enumerate(_clustered_vectors(rng, centers, n)):
+        store._append(vector, {"group": i % 10})
+    queries = _clustered_vectors(rng, centers, n_queries)
+    
+    start = time.perf_counter()
+    store.attach_index(IVFIndex(n_lists=n_lists or int(4 * np.sqrt(n)), min_train_size=1))
+    build_s = time.perf_counter() - start
+    
+    def run(candidates):
+        ids, timings = [], []
+        for query in queries:
+            start = time.perf_counter()
+            found, _ = store._rank(query, k, candidates)
+            timings.append(time.perf_counter() - start)
+            ids.append(set(found.tolist()))
+        return ids, 1000 * float(np.median(timings))
+    
+    rows = []
+    for label, filters in (("none", None), ("group=3", {"group": 3})):
+        candidates = store._candidates(filters) if filters else None
+        index, store.index = store.index, None
+        truth, exact_ms = run(candidates)
+        store.index = index
+        
+        for n_probe in n_probes:
+            index.n_probe = n_probe
+            found, ann_ms = run(candidates)
+            recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+            rows.append({
+                "filter": label,
+                "n_probe": n_probe,
+                f"recall@{k}": round(float(recall), 4),
+                "p50_ms": round(ann_ms, 3),
+                "exact_p50_ms": round(exact_ms, 3),
+                "speedup": round(exact_ms / ann_ms, 1) if ann_ms else None,
+                "build_s": round(build_s, 2),
+            })
+    return rows
+
+
+def benchmark_quantization(n: int = 50_000, dimension: int = 128, n_queries: int = 200,
+                           k: int = 10, rerank: int = 4, seed: int = 0) -> List[Dict]:
+    """
+    Memory and recall@k of every storage precision against exact float32 search.
+    
+    Compact precisions are measured scoring codes only (rerank 0) and with
+    rerank * k candidates re-scored from full-precision rows. Those rows
+    are counted in bytes_per_vector and compression, though they are
+    mapped from disk rather than resident (resident_bytes_per_vector).
+    Precisions whose quantizer needs more than n rows to train are left
+    out: their rows would be stored as float32.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 16), dimension))
+    vectors = _clustered_vectors(rng, centers, n)
+    queries = _clustered_vectors(rng, centers, n_queries)
+    
+    rows, truth = [], None
+    for precision, quantizer_class in QUANTIZERS.items():
+        quantizer = quantizer_class()
+        store = VectorStore(dimension=dimension, initial_capacity=n, quantizer=quantizer,
+                            rerank=0 if quantizer.exact else rerank)
+        start = time.perf_counter()
+        store._append_batch(vectors, [{} for _ in range(n)])
+        store._maintain()
+        build_s = time.perf_counter() - start
+        # Training swaps in a trained copy of the quantizer
+        quantizer = store.quantizer
+        if not quantizer.trained:
+            continue
+        
+        for factor in (0,) if quantizer.exact else (0, rerank):
+            store.rerank = factor
+            found, timings = [], []
+            for query in queries:
+                start = time.perf_counter()
+                ids, _ = store._rank(query, k)
+                timings.append(time.perf_counter() - start)
+                found.append(set(ids.tolist()))
+            truth = truth or found
+            recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+            resident = quantizer.bytes_per_vector(dimension)
+            stored = resident + (4 * dimension if factor else 0)
+            rows.append({
+                "precision": precision,
+                "rerank": factor,
+                "bytes_per_vector": stored,
+                "resident_bytes_per_vector": resident,
+                "compression": round(4 * dimension / stored, 1),
+                f"recall@{k}": round(float(recall), 4),
+                "p50_ms": round(1000 * float(np.median(timings)), 3),
+                "build_s": round(build_s, 2),
+            })
+    return rows
+
+
+def benchmark_time_range(n: int = 100_000, dimension: int = 128, days: int = 365,
+                         window_days: int = 7, n_queries: int = 100, k: int = 10,
+                         seed: int = 0) -> Dict:
+    """
+    Latency of a "last window_days" search against searching the whole store.
+    
+    Rows get evenly spaced valid_from timestamps over days. The windowed
+    search must return the exact top-k of the rows inside the window.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 16), dimension))
+    end = datetime(2026, 1, 1).timestamp()
+    times = np.linspace(end - days * 86400, end, n, endpoint=False)
+    store = VectorStore(dimension=dimension, initial_capacity=n)
+    store._append_batch(_clustered_vectors(rng, centers, n), [{"valid_from": float(t)} for t in times])
+    queries = _clustered_vectors(rng, centers, n_queries)
+    start = end - window_days * 86400
+    
+    in_window = (times >= start) & (times < end)
+    window_ms, full_ms = [], []
+    for query in queries:
+        began = time.perf_counter()
+        ids, _ = store._rank(query, k, store._time_window(start, end))
+        window_ms.append(1000 * (time.perf_counter() - began))
+        
+        began = time.perf_counter()
+        store._rank(query, k)
+        full_ms.append(1000 * (time.perf_counter() - began))
+        
+        scores = np.where(in_window, store.vectors @ query, -np.inf)
+        assert set(ids.tolist()) == set(_top_k(scores, k).tolist()), "window search is not exact"
+    
+    return {
+        "rows": n,
+        "window_rows": int(in_window.sum()),
+        "window_p50_ms": round(float(np.median(window_ms)), 3),
+        "full_p50_ms": round(float(np.median(full_ms)), 3),
+        "speedup": round(float(np.median(full_ms) / np.median(window_ms)), 1),
+    }
+
+
+def benchmark_sessions(n_sessions: int = 200, rows_per_session: int = 500,
+                       dimension: int = 128, n_queries: int = 200, k: int = 10,
+                       seed: int = 0) -> Dict:
+    """
+    Latency of a one-session search in one shared store against session shards.
+    
+    Both return the exact top-k of the session's rows plus the global
+    (session-less) rows; the shared store filters, the sharded store only
+    looks at two shards.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((64, dimension))
+    sessions = [f"s{i}" for i in range(n_sessions)]
+    single = VectorStore(dimension=dimension, initial_capacity=(n_sessions + 1) * rows_per_session)
+    sharded = ShardedVectorStore(dimension=dimension)
+    for session in [""] + sessions:
+        vectors = _clustered_vectors(rng, centers, rows_per_session)
+        metadatas = [{"session_id": session} for _ in range(rows_per_session)]
+        single._append_batch(vectors, metadatas)
+        sharded._append_batch(vectors, metadatas)
+    
+    single_ms, sharded_ms = [], []
+    for query in _clustered_vectors(rng, centers, n_queries):
+        filters = {"session_id": [str(rng.choice(sessions)), ""]}
+        began = time.perf_counter()
+        expected = single._search(query, k, filters)
+        single_ms.append(1000 * (time.perf_counter() - began))
+        
+        began = time.perf_counter()
+        results = []
+        for session in filters["session_id"]:
+            results += sharded.shard(session)._search(query, k)
+        results = sorted(results, key=lambda r: -r["score"])[:k]
+        sharded_ms.append(1000 * (time.perf_counter() - began))
+        
+        assert np.allclose([r["score"] for r in results], [r["score"] for r in expected], atol=1e-6), \
+            "sharded search is not exact"
+    
+    return {
+        "rows": len(single),
+        "session_rows": rows_per_session,
+        "single_store_p50_ms": round(float(np.median(single_ms)), 3),
+        "sharded_p50_ms": round(float(np.median(sharded_ms)), 3),
+        "speedup": round(float(np.median(single_ms) / np.median(sharded_ms)), 1),
+    }
+
+
+def stress_concurrency(readers: int = 8, writers: int = 2, seconds: float = 5.0,
+                       dimension: int = 64, n_entities: int = 200, seed: int = 0,
+                       precision: str = "float32", n_lists: int = 0,
+                       initial_facts: int = 2000) -> Dict:
+    """
+    Hammer one IntegratedMemorySystem from reader and writer threads.
+    
+    Writers store facts with relationships, delete facts, delete and close
+    edges, and consolidate; readers search, look up entity context, walk
+    the graph and run temporal queries. Afterwards every index is checked
+    against the data it indexes. Returns throughput, read latency, any
+    errors raised in threads and whether the indexes are consistent.
+    
+    With a compact precision or n_lists (an IVF index), starting below
+    their training size makes the quantizer train and the index build
+    while the threads run.
+    """
+    import traceback
+    
+    system = IntegratedMemorySystem(dimension=dimension, precision=precision)
+    if n_lists:
+        system.vector_store.attach_index(IVFIndex(n_lists=n_lists))
+    system.exclusive_relationships = {"located_in"}
+    words = [f"w{i}" for i in range(500)]
+    
+    def fact(rng):
+        entity = f"e{rng.integers(n_entities)}"
+        return {
+            "fact": " ".join(rng.choice(words, 6)),
+            "entity": entity,
+            "relationships": [{"type": ("knows", "located_in")[int(rng.integers(2))],
+                               "target": f"e{rng.integers(n_entities)}"}],
+        }
+    
+    setup = np.random.default_rng(seed)
+    system.store_facts([fact(setup) for _ in range(initial_facts)])
+    
+    stop = threading.Event()
+    errors: List[str] = []
+    counts = {"reads": 0, "writes": 0}
+    read_latencies: List[float] = []
+    counts_lock = threading.Lock()
+    
+    def run(worker, rng):
+        try:
+            while not stop.is_set():
+                worker(rng)
+        except Exception:
+            errors.append(traceback.format_exc())
+            stop.set()
+    
+    def write(rng):
+        action = rng.random()
+        if action < 0.6:
+            system.store_facts([fact(rng) for _ in range(int(rng.integers(1, 20)))])
+        elif action < 0.75:
+            system.vector_store.delete(int(rng.integers(len(system.vector_store.metadata))))
+        elif action < 0.9:
+            with system.lock.write():
+                edge_ids = system.graph.edge_index.get("knows") or [None]
+                edge_id = edge_ids[int(rng.integers(len(edge_ids)))]
+                if edge_id is not None:
+                    if rng.random() < 0.5:
+                        system.graph.delete_relationship(edge_id)
+                    else:
+                        system.graph.close_relationship(edge_id, datetime.now())
+        else:
+            system.consolidate()
+        with counts_lock:
+            counts["writes"] += 1
+    
+    def read(rng):
+        entity = f"e{rng.integers(n_entities)}"
+        start = time.perf_counter()
+        action = rng.random()
+        if action < 0.4:
+            results = system.vector_store.search(" ".join(rng.choice(words, 3)), limit=10,
+                                                 filters={"entity": entity} if rng.random() < 0.5 else None)
+            scores = [r["score"] for r in results]
+            assert scores == sorted(scores, reverse=True), "results out of order"
+        elif action < 0.6:
+            context = system.retrieve_entity_context(entity)
+            assert all(m["metadata"]["entity"] == entity for m in context["memories"])
+        elif action < 0.8:
+            if system.graph.get_node(entity) is not None:
+                for step in system.graph.traverse(entity, max_depth=2, direction="both"):
+                    assert len(step["path"]) == step["depth"]
+        else:
+            system.graph.query_at_time({"type": "located_in"}, datetime.now())
+        elapsed = time.perf_counter() - start
+        with counts_lock:
+            counts["reads"] += 1
+            read_latencies.append(elapsed)
+    
+    threads = [
+        threading.Thread(target=run, args=(write, np.random.default_rng(seed + 1 + i)))
+        for i in range(writers)
+    ] + [
+        threading.Thread(target=run, args=(read, np.random.default_rng(seed + 1001 + i)))
+        for i in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    stop.wait(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    return {
+        "readers": readers,
+        "writers": writers,
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "read_p50_ms": round(1000 * float(np.median(read_latencies)), 3) if read_latencies else None,
+        "read_p99_ms": round(1000 * float(np.percentile(read_latencies, 99)), 3) if read_latencies else None,
+        "facts": len(system.vector_store),
+        "edges": len(system.graph.edges),
+        "consistent": _check_consistency(system),
+        "errors": errors,
+    }
+
+
+def _check_consistency(system: IntegratedMemorySystem) -> bool:
+    """Whether every vector store and graph index agrees with the data it indexes."""
+    store, graph = system.vector_store, system.graph
+    if len(store.metadata) != store._count or int(store._deleted[:store._count].sum()) != store.deleted_count:
+        return False
+    entity_rows = sorted(i for rows in store.entity_index.values() for i in rows)
+    if entity_rows != list(range(store._count)):
+        return False
+    for index, metadata in enumerate(store.metadata):
+        if index not in store._postings("entity", metadata["entity"]):
+            return False
+    
+    indexed = sorted(e for ids in graph.edge_index.values() for e in ids)
+    outgoing = sorted(e for by_type in graph.outgoing.values() for ids in by_type.values() for e in ids)
+    incoming = sorted(e for by_type in graph.incoming.values() for ids in by_type.values() for e in ids)
+    intervals = sum(len(index) for index in graph.interval_index.values())
+    return indexed == outgoing == incoming == sorted(graph.edges) and intervals == len(graph.edges)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Memory store benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    ann_parser = subparsers.add_parser("benchmark-ann", help="IVF recall vs latency against exact search")
+    ann_parser.add_argument("--n", type=int, default=100_000, help="Stored vectors")
+    ann_parser.add_argument("--dimension", type=int, default=128)
+    ann_parser.add_argument("--queries", type=int, default=200)
+    ann_parser.add_argument("--k", type=int, default=10)
+    ann_parser.add_argument("--lists", type=int, default=None, help="IVF lists (default 4*sqrt(n))")
+    
+    quantization_parser = subparsers.add_parser(
+        "benchmark-quantization", help="Memory and recall of each storage precision"
+    )
+    quantization_parser.add_argument("--n", type=int, default=50_000, help="Stored vectors")
+    quantization_parser.add_argument("--dimension", type=int, default=128)
+    quantization_parser.add_argument("--queries", type=int, default=200)
+    quantization_parser.add_argument("--k", type=int, default=10)
+    quantization_parser.add_argument("--rerank", type=int, default=4,
+                                     help="Candidates re-scored at full precision, per result")
+    
+    time_parser = subparsers.add_parser(
+        "benchmark-time-range", help="Windowed search against searching the whole store"
+    )
+    time_parser.add_argument("--n", type=int, default=100_000, help="Stored vectors")
+    time_parser.add_argument("--days", type=int, default=365, help="Time span of the stored rows")
+    time_parser.add_argument("--window-days", type=int, default=7)
+    
+    sessions_parser = subparsers.add_parser(
+        "benchmark-sessions", help="One-session search in a shared store against session shards"
+    )
+    sessions_parser.add_argument("--sessions", type=int, default=200)
+    sessions_parser.add_argument("--rows-per-session", type=int, default=500)
+    
+    stress_parser = subparsers.add_parser(
+        "stress-concurrency", help="Concurrent readers and writers on one memory system"
+    )
+    stress_parser.add_argument("--readers", type=int, default=8)
+    stress_parser.add_argument("--writers", type=int, default=2)
+    stress_parser.add_argument("--seconds", type=float, default=5.0)
+    stress_parser.add_argument("--precision", choices=sorted(QUANTIZERS), default="float32")
+    stress_parser.add_argument("--lists", type=int, default=0)
+    
+    args = parser.parse_args()
+    
+    if args.command == "benchmark-ann":
+        for row in benchmark_ann(args.n, args.dimension, args.queries, args.k, args.lists):
+            print(json.dumps(row))
+    elif args.command == "benchmark-quantization":
+        for row in benchmark_quantization(args.n, args.dimension, args.queries, args.k, args.rerank):
+            print(json.dumps(row))
+    elif args.command == "benchmark-time-range":
+        print(json.dumps(benchmark_time_range(args.n, days=args.days, window_days=args.window_days)))
+    elif args.command == "benchmark-sessions":
+        print(json.dumps(benchmark_sessions(args.sessions, args.rows_per_session)))
+    elif args.command == "stress-concurrency":
+        report = stress_concurrency(args.readers, args.writers, args.seconds,
+                                    precision=args.precision, n_lists=args.lists)
+        print(json.dumps(report, indent=2))
+        if report["errors"] or not report["consistent"]:
+            raise SystemExit(1)
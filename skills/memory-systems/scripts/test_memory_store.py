@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory store.
+
+Run directly or with pytest:
+    python test_memory_store.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from memory_store import (
+    CachedEmbedder, EmbeddingProvider, Float16Quantizer, HashingEmbedder, IntervalIndex,
+    IVFIndex, IntegratedMemorySystem, ProductQuantizer, PropertyGraph, ScalarQuantizer,
+    TimeIndex, VectorStore, _clustered_vectors, stress_concurrency
+)
+
+
+def unit_rows(rng, n, dimension):
+    """n random unit-length float32 rows."""
+    rows = rng.standard_normal((n, dimension)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def brute_force(store, query, k, rows=None):
+    """Ids of the top-k live rows (of rows, if given) by exact inner product."""
+    rows = np.arange(store._count) if rows is None else np.asarray(rows, dtype=np.int64)
+    rows = rows[~store._deleted[rows]]
+    scores = store.vectors[rows] @ query
+    return rows[np.argsort(-scores, kind="stable")[:k]].tolist()
+
+
+def test_search_matches_brute_force():
+    """The matrix search returns the exact top-k live rows, best first."""
+    print("Testing search against brute force...")
+    
+    rng = np.random.default_rng(0)
+    store = VectorStore(dimension=32, initial_capacity=16)
+    store._append_batch(unit_rows(rng, 500, 32), [{} for _ in range(500)])
+    for index in range(0, 500, 7):
+        store.delete(index)
+    
+    for query in unit_rows(rng, 20, 32):
+        results = store._search(query, 10)
+        assert [r["index"] for r in results] == brute_force(store, query, 10)
+        scores = [r["score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+    
+    print("  [PASS] Top-10 equals brute force with tombstoned rows skipped")
+
+
+def test_filtered_search_matches_brute_force():
+    """Pre-filtered searches equal brute force over the rows matching every filter."""
+    print("Testing filtered search against brute force...")
+    
+    rng = np.random.default_rng(1)
+    # Lists are unhashable values: matched by comparison, not the inverted index
+    metadatas = [{"group": int(g), "kind": "a" if i % 3 else "b", "tags": ["x"] if i % 2 else ["y"]}
+                 for i, g in enumerate(rng.integers(10, size=2000))]
+    store = VectorStore(dimension=32)
+    store._append_batch(unit_rows(rng, 2000, 32), metadatas)
+    for index in range(0, 2000, 11):
+        store.delete(index)
+    store.update_metadata(5, {"group": 99})
+    
+    for filters in ({"group": 3}, {"group": [1, 2], "kind": "a"}, {"group": 99},
+                    {"tags": [["x"]], "group": 4}, {"missing": 1}):
+        matching = [i for i, m in enumerate(store.metadata) if store._matches_filters(m, filters)]
+        for query in unit_rows(rng, 5, 32):
+            results = store._search(query, 10, filters=filters)
+            assert [r["index"] for r in results] == [
+                i for i in brute_force(store, query, 10, matching)
+                if float(store.vectors[i] @ query) > 0
+            ], filters
+    
+    print("  [PASS] Filtered top-10 equals brute force")
+
+
+
+
+def test_ivf_recall_at_default_probe():
+    """A default IVF index keeps recall@10 high while scanning a small fraction of rows."""
+    print("Testing IVF recall...")
+    
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((40, 32))
+    store = VectorStore(dimension=32, initial_capacity=12000, index=IVFIndex())
+    store._append_batch(_clustered_vectors(rng, centers, 12000), [{} for _ in range(12000)])
+    store._maintain()
+    assert store.index.trained
+    assert store.index.expected_scan(len(store)) < len(store) // 10
+    
+    recalls = []
+    for query in _clustered_vectors(rng, centers, 100):
+        ids, _ = store._rank(query, 10)
+        recalls.append(len(set(ids.tolist()) & set(brute_force(store, query, 10))) / 10)
+    assert np.mean(recalls) >= 0.95, np.mean(recalls)
+    
+    print(f"  [PASS] recall@10 {np.mean(recalls):.3f} at n_probe {store.index.n_probe}")
+
+
+def test_reopen_restores_search_results():
+    """Snapshot plus journal replay restores the same searches, deletes and edges."""
+    print("Testing reopen after snapshot and journal...")
+    
+    queries = ["fact 3 about 4", "fact 12", "about 7", "fact 250 about 11"]
+    
+    def state(system):
+        searches = [[(r["index"], round(r["score"], 5), r["text"])
+                     for r in system.retrieve_memories(q, limit=10)] for q in queries]
+        edges = sorted((e["source"], e["type"], e["target"], e.get("valid_until"))
+                       for e in system.graph.edges.values())
+        return searches, edges, len(system.vector_store)
+    
+    with tempfile.TemporaryDirectory() as path:
+        system = IntegratedMemorySystem.open(path, dimension=64, snapshot_every=100)
+        for start in range(0, 300, 50):
+            system.store_facts([{"fact": f"fact {i} about {i % 13}", "entity": f"e{i % 13}",
+                                 "relationships": [{"type": "knows", "target": f"e{i % 5}"}]}
+                                for i in range(start, start + 50)])
+        for index in range(0, 300, 9):
+            system.vector_store.delete(index)
+        system.consolidate()
+        system.snapshot()
+        # Left in the journal only
+        system.store_facts([{"fact": f"late fact {i} about 4", "entity": "e4"} for i in range(20)])
+        system.vector_store.delete(301)
+        expected = state(system)
+        system.close()
+        
+        system = IntegratedMemorySystem.open(path, dimension=64, snapshot_every=100)
+        assert state(system) == expected
+        system.close()
+    
+    print("  [PASS] Identical results after reopening")
+
+
+def test_relationship_lookups_match_a_scan():
+    """Adjacency lookups return exactly the edges a scan of every edge finds."""
+    print("Testing relationship lookups against a scan...")
+    
+    rng = np.random.default_rng(3)
+    graph = PropertyGraph()
+    for i in range(30):
+        graph.create_node("Entity", node_id=f"n{i}")
+    edge_ids = [graph.create_relationship(f"n{rng.integers(30)}", ("knows", "likes")[int(rng.integers(2))],
+                                          f"n{rng.integers(30)}") for _ in range(300)]
+    for edge_id in edge_ids[::4]:
+        graph.delete_relationship(edge_id)
+    graph.delete_node("n0")
+    
+    for node in [f"n{i}" for i in range(1, 30)]:
+        for direction in ("outgoing", "incoming", "both"):
+            for rel_type in (None, "knows"):
+                found = sorted(r["edge"]["id"] for r in graph.get_relationships(node, direction, rel_type))
+                # A self-loop is listed once per side
+                expected = sorted(
+                    [e["id"] for e in graph.edges.values() if direction != "incoming" and e["source"] == node
+                     and rel_type in (None, e["type"])]
+                    + [e["id"] for e in graph.edges.values() if direction != "outgoing" and e["target"] == node
+                       and rel_type in (None, e["type"])]
+                )
+                assert found == expected, (node, direction, rel_type)
+    
+    print("  [PASS] Lookups equal a full scan after edge and node deletes")
+
+
+def test_interval_index_matches_a_scan():
+    """Stabbing and overlap queries equal a linear scan, before and after changes."""
+    print("Testing interval index against a scan...")
+    
+    rng = np.random.default_rng(4)
+    index = IntervalIndex()
+    intervals = {}
+    
+    def put(key):
+        start = float(rng.integers(0, 1000))
+        end = start + float(rng.integers(0, 200)) if rng.random() < 0.9 else float("inf")
+        index.set(key, start, end)
+        intervals[key] = (start, end)
+    
+    def check():
+        for t in rng.integers(-10, 1300, size=30).astype(float):
+            assert set(index.stab(t)) == {k for k, (s, e) in intervals.items() if s <= t < e}
+            assert set(index.stab(t, inclusive_end=True)) == {k for k, (s, e) in intervals.items() if s <= t <= e}
+            hi = t + float(rng.integers(-50, 300))
+            assert set(index.overlap(t, hi)) == {k for k, (s, e) in intervals.items() if e >= t and s <= hi}
+        starts = [intervals[k][0] for k in index.stab(500.0)]
+        assert starts == sorted(starts)
+    
+    for i in range(2000):
+        put(f"k{i}")
+    check()
+    # Buffered inserts, then updates and removals that force a rebuild
+    for i in range(2000, 2030):
+        put(f"k{i}")
+    check()
+    for i in range(0, 2000, 17):
+        put(f"k{i}")
+    for i in range(5, 2000, 23):
+        index.remove(f"k{i}")
+        intervals.pop(f"k{i}")
+    check()
+    
+    print("  [PASS] stab() and overlap() equal a linear scan")
+
+
+def test_traverse_and_shortest_path():
+    """Traversal honours depth, labels and relationship types; shortest_path finds fewest hops."""
+    print("Testing traversal...")
+    
+    graph = PropertyGraph()
+    for node, label in (("a", "Person"), ("b", "Person"), ("c", "Place"), ("d", "Person"),
+                        ("e", "Person"), ("f", "Person")):
+        graph.create_node(label, node_id=node)
+    for source, rel_type, target in (("a", "knows", "b"), ("b", "knows", "d"), ("d", "knows", "e"),
+                                     ("a", "visited", "c"), ("c", "near", "e"), ("e", "knows", "f")):
+        graph.create_relationship(source, rel_type, target)
+    
+    def depths(**options):
+        return {step["node"]["id"]: step["depth"] for step in graph.traverse("a", **options)}
+    
+    assert depths(max_depth=1) == {"b": 1, "c": 1}
+    assert depths(max_depth=2) == {"b": 1, "c": 1, "d": 2, "e": 2}
+    assert depths(max_depth=2, node_labels=["Person"]) == {"b": 1, "d": 2}
+    assert depths(max_depth=5, rel_types=["knows"]) == {"b": 1, "d": 2, "e": 3, "f": 4}
+    assert depths(max_depth=5, strategy="dfs") == depths(max_depth=5)
+    for step in graph.traverse("a", max_depth=5):
+        assert len(step["path"]) == step["depth"]
+        assert step["path"][-1]["target"] == step["node"]["id"]
+    
+    path = graph.shortest_path("a", "f")
+    assert [(e["source"], e["target"]) for e in path] == [("a", "c"), ("c", "e"), ("e", "f")]
+    path = graph.shortest_path("a", "f", rel_types=["knows"])
+    assert [e["target"] for e in path] == ["b", "d", "e", "f"]
+    assert graph.shortest_path("a", "f", max_depth=2) is None
+    assert graph.shortest_path("f", "a") is None
+    assert [e["source"] for e in graph.shortest_path("f", "a", direction="incoming")] == ["e", "c", "a"]
+    
+    print("  [PASS] Depth, label and type limits hold; shortest paths found")
+
+
+def test_batch_ingestion_matches_single_facts():
+    """store_facts() stores the same rows, nodes and edges as store_fact() one at a time."""
+    print("Testing batch ingestion...")
+    
+    day = datetime(2024, 1, 1)
+    facts = [{"fact": f"fact {i} about {i % 4}", "entity": f"e{i % 4}", "timestamp": day + timedelta(days=i),
+              "relationships": [{"type": "knows", "target": f"e{(i + 1) % 6}", "properties": {"i": i}}]}
+             for i in range(40)]
+    
+    single, batch = IntegratedMemorySystem(dimension=64), IntegratedMemorySystem(dimension=64)
+    indices = [single.store_fact(f["fact"], f["entity"], f["timestamp"], f["relationships"]) for f in facts]
+    assert batch.store_facts(facts) == indices == list(range(40))
+    assert batch.store_facts([]) == []
+    
+    assert batch.vector_store.metadata == single.vector_store.metadata
+    assert np.array_equal(batch.vector_store.vectors, single.vector_store.vectors)
+    assert batch.graph.nodes.keys() == single.graph.nodes.keys() == {f"e{i}" for i in range(6)}
+    
+    def edges(system):
+        return sorted((e["source"], e["target"], e["properties"]["i"], e["valid_from"])
+                      for e in system.graph.edges.values())
+    assert edges(batch) == edges(single)
+    
+    print("  [PASS] Same rows, nodes and edges")
+
+
+def test_consolidation_counts():
+    """consolidate() reports what it merged and retired, and only looks at new data."""
+    print("Testing consolidation counts...")
+    
+    system = IntegratedMemorySystem(dimension=64)
+    system.store_facts([{"fact": "user likes green tea", "entity": "user"}] * 3
+                       + [{"fact": "user owns a red bicycle", "entity": "user"},
+                          {"fact": "user likes green tea", "entity": "bob"}])
+    for year, city in ((2020, "paris"), (2021, "london"), (2022, "paris")):
+        system.store_fact(f"user moved to {city} in {year}", "user", timestamp=datetime(year, 1, 1),
+                          relationships=[{"type": "located_in", "target": city}])
+    system.store_fact("user knows bob", "user", timestamp=datetime(2020, 1, 1),
+                      relationships=[{"type": "knows", "target": "bob"}])
+    system.store_fact("user knows bob", "user", timestamp=datetime(2021, 1, 1),
+                      relationships=[{"type": "knows", "target": "bob"}])
+    
+    report = system.consolidate(exclusive_types=["located_in"])
+    assert report == {"facts_scanned": 10, "vectors_reclaimed": 3, "edges_closed": 2,
+                      "edges_removed": 1}, report
+    # Two copies of the tea fact and one of "user knows bob" merged into the first
+    merged = [m.get("merged_count", 0) for m in system.vector_store.metadata]
+    assert merged[0] == 2 and merged[8] == 1 and sum(merged) == 3
+    assert len(system.vector_store) == 7
+    assert sorted((r["index"], r["merged_into"]) for r in system.cold_storage) == [(1, 0), (2, 0), (9, 8)]
+    
+    located = [e for e in system.graph.edges.values() if e["type"] == "located_in"]
+    assert len(located) == 3
+    assert [(e["target"], e["valid_from"]) for e in located if e.get("valid_until") is None] == [
+        ("paris", datetime(2022, 1, 1).isoformat())
+    ]
+    assert len([e for e in system.graph.edges.values() if e["type"] == "knows"]) == 1
+    
+    assert system.consolidate() == {"facts_scanned": 0, "vectors_reclaimed": 0, "edges_closed": 0,
+                                    "edges_removed": 0}
+    
+    print("  [PASS] Merges, closes and removals counted once")
+
+
+def test_quantizer_round_trip_error():
+    """float16 and int8 rows decode within their precision, and code scores match decoded rows."""
+    print("Testing quantizer round trips...")
+    
+    rng = np.random.default_rng(5)
+    rows, queries = unit_rows(rng, 2000, 64), unit_rows(rng, 20, 64)
+    
+    half = Float16Quantizer()
+    assert np.abs(half.decode(half.encode(rows)) - rows).max() <= 1e-3
+    
+    int8 = ScalarQuantizer(min_train_size=1)
+    int8.train(rows)
+    codes = int8.encode(rows)
+    assert (np.abs(int8.decode(codes) - rows) <= int8.step / 2 + 1e-6).all()
+    # Values outside the trained range clip to its ends
+    outside = 2 * rows[:1]
+    expected = np.clip(outside, int8.center - 127 * int8.step, int8.center + 127 * int8.step)
+    assert (np.abs(int8.decode(int8.encode(outside)) - expected) <= int8.step / 2 + 1e-6).all()
+    
+    for quantizer, encoded in ((half, half.encode(rows)), (int8, codes)):
+        for query in queries:
+            assert np.allclose(quantizer.score(encoded, query), quantizer.decode(encoded) @ query,
+                               atol=1e-4)
+    
+    print("  [PASS] float16 within 1e-3, int8 within half a step")
+
+
+def test_product_quantizer_recall():
+    """Default PQ codes keep recall@10 usable, rerank restores it from rows left on disk."""
+    print("Testing product quantization recall...")
+    
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((40, 32))
+    store = VectorStore(dimension=32, initial_capacity=12000, quantizer=ProductQuantizer(),
+                        rerank=4)
+    store._append_batch(_clustered_vectors(rng, centers, 12000), [{} for _ in range(12000)])
+    store._maintain()
+    assert store.quantizer.trained
+    assert store.quantizer.bytes_per_vector(32) == 17
+    # The re-ranking rows are mapped from a file, not held in RAM
+    assert isinstance(store._full, np.memmap)
+    
+    queries = _clustered_vectors(rng, centers, 100)
+    for rerank, floor in ((0, 0.7), (4, 0.95)):
+        store.rerank = rerank
+        recalls = []
+        for query in queries:
+            ids, _ = store._rank(query, 10)
+            recalls.append(len(set(ids.tolist()) & set(brute_force(store, query, 10))) / 10)
+        assert np.mean(recalls) >= floor, (rerank, np.mean(recalls))
+    
+    print("  [PASS] recall@10 above 0.7 from codes, 0.95 with rerank 4")
+
+
+def test_cached_embedder():
+    """The cache embeds each distinct text once and returns the provider's vectors."""
+    print("Testing the embedding cache...")
+    
+    class CountingEmbedder(EmbeddingProvider):
+        def __init__(self, dimension):
+            super().__init__(dimension)
+            self.texts = []
+            self.inner = HashingEmbedder(dimension)
+        
+        def embed_batch(self, texts):
+            self.texts += texts
+            return self.inner.embed_batch(texts)
+    
+    with pytest.raises(TypeError):
+        EmbeddingProvider(16)
+    
+    provider = CountingEmbedder(16)
+    cache = CachedEmbedder(provider, maxsize=2)
+    vectors = cache.embed_batch(["a b", "c", "a b"])
+    assert provider.texts == ["a b", "c"]
+    assert np.array_equal(vectors, provider.inner.embed_batch(["a b", "c", "a b"]))
+    assert (cache.hits, cache.misses) == (0, 2)
+    
+    cache.embed("c")
+    cache.embed("d")  # Evicts "a b", the least recently used
+    cache.embed("a b")
+    assert provider.texts == ["a b", "c", "d", "a b"]
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert cache.embed_batch([]).shape == (0, 16)
+    
+    print("  [PASS] One provider call per distinct uncached text")
+
+
+def test_time_index_matches_a_scan():
+    """TimeIndex ranges and time-windowed searches equal a linear scan."""
+    print("Testing time-range retrieval...")
+    
+    rng = np.random.default_rng(5)
+    index, times = TimeIndex(), {}
+    for row in range(3000):
+        # Mostly in order, with late arrivals that go through the buffer
+        t = float(row) if rng.random() < 0.8 else float(rng.integers(0, 3000))
+        index.add(row, t)
+        times[row] = t
+    for row in range(0, 3000, 13):
+        index.remove(row, times.pop(row))
+    for start, end in rng.integers(-100, 3100, size=(50, 2)):
+        rows = index.range(float(start), float(end))
+        assert sorted(rows.tolist()) == sorted(r for r, t in times.items() if start <= t < end)
+        assert [times[r] for r in rows.tolist()] == sorted(times[r] for r in rows.tolist())
+    
+    store = VectorStore(dimension=32)
+    day = datetime(2024, 1, 1)
+    stamps = [day + timedelta(hours=int(h)) for h in rng.integers(0, 24 * 60, size=1000)]
+    store._append_batch(unit_rows(rng, 1000, 32), [{"valid_from": t.isoformat()} for t in stamps])
+    start, end = day + timedelta(days=10), day + timedelta(days=20)
+    window = [i for i, t in enumerate(stamps) if start <= t < end]
+    for query in unit_rows(rng, 5, 32):
+        results = store._search(query, 10, time_range=(start, end))
+        assert [r["index"] for r in results] == [
+            i for i in brute_force(store, query, 10, window) if float(store.vectors[i] @ query) > 0
+        ]
+    with pytest.raises(ValueError):
+        store._search(unit_rows(rng, 1, 32)[0], 10, time_range=("not a date", None))
+    
+    print("  [PASS] Ranges and windowed searches equal a scan")
+
+
+def test_evicted_shard_reloads_on_search():
+    """A search after evicting a session shard reloads it and finds the same rows."""
+    print("Testing shard eviction...")
+    
+    with tempfile.TemporaryDirectory() as path:
+        system = IntegratedMemorySystem.open(path, dimension=64, shard_sessions=True)
+        store = system.vector_store
+        for session in ("s1", "s2"):
+            system.start_session(session)
+            system.store_facts([{"fact": f"{session} fact {i}", "entity": "e"} for i in range(30)])
+        system.start_session("s1")
+        before = system.retrieve_memories("s1 fact 3", limit=5)
+        
+        assert store.evict("s1")
+        assert "s1" not in store.shards and "s1" in store.sessions()
+        assert not store.evict("s1")
+        after = system.retrieve_memories("s1 fact 3", limit=5)
+        assert "s1" in store.shards
+        assert [(r["index"], r["text"]) for r in after] == [(r["index"], r["text"]) for r in before]
+        assert after[0]["text"] == "s1 fact 3"
+        system.close()
+    
+    print("  [PASS] Evicted shard reloaded with the same results")
+
+
+def test_reopen_rejects_other_dimension():
+    """A directory closed before its first snapshot still refuses another dimension."""
+    print("Testing reopen at another dimension...")
+    
+    with tempfile.TemporaryDirectory() as path:
+        system = IntegratedMemorySystem.open(path, dimension=64)
+        system.store_facts([{"fact": f"fact {i}", "entity": "e"} for i in range(100)])
+        system.close()
+        
+        with pytest.raises(ValueError, match="dimension 64"):
+            IntegratedMemorySystem.open(path, dimension=128)
+        
+        system = IntegratedMemorySystem.open(path, dimension=64)
+        assert len(system.vector_store) == 100
+        system.close()
+    
+    print("  [PASS] Reopening at dimension 128 raises ValueError")
+
+
+def test_reopen_rejects_other_precision():
+    """An int8 directory is never read as another precision, snapshot or not."""
+    print("Testing reopen at another precision...")
+    
+    with tempfile.TemporaryDirectory() as path:
+        system = IntegratedMemorySystem.open(path, dimension=64, precision="int8")
+        system.store_facts([{"fact": f"fact {i} about {i % 37}", "entity": "e"} for i in range(1200)])
+        system.close()
+        
+        for precision in ("float32", "float16", "pq"):
+            with pytest.raises(ValueError, match="stored as int8"):
+                IntegratedMemorySystem.open(path, dimension=64, precision=precision)
+        
+        system = IntegratedMemorySystem.open(path, dimension=64, precision="int8")
+        assert system.vector_store.quantizer.trained
+        assert all(0 < r["score"] <= 1.0 + 1e-3 for r in system.retrieve_memories("fact 5"))
+        system.close()
+    
+    print("  [PASS] Reopening as float32, float16 or pq raises ValueError")
+
+
+def test_backfilled_exclusive_edge_is_closed():
+    """An exclusive edge stored after a newer one ends where the newer one starts."""
+    print("Testing out-of-order exclusive relationships...")
+    
+    system = IntegratedMemorySystem(dimension=64)
+    for city, year in (("paris", 2024), ("london", 2025), ("rome", 2023)):
+        system.store_fact(f"user lives in {city}", "user", timestamp=datetime(year, 1, 1),
+                          relationships=[{"type": "located_in", "target": city}])
+        system.consolidate(exclusive_types=["located_in"])
+    
+    for year, city in ((2023, "rome"), (2024, "paris"), (2025, "london")):
+        results = system.graph.query_at_time({"type": "located_in"}, datetime(year, 6, 1))
+        assert [r["edge"]["target"] for r in results] == [city], (year, results)
+    
+    print("  [PASS] One location per point in time")
+
+
+def test_untouched_shards_stay_on_disk():
+    """Consolidation and entity searches after a reopen load only the shards they need."""
+    print("Testing shard summaries across a reopen...")
+    
+    with tempfile.TemporaryDirectory() as path:
+        system = IntegratedMemorySystem.open(path, dimension=64, shard_sessions=True)
+        for i in range(4):
+            system.start_session(f"s{i}")
+            system.store_facts([{"fact": f"fact {j} of {i}", "entity": f"e{i}"} for j in range(50)])
+        system.consolidate()
+        system.close()
+        
+        system = IntegratedMemorySystem.open(path, dimension=64, shard_sessions=True)
+        report = system.consolidate()
+        assert report["facts_scanned"] == 0
+        assert not system.vector_store.shards
+        
+        results = system.vector_store.search_by_entity("e2", "fact 7 of 2")
+        assert {r["session"] for r in results} == {"s2"}
+        assert list(system.vector_store.shards) == ["s2"]
+        system.close()
+    
+    print("  [PASS] Untouched shards are skipped without loading")
+
+
+def test_concurrent_readers_and_writers():
+    """Threads reading and writing one system, while it trains and indexes, leave it consistent."""
+    print("Testing concurrent readers and writers...")
+    
+    report = stress_concurrency(readers=3, writers=2, seconds=1.0, precision="int8",
+                                n_lists=8, initial_facts=200)
+    assert report["errors"] == [], report["errors"]
+    assert report["consistent"]
+    assert report["reads_per_s"] > 0 and report["writes_per_s"] > 0
+    
+    print("  [PASS] No errors and every index consistent")
+
+
+def main():
+    sys.exit(pytest.main([__file__, "-q"]))
+
+
+if __name__ == "__main__":
+    main()